@@ -1,23 +1,76 @@
+import asyncio
 import logging
 import os
+import shutil
+from email.utils import formatdate
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
+from uuid import uuid4
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from config import SEPARATOR_MODEL, DEVICE, TARGET_DB
-from core.pipeline import AudioPipeline
-from core.processors import (
-    SeparationStage,
-    HarmonicPercussiveStage,
-    CompositeTrackStage,
-    SeparatedTrackHarmonicPercussiveStage,
-    NormalizationStage
+from config import (
+    WORKER_PROCESSES,
+    MAX_FILE_SIZE_MB,
+    SUPPORTED_FORMATS,
+    MAX_INPUT_DURATION_SECONDS,
+    MAX_JOB_COMPUTE_SECONDS,
+    DEFAULT_REALTIME_FACTOR,
+    MAX_QUEUE_DEPTH,
+    MAX_QUEUED_PER_CLIENT,
+    JOB_DB_PATH,
+    EMBEDDED_WORKERS,
+    MAX_BATCH_ITEMS,
+    MAX_BATCH_SIZE_MB,
+    BATCH_MAX_PARALLEL,
+    BATCH_LOCAL_ROOT,
+    TRANSCODE_CACHE_DIR,
+    TRANSCODE_CACHE_MB,
+    UPLOAD_EXPIRY_HOURS,
+    MAX_OPEN_UPLOADS_PER_CLIENT,
+    MAX_UPLOAD_MB_PER_CLIENT,
+    BLOB_DIR,
+    BLOB_STORE_MB,
+    SPECTROGRAM_TILE_CACHE_DIR,
+    SPECTROGRAM_TILE_CACHE_MB,
+    PREVIEW_SECONDS,
+    PREVIEW_UPGRADE_HOURS
 )
+from api.archive import ARCHIVE_FORMATS, iter_archive
+from api.blobs import BlobStore, normalize_sha256
+from api.cancellation import cancel_response
+from api.batches import batch_archive_entries, batch_summary, resolve_local_paths
+from api.downloads import CACHE_CONTROL, file_response
+from api.health import readiness_response
+from api.jobstore import JobStore, StateRelay, store_event_bus
+from api.listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, job_summary, parse_since, parse_statuses
+from api.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware
+from api.peaks import DEFAULT_PEAK_PIXELS, ensure_peaks, peaks_response
+from api.previews import PreviewSources
+from api.resumable import (
+    CHECKSUM_ALGORITHMS,
+    TUS_EXTENSIONS,
+    TUS_VERSION,
+    ResumableUploads,
+    parse_metadata
+)
+from api.scheduler import DEFAULT_PRIORITY, JobScheduler, QueuedJob, QueueFullError
+from api.spectrogram import TileCache, ensure_spectrogram, tile_response
+from api.sse import SSE_HEADERS, job_event_stream
+from api.transcode import TranscodeCache, resolve_format
+from api.uploads import UPLOAD_OPENAPI, receive_upload, receive_uploads
+from api.worker import WorkerPool, acquire_worker_lock, build_pipeline, pool_stats
+from core.events import EventBus
+from core.excerpt import loudest_window, write_excerpt
+from core.metrics import REGISTRY, MetricsRegistry, process_rss_bytes
+from core.pipeline import ProcessingManifest
+from core.probe import AudioProbe, CostModel, probe_audio
+from core.storage import file_sha256
 
 logging.basicConfig(
     level=logging.INFO,
@@ -38,45 +91,111 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 UPLOAD_DIR = Path("./uploads")
 OUTPUT_DIR = Path("./outputs")
 UPLOAD_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-pipeline = AudioPipeline(output_base_dir=str(OUTPUT_DIR))
+# Queue, events and metrics are shared by every API process (uvicorn --workers N) through SQLite
+store = JobStore(JOB_DB_PATH)
+events = EventBus()
+relay = StateRelay(store, events, source=f"api-{os.getpid()}")
+pipeline = build_pipeline(str(OUTPUT_DIR), events=store_event_bus(store))
+scheduler = JobScheduler(
+    store,
+    max_depth=MAX_QUEUE_DEPTH,
+    max_per_client=MAX_QUEUED_PER_CLIENT,
+    workers=WORKER_PROCESSES
+)
+worker_pool = WorkerPool(str(OUTPUT_DIR), JOB_DB_PATH, processes=WORKER_PROCESSES)
+_worker_lock = None
+transcode_cache = TranscodeCache(TRANSCODE_CACHE_DIR, max_bytes=TRANSCODE_CACHE_MB * 1024 * 1024)
+resumable_uploads = ResumableUploads(
+    store,
+    UPLOAD_DIR / "partial",
+    max_bytes=MAX_FILE_SIZE_MB * 1024 * 1024,
+    supported_formats=SUPPORTED_FORMATS,
+    expiry_seconds=UPLOAD_EXPIRY_HOURS * 3600,
+    max_per_client=MAX_OPEN_UPLOADS_PER_CLIENT,
+    max_client_bytes=MAX_UPLOAD_MB_PER_CLIENT * 1024 * 1024
+)
+preview_sources = PreviewSources(UPLOAD_DIR / "previews", expiry_seconds=PREVIEW_UPGRADE_HOURS * 3600)
+blob_store = BlobStore(BLOB_DIR, max_bytes=BLOB_STORE_MB * 1024 * 1024)
+# Jobs only reuse results produced by an identically configured pipeline
+PIPELINE_CONFIG_KEY = pipeline.config_key()
+tile_cache = TileCache(SPECTROGRAM_TILE_CACHE_DIR, max_bytes=SPECTROGRAM_TILE_CACHE_MB * 1024 * 1024)
+# Calibrated from the stage timings every worker publishes to the store
+cost_model = CostModel([stage.name for stage in pipeline.stages], store.metrics_snapshots, DEFAULT_REALTIME_FACTOR)
+
 
+@lru_cache(maxsize=1024)
+def _cached_manifest(job_id: str, manifest_mtime_ns: int) -> Optional[ProcessingManifest]:
+    return pipeline.get_job_status(job_id)
 
-def _initialize_pipeline():
-    pipeline.add_stage(SeparationStage(separator_type="demucs", separator_model=SEPARATOR_MODEL, device=DEVICE))
-    pipeline.add_stage(SeparatedTrackHarmonicPercussiveStage())
-    pipeline.add_stage(HarmonicPercussiveStage())
-    pipeline.add_stage(CompositeTrackStage())
-    pipeline.add_stage(NormalizationStage(target_db=TARGET_DB))
+
+def job_manifest(job_id: str) -> Optional[ProcessingManifest]:
+    """Manifest for a job, re-read only when it changes. Treat the result as read-only."""
+    try:
+        mtime_ns = (OUTPUT_DIR / job_id / "manifest.json").stat().st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return _cached_manifest(job_id, mtime_ns)
 
 
-_initialize_pipeline()
+def job_outputs(job_id: str) -> Optional[Dict[str, str]]:
+    manifest = job_manifest(job_id)
+    return manifest.outputs if manifest is not None else None
 
 
 @app.on_event("startup")
 async def startup_event():
+    global _worker_lock
+    relay.start()
+    # Only one API process per host runs the model workers, the others just admit jobs
+    if EMBEDDED_WORKERS:
+        _worker_lock = acquire_worker_lock(str(OUTPUT_DIR / ".workers.lock"))
+        if _worker_lock is not None:
+            worker_pool.start()
     logger.info("API startup - Pipeline initialized")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    global _worker_lock
+    worker_pool.stop()
+    relay.stop()
+    if _worker_lock is not None:
+        _worker_lock.close()
+        _worker_lock = None
+
+
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
         "version": "1.0.0",
-        "pipeline_stages": len(pipeline.stages)
+        "pipeline_stages": len(pipeline.stages),
+        "workers": pool_stats(store, WORKER_PROCESSES),
+        "queue_depth": len(scheduler)
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness for load balancers; /health only reports liveness."""
+    return readiness_response(store)
+
+
 @app.get("/config")
 async def get_config():
     return {
-        "max_file_size_mb": 500,
-        "supported_formats": ["wav", "mp3", "flac", "ogg"],
+        "max_file_size_mb": MAX_FILE_SIZE_MB,
+        "max_input_duration_seconds": MAX_INPUT_DURATION_SECONDS,
+        "max_job_compute_seconds": MAX_JOB_COMPUTE_SECONDS or None,
+        "realtime_factor": round(cost_model.realtime_factor(), 3),
+        "supported_formats": SUPPORTED_FORMATS,
         "pipeline_stages": [
             {
                 "name": stage.name,
@@ -87,36 +206,600 @@ async def get_config():
     }
 
 
-@app.post("/process")
-async def process_audio(file: UploadFile = File(...)):
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
+def client_identity(request: Request) -> str:
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+
+def queue_full(error: QueueFullError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
+
+def assess_input(path: Path, filename: str) -> Tuple[Optional[AudioProbe], Optional[float]]:
+    """Probe an input's header and predict its cost; 413 when it exceeds the duration or compute budget."""
+    probe = probe_audio(str(path))
+    if probe is None:
+        # Some files only the fallback decoder can read; they run without an estimate
+        return None, None
+    if MAX_INPUT_DURATION_SECONDS and probe.duration_seconds > MAX_INPUT_DURATION_SECONDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{filename}: audio too long ({probe.duration_seconds:.0f}s, max {MAX_INPUT_DURATION_SECONDS:.0f}s)"
+        )
+    estimate = cost_model.estimate(probe.duration_seconds)
+    if MAX_JOB_COMPUTE_SECONDS and estimate > MAX_JOB_COMPUTE_SECONDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{filename}: estimated processing time {estimate:.0f}s exceeds the limit of {MAX_JOB_COMPUTE_SECONDS:.0f}s"
+        )
+    return probe, estimate
+
+
+def estimate_metadata(probe: Optional[AudioProbe], estimate: Optional[float]) -> Dict:
+    if probe is None:
+        return {}
+    return {"input_probe": probe.to_dict(), "estimated_run_seconds": round(estimate, 1)}
+
+
+def admit_job(
+    input_path: Path,
+    client_id: str,
+    priority: str,
+    metadata: Optional[Dict] = None,
+    filename: Optional[str] = None,
+    input_sha256: Optional[str] = None,
+    probe: Optional[AudioProbe] = None
+) -> Tuple[ProcessingManifest, int]:
+    probe = probe or probe_audio(str(input_path))
+    estimate = cost_model.estimate(probe.duration_seconds) if probe is not None else None
+    manifest = pipeline.create_job(str(input_path), metadata={**(metadata or {}), **estimate_metadata(probe, estimate)})
+    try:
+        position = scheduler.admit(QueuedJob(
+            job_id=manifest.job_id,
+            input_path=str(input_path),
+            client_id=client_id,
+            priority=priority,
+            filename=filename,
+            input_sha256=input_sha256,
+            config_key=PIPELINE_CONFIG_KEY if input_sha256 else None,
+            estimated_seconds=estimate
+        ))
+    except QueueFullError:
+        # The queue filled up while this upload was streaming
+        shutil.rmtree(OUTPUT_DIR / manifest.job_id, ignore_errors=True)
+        events.discard(manifest.job_id)
+        raise
+    return manifest, position
+
+
+def job_accepted(manifest: ProcessingManifest, priority: str, position: int) -> Dict:
+    wait = scheduler.estimated_wait_for(manifest.job_id) if position else 0.0
+    run = manifest.metadata.get("estimated_run_seconds") if position else 0.0
+    return {
+        "job_id": manifest.job_id,
+        "status": manifest.status,
+        "created_at": manifest.created_at,
+        "priority": priority,
+        "queue_position": position,
+        "estimated_wait_seconds": wait,
+        "estimated_run_seconds": run,
+        "estimated_completion_seconds": round(wait + run, 1) if run is not None else None,
+        "input_probe": manifest.metadata.get("input_probe"),
+        "stages": [s.to_dict() for s in manifest.stages],
+        "outputs": manifest.outputs
+    }
+
+
+def completed_job_for(input_sha256: str) -> Optional[str]:
+    for job_id in store.completed_jobs_for(input_sha256, PIPELINE_CONFIG_KEY):
+        manifest = job_manifest(job_id)
+        if manifest is not None and manifest.status == "completed":
+            return job_id
+    return None
+
+
+async def reuse_results(input_sha256: str, client_id: str, priority: str, filename: str) -> Optional[JSONResponse]:
+    """Answer a submission with a new job linked to the outputs of a finished job for the same content."""
+    for source_job_id in store.completed_jobs_for(input_sha256, PIPELINE_CONFIG_KEY):
+        manifest = await asyncio.to_thread(pipeline.clone_job, source_job_id, filename)
+        if manifest is None:
+            continue
+        store.add_reused_job(
+            manifest.job_id, client_id, priority, filename, input_sha256, PIPELINE_CONFIG_KEY, list(manifest.outputs)
+        )
+        logger.info(f"File {filename} matches job {source_job_id}, answered as job {manifest.job_id} without processing")
+        return JSONResponse(
+            status_code=200,
+            headers={"Location": f"/job/{manifest.job_id}"},
+            content={**job_accepted(manifest, priority, 0), "reused_from": source_job_id}
+        )
+    return None
+
+
+@app.api_route("/blob/{sha256}", methods=["GET", "HEAD"])
+async def get_blob(sha256: str):
+    try:
+        digest = normalize_sha256(sha256)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    blob = blob_store.find(digest)
+    job_id = completed_job_for(digest)
+    if blob is None and job_id is None:
+        raise HTTPException(status_code=404, detail="Content not known to this server")
+
+    return {
+        "sha256": digest,
+        "stored": blob is not None,
+        "completed_job_id": job_id
+    }
+
+
+def queue_full_job(preview_job_id: str, client_id: str, priority: str) -> Tuple[ProcessingManifest, int]:
+    """Queue the full-length job for a preview from the source kept for it."""
+    preview = job_manifest(preview_job_id).metadata["preview"]
+    filename = preview["filename"]
+    input_path = UPLOAD_DIR / f"{uuid4().hex}_{Path(filename).name}"
+    source = preview_sources.claim(preview_job_id, input_path)
+    if source is None:
+        raise HTTPException(status_code=409, detail="Full job already queued for this preview, or its source has expired")
+
+    try:
+        return admit_job(
+            input_path, client_id, priority,
+            metadata={"preview_job_id": preview_job_id},
+            filename=filename,
+            input_sha256=preview.get("sha256")
+        )
+    except QueueFullError:
+        os.replace(input_path, source)
+        raise
+
+
+@app.post("/process", status_code=202, openapi_extra=UPLOAD_OPENAPI)
+async def process_audio(
+    request: Request,
+    priority: str = DEFAULT_PRIORITY,
+    preview: bool = False,
+    full: bool = False,
+    sha256: Optional[str] = None,
+    filename: Optional[str] = None
+):
+    """Queue an uploaded file, or with ?sha256= a file the server already has (see GET /blob/{sha256})."""
+    client_id = client_identity(request)
+
+    # Reject before reading the body when the queue is already saturated
+    try:
+        scheduler.check_admission(client_id, priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise queue_full(e)
+
+    if sha256 is not None:
+        try:
+            content_sha = normalize_sha256(sha256)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not preview:
+            reused = await reuse_results(content_sha, client_id, priority, filename or content_sha)
+            if reused is not None:
+                return reused
+        file_path = await asyncio.to_thread(blob_store.checkout, content_sha, UPLOAD_DIR, filename or content_sha)
+        if file_path is None:
+            raise HTTPException(status_code=404, detail="Content not stored on this server, upload the file instead")
+        filename = filename or f"{content_sha}{file_path.suffix}"
+    else:
+        file_path, filename, content_sha = await receive_upload(
+            request,
+            UPLOAD_DIR,
+            max_bytes=MAX_FILE_SIZE_MB * 1024 * 1024,
+            supported_formats=SUPPORTED_FORMATS
+        )
+
+    return await submit_input(
+        file_path, filename, content_sha, client_id, priority, preview, full,
+        reuse=sha256 is None
+    )
+
 
-    file_path = UPLOAD_DIR / file.filename
+async def submit_input(
+    file_path: Path,
+    filename: str,
+    content_sha: str,
+    client_id: str,
+    priority: str,
+    preview: bool,
+    full: bool,
+    reuse: bool = True,
+    restore: Optional[Callable[[Path], None]] = None
+) -> JSONResponse:
+    """Queue a received input file as a job, a preview, or answer it from earlier results.
+
+    The file is deleted when it is refused, or handed to restore when only the queue was full.
+    """
+    try:
+        probe, _ = await asyncio.to_thread(assess_input, file_path, filename)
+        await asyncio.to_thread(blob_store.add, file_path, content_sha)
+        if reuse and not preview:
+            reused = await reuse_results(content_sha, client_id, priority, filename)
+            if reused is not None:
+                file_path.unlink(missing_ok=True)
+                return reused
+    except Exception:
+        file_path.unlink(missing_ok=True)
+        raise
 
     try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
-
-        logger.info(f"Processing file: {file.filename}")
-        manifest = pipeline.process(str(file_path))
-
-        return JSONResponse({
-            "job_id": manifest.job_id,
-            "status": manifest.status,
-            "created_at": manifest.created_at,
-            "stages": [s.to_dict() for s in manifest.stages],
-            "outputs": manifest.outputs
+        if not preview:
+            manifest, position = admit_job(
+                file_path, client_id, priority, filename=filename, input_sha256=content_sha, probe=probe
+            )
+            logger.info(f"Queued file {filename} as job {manifest.job_id} ({priority}, position {position})")
+            return JSONResponse(
+                status_code=202,
+                headers={"Location": f"/job/{manifest.job_id}"},
+                content=job_accepted(manifest, priority, position)
+            )
+
+        start, duration, total = await asyncio.to_thread(loudest_window, str(file_path), PREVIEW_SECONDS)
+        excerpt_path = UPLOAD_DIR / f"{uuid4().hex}_preview_{Path(filename).stem}.wav"
+        await asyncio.to_thread(write_excerpt, str(file_path), str(excerpt_path), start, duration)
+
+        excerpt = {
+            "filename": filename,
+            "start_seconds": round(start, 3),
+            "duration_seconds": round(duration, 3),
+            "source_duration_seconds": round(total, 3),
+            "sha256": content_sha
+        }
+        try:
+            # Previews always jump the batch queue, the point is a fast answer
+            manifest, position = admit_job(
+                excerpt_path, client_id, "interactive", metadata={"preview": excerpt}, filename=filename
+            )
+        except QueueFullError:
+            excerpt_path.unlink(missing_ok=True)
+            raise
+        await asyncio.to_thread(preview_sources.keep, manifest.job_id, file_path)
+        logger.info(f"Queued {duration:.0f}s preview of {filename} at {start:.1f}s as job {manifest.job_id}")
+
+        full_job = None
+        if full:
+            try:
+                full_manifest, full_position = queue_full_job(manifest.job_id, client_id, priority)
+                full_job = job_accepted(full_manifest, priority, full_position)
+            except QueueFullError:
+                # Still hand out the preview; the client can upgrade once the queue drains
+                logger.warning(f"Queue full, preview {manifest.job_id} was not upgraded")
+
+        return JSONResponse(
+            status_code=202,
+            headers={"Location": f"/job/{manifest.job_id}"},
+            content={
+                **job_accepted(manifest, "interactive", position),
+                "preview": excerpt,
+                "full_job": full_job,
+                "upgrade_url": None if full_job else f"/job/{manifest.job_id}/upgrade"
+            }
+        )
+
+    except QueueFullError as e:
+        if restore is not None:
+            await asyncio.to_thread(restore, file_path)
+        else:
+            file_path.unlink(missing_ok=True)
+        raise queue_full(e)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error(f"Job submission failed: {str(e)}")
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def tus_headers(upload=None) -> Dict[str, str]:
+    headers = {"Tus-Resumable": TUS_VERSION, "Cache-Control": "no-store"}
+    if upload is not None:
+        headers.update({
+            "Upload-Offset": str(upload["upload_offset"]),
+            "Upload-Length": str(upload["length"]),
+            "Upload-Expires": formatdate(resumable_uploads.expires_at(upload), usegmt=True)
         })
+    return headers
+
+
+@app.options("/uploads")
+async def upload_capabilities():
+    return Response(status_code=204, headers={
+        **tus_headers(),
+        "Tus-Version": TUS_VERSION,
+        "Tus-Extension": TUS_EXTENSIONS,
+        "Tus-Checksum-Algorithm": ",".join(CHECKSUM_ALGORITHMS),
+        "Tus-Max-Size": str(MAX_FILE_SIZE_MB * 1024 * 1024)
+    })
+
+
+@app.post("/uploads", status_code=201)
+async def create_upload(request: Request, filename: Optional[str] = None):
+    """Start a resumable upload; the file name comes from ?filename= or tus Upload-Metadata."""
+    length = request.headers.get("upload-length", "")
+    if not length.isdigit():
+        raise HTTPException(status_code=400, detail="Missing or invalid Upload-Length header")
+
+    metadata = parse_metadata(request.headers.get("upload-metadata", ""))
+    filename = filename or metadata.get("filename") or metadata.get("name")
+    upload = await asyncio.to_thread(resumable_uploads.create, int(length), filename, client_identity(request))
+    logger.info(f"Created resumable upload {upload['upload_id']} for {upload['filename']} ({int(length) / (1024 * 1024):.1f}MB)")
+    return Response(status_code=201, headers={**tus_headers(upload), "Location": f"/uploads/{upload['upload_id']}"})
+
+
+@app.head("/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str):
+    return Response(status_code=200, headers=tus_headers(resumable_uploads.get(upload_id)))
+
+
+@app.patch("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request):
+    await resumable_uploads.patch(request, upload_id)
+    return Response(status_code=204, headers=tus_headers(resumable_uploads.get(upload_id)))
+
+
+@app.delete("/uploads/{upload_id}")
+async def delete_upload(upload_id: str):
+    resumable_uploads.delete(upload_id)
+    return Response(status_code=204, headers=tus_headers())
+
+
+@app.post("/uploads/{upload_id}/finalize", status_code=202)
+async def finalize_upload(
+    upload_id: str,
+    request: Request,
+    priority: str = DEFAULT_PRIORITY,
+    preview: bool = False,
+    full: bool = False
+):
+    """Queue a completely received resumable upload, taking the same options as /process."""
+    client_id = client_identity(request)
+    upload = resumable_uploads.get(upload_id)
+
+    # A full queue leaves the upload in place, so finalize can simply be retried
+    try:
+        scheduler.check_admission(client_id, priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise queue_full(e)
+
+    file_path, filename = await asyncio.to_thread(resumable_uploads.complete, upload_id, UPLOAD_DIR)
+    try:
+        content_sha = await asyncio.to_thread(file_sha256, str(file_path))
+    except OSError:
+        file_path.unlink(missing_ok=True)
+        raise
+    # The queue can fill up between the check above and admission
+    return await submit_input(
+        file_path, filename, content_sha, client_id, priority, preview, full,
+        restore=lambda path: resumable_uploads.restore(upload, path)
+    )
 
+
+@app.post("/job/{job_id}/upgrade", status_code=202)
+async def upgrade_preview(job_id: str, request: Request, priority: str = DEFAULT_PRIORITY):
+    manifest = job_manifest(job_id)
+
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if "preview" not in manifest.metadata:
+        raise HTTPException(status_code=400, detail="Job is not a preview")
+
+    client_id = client_identity(request)
+    try:
+        scheduler.check_admission(client_id, priority)
+        full_manifest, position = queue_full_job(job_id, client_id, priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise queue_full(e)
+
+    logger.info(f"Upgraded preview {job_id} to full job {full_manifest.job_id}")
+    return JSONResponse(
+        status_code=202,
+        headers={"Location": f"/job/{full_manifest.job_id}"},
+        content=job_accepted(full_manifest, priority, position)
+    )
+
+
+@app.post("/batch", status_code=202)
+async def submit_batch(request: Request, priority: str = "batch", max_parallel: int = BATCH_MAX_PARALLEL):
+    """Queue many files at once: multipart "files" parts, or JSON {"paths": [...]} under BATCH_LOCAL_ROOT."""
+    client_id = client_identity(request)
+    # Batches never compete with interactive jobs, and their parallelism is bounded by the server
+    if priority != "batch":
+        raise HTTPException(status_code=400, detail="Batches are queued at batch priority")
+    if not 1 <= max_parallel <= BATCH_MAX_PARALLEL:
+        raise HTTPException(status_code=400, detail=f"max_parallel must be between 1 and {BATCH_MAX_PARALLEL}")
+    # Checked again on admission; refusing here saves receiving the files
+    try:
+        scheduler.check_admission(client_id, priority)
+    except QueueFullError as e:
+        raise queue_full(e)
+
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        local_paths = resolve_local_paths(
+            body.get("paths") if isinstance(body, dict) else None,
+            BATCH_LOCAL_ROOT,
+            SUPPORTED_FORMATS,
+            MAX_BATCH_ITEMS
+        )
+        inputs = [(path, path.name, None) for path in local_paths]
+        owns_input = False
+    else:
+        inputs = await receive_uploads(
+            request,
+            UPLOAD_DIR,
+            max_bytes=MAX_FILE_SIZE_MB * 1024 * 1024,
+            supported_formats=SUPPORTED_FORMATS,
+            field_name="files",
+            max_files=MAX_BATCH_ITEMS,
+            max_total_bytes=MAX_BATCH_SIZE_MB * 1024 * 1024
+        )
+        owns_input = True
+
+    try:
+        # The whole batch is refused if any item exceeds the budgets
+        assessments = [await asyncio.to_thread(assess_input, path, filename) for path, filename, _ in inputs]
+    except HTTPException:
+        if owns_input:
+            for path, _, _ in inputs:
+                path.unlink(missing_ok=True)
+        raise
+
+    batch_id = str(uuid4())
+    jobs = []
+    try:
+        for (path, filename, content_sha), (probe, estimate) in zip(inputs, assessments):
+            if content_sha is not None:
+                await asyncio.to_thread(blob_store.add, path, content_sha)
+            manifest = pipeline.create_job(str(path), metadata=estimate_metadata(probe, estimate))
+            jobs.append(QueuedJob(
+                job_id=manifest.job_id,
+                input_path=str(path),
+                filename=filename,
+                owns_input=owns_input,
+                input_sha256=content_sha,
+                config_key=PIPELINE_CONFIG_KEY if content_sha else None,
+                estimated_seconds=estimate
+            ))
+        scheduler.admit_batch(batch_id, jobs, client_id=client_id, max_parallel=max_parallel)
     except Exception as e:
-        logger.error(f"Processing failed: {str(e)}")
+        for job in jobs:
+            shutil.rmtree(OUTPUT_DIR / job.job_id, ignore_errors=True)
+        if owns_input:
+            for path, _, _ in inputs:
+                path.unlink(missing_ok=True)
+        if isinstance(e, QueueFullError):
+            raise queue_full(e)
+        logger.error(f"Batch submission failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        if file_path.exists():
-            file_path.unlink()
+    logger.info(f"Queued batch {batch_id} with {len(jobs)} files ({priority}, {max_parallel} in parallel)")
+    return JSONResponse(
+        status_code=202,
+        headers={"Location": f"/batch/{batch_id}"},
+        content={
+            "batch_id": batch_id,
+            "status": "queued",
+            "priority": priority,
+            "max_parallel": max_parallel,
+            "items": [{"job_id": job.job_id, "filename": job.filename} for job in jobs]
+        }
+    )
+
+
+@app.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    batch = store.get_batch(batch_id)
+
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return batch_summary(batch, store.batch_jobs(batch_id), job_manifest)
+
+
+@app.get("/batch/{batch_id}/download")
+async def download_batch(batch_id: str, format: str = "zip", compress: bool = False):
+    if store.get_batch(batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported archive format: {format}")
+
+    entries = batch_archive_entries(store.batch_jobs(batch_id), job_outputs, OUTPUT_DIR)
+    if not entries:
+        raise HTTPException(status_code=404, detail="No outputs available")
+
+    return StreamingResponse(
+        iter_archive(entries, format, compress),
+        media_type=ARCHIVE_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}.{format}"'}
+    )
+
+
+@app.get("/queue")
+async def get_queue():
+    return {
+        **scheduler.stats(),
+        "workers": pool_stats(store, WORKER_PROCESSES)
+    }
+
+
+def runtime_metrics() -> Dict:
+    """Values read at scrape time rather than updated on the hot path."""
+    registry = MetricsRegistry()
+
+    queue_depth = registry.gauge("scheduler_queue_depth", "Jobs waiting for a worker", ("priority",))
+    for priority, depth in scheduler.stats()["by_priority"].items():
+        queue_depth.set(depth, priority=priority)
+
+    pool = pool_stats(store, WORKER_PROCESSES)
+    registry.gauge("worker_jobs_running", "Jobs currently running in worker processes").set(pool["running"])
+    registry.gauge("worker_processes_alive", "Live pipeline worker processes").set(pool["alive_workers"])
+
+    rss = registry.gauge("process_resident_memory_bytes", "Resident memory of API and worker processes", ("process",))
+    api_rss = process_rss_bytes()
+    if api_rss is not None:
+        rss.set(api_rss, process="api")
+    for idx, worker in enumerate(store.alive_workers()):
+        worker_rss = process_rss_bytes(worker["pid"])
+        if worker_rss is not None:
+            rss.set(worker_rss, process=f"worker-{idx}")
+
+    info = _cached_manifest.cache_info()
+    cache = registry.counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+    cache.inc(info.hits, cache="job_manifest", result="hit")
+    cache.inc(info.misses, cache="job_manifest", result="miss")
+
+    return registry.snapshot()
+
+
+@app.get("/metrics")
+async def metrics():
+    # Other API processes and the model workers publish their registries to the store
+    body = REGISTRY.render([runtime_metrics(), *store.metrics_snapshots(exclude=relay.source)])
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/jobs")
+async def list_jobs(
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+):
+    """Newest jobs first, a page at a time, from the job store rather than the manifests."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        statuses = parse_statuses(status)
+        since_ts = parse_since(since)
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One extra row tells whether another page follows
+    rows = store.list_jobs(statuses, since_ts, limit + 1, before)
+    page = rows[:limit]
+    return {
+        "jobs": [job_summary(row) for row in page],
+        "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None
+    }
 
 
 @app.get("/job/{job_id}")
@@ -131,10 +814,32 @@ async def get_job_status(job_id: str):
         "status": manifest.status,
         "created_at": manifest.created_at,
         "stages": [s.to_dict() for s in manifest.stages],
-        "outputs": manifest.outputs
+        "outputs": manifest.outputs,
+        "analysis": manifest.metadata.get("analysis", {}),
+        "failure": manifest.metadata.get("failure")
     })
 
 
+@app.delete("/job/{job_id}")
+async def cancel_job(job_id: str):
+    return await cancel_response(scheduler, pipeline, job_id)
+
+
+@app.get("/job/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    manifest = pipeline.get_job_status(job_id)
+
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    last_event_id = request.headers.get("last-event-id", "")
+    return StreamingResponse(
+        job_event_stream(request, events, manifest, int(last_event_id) if last_event_id.isdigit() else 0),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @app.get("/job/{job_id}/outputs")
 async def get_job_outputs(job_id: str):
     outputs = pipeline.get_outputs(job_id)
@@ -145,53 +850,122 @@ async def get_job_outputs(job_id: str):
     return JSONResponse(outputs)
 
 
-@app.get("/download/{job_id}/{track_name}")
-async def download_track(job_id: str, track_name: str):
-    output_dir = OUTPUT_DIR / job_id
-    track_path = None
+def track_path_for(job_id: str, track_name: str) -> Tuple[str, Path]:
+    """Output key and path of a track, looked up by exact key (".wav" suffix optional)."""
+    outputs = job_outputs(job_id)
+
+    if outputs is None:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    for root, dirs, files in os.walk(output_dir):
-        for file in files:
-            if track_name in file and file.endswith(".wav"):
-                track_path = Path(root) / file
-                break
+    key = track_name[:-4] if track_name.endswith(".wav") else track_name
+    track_path = Path(outputs[key]) if key in outputs else None
 
     if not track_path or not track_path.exists():
         raise HTTPException(status_code=404, detail="Track not found")
 
-    return FileResponse(
-        path=track_path,
-        filename=f"{track_name}.wav",
-        media_type="audio/wav"
-    )
+    return key, track_path
 
 
-@app.get("/download/{job_id}/all")
-async def download_all_tracks(job_id: str):
-    import zipfile
-    import io
+@app.get("/job/{job_id}/peaks/{track_name}")
+async def get_track_peaks(
+    job_id: str,
+    track_name: str,
+    request: Request,
+    zoom: Optional[int] = None,
+    pixels: int = DEFAULT_PEAK_PIXELS,
+    format: str = "json"
+):
+    key, track_path = track_path_for(job_id, track_name)
+    analysis = job_manifest(job_id).metadata.get("analysis", {}).get(key, {})
+    peaks_path = Path(analysis.get("peaks_file") or OUTPUT_DIR / job_id / "analysis" / f"{key}.peaks")
+
+    await ensure_peaks(peaks_path, track_path)
+    return peaks_response(request, peaks_path, zoom, pixels, format)
+
 
-    output_dir = OUTPUT_DIR / job_id
+@app.get("/job/{job_id}/spectrogram/{track_name}")
+async def get_spectrogram_tile(
+    job_id: str,
+    track_name: str,
+    request: Request,
+    zoom: Optional[int] = None,
+    x: int = 0,
+    scale: str = "linear"
+):
+    _, track_path = track_path_for(job_id, track_name)
+    spec_path = await ensure_spectrogram(tile_cache, track_path)
+    return await tile_response(request, tile_cache, spec_path, track_path, zoom, x, scale)
 
-    if not output_dir.exists():
+
+@app.get("/download/{job_id}/all")
+async def download_all_tracks(job_id: str, format: str = "zip", compress: bool = False):
+    outputs = job_outputs(job_id)
+
+    if outputs is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    zip_buffer = io.BytesIO()
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported archive format: {format}")
+
+    output_dir = (OUTPUT_DIR / job_id).resolve()
+    entries = []
+    for path in outputs.values():
+        file_path = Path(path).resolve()
+        if not file_path.exists():
+            continue
+        try:
+            arcname = file_path.relative_to(output_dir).as_posix()
+        except ValueError:
+            arcname = file_path.name
+        entries.append((file_path, arcname))
+
+    if not entries:
+        raise HTTPException(status_code=404, detail="No outputs available")
+
+    # Archive is generated while it is sent; file reads run in Starlette's threadpool
+    return StreamingResponse(
+        iter_archive(entries, format, compress),
+        media_type=ARCHIVE_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="audio_tracks_{job_id}.{format}"'}
+    )
 
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for root, dirs, files in os.walk(output_dir):
-            for file in files:
-                if file.endswith(".wav"):
-                    file_path = Path(root) / file
-                    arcname = file_path.relative_to(output_dir)
-                    zip_file.write(file_path, arcname)
 
-    zip_buffer.seek(0)
+@app.get("/download/{job_id}/{track_name}")
+async def download_track(
+    job_id: str,
+    track_name: str,
+    request: Request,
+    format: Optional[str] = None,
+    bitrate: Optional[int] = None
+):
+    key, track_path = track_path_for(job_id, track_name)
+
+    if format is None:
+        return file_response(
+            request,
+            track_path,
+            filename=f"{key}{track_path.suffix}",
+            media_type="audio/wav" if track_path.suffix == ".wav" else None
+        )
 
-    return FileResponse(
-        content=zip_buffer.getvalue(),
-        filename=f"audio_tracks_{job_id}.zip",
-        media_type="application/zip"
+    try:
+        spec, bitrate = resolve_format(format, bitrate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"{key}{spec.extension}"
+    cached = transcode_cache.cache_path(track_path, spec, bitrate)
+    if transcode_cache.lookup(cached):
+        return file_response(request, cached, filename=filename, media_type=spec.media_type)
+
+    # Sent while the encoder runs; once finished, the cached file is served with Range support
+    return StreamingResponse(
+        transcode_cache.stream(track_path, cached, spec, bitrate),
+        media_type=spec.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": CACHE_CONTROL
+        }
     )
 
 
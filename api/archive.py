@@ -0,0 +1,98 @@
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+ARCHIVE_FORMATS = {
+    "zip": "application/zip",
+    "tar": "application/x-tar"
+}
+
+# (file on disk, name inside the archive)
+ArchiveEntry = Tuple[Path, str]
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object whose contents are drained by the caller."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _drained(sink: _ChunkSink) -> Iterator[bytes]:
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _read_chunks(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(ARCHIVE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_zip(entries: List[ArchiveEntry], compress: bool = False) -> Iterator[bytes]:
+    """Yield a ZIP archive of entries chunk by chunk.
+
+    Entries are STORED unless compress is set; WAV data barely deflates.
+    The sink is not seekable, so sizes and CRCs go in data descriptors.
+    """
+    sink = _ChunkSink()
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+    with zipfile.ZipFile(sink, "w", compression=compression, allowZip64=True) as archive:
+        for path, arcname in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = compression
+            with archive.open(info, "w") as dest:
+                for chunk in _read_chunks(path):
+                    dest.write(chunk)
+                    yield from _drained(sink)
+            yield from _drained(sink)
+
+    yield from _drained(sink)
+
+
+def iter_tar(entries: List[ArchiveEntry]) -> Iterator[bytes]:
+    """Yield an uncompressed PAX tar archive of entries chunk by chunk."""
+    for path, arcname in entries:
+        stat = path.stat()
+        info = tarfile.TarInfo(arcname)
+        info.size = stat.st_size
+        info.mtime = int(stat.st_mtime)
+        info.mode = 0o644
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+
+        for chunk in _read_chunks(path):
+            yield chunk
+
+        remainder = info.size % tarfile.BLOCKSIZE
+        if remainder:
+            yield tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+
+    # End-of-archive marker: two empty blocks
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+def iter_archive(entries: List[ArchiveEntry], archive_format: str = "zip", compress: bool = False) -> Iterator[bytes]:
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unsupported archive format: {archive_format}. Available: {list(ARCHIVE_FORMATS)}")
+    if archive_format == "tar":
+        return iter_tar(entries)
+    return iter_zip(entries, compress)
@@ -0,0 +1,137 @@
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from core.pipeline import ProcessingManifest
+
+TERMINAL_JOB_STATUSES = ("completed", "failed", "cancelled")
+
+
+def resolve_local_paths(paths: List, root: str, supported_formats: List[str], max_items: int) -> List[Path]:
+    """Validate server-local batch inputs; they must be existing audio files under root."""
+    if not root:
+        raise HTTPException(status_code=403, detail="Server-local paths are disabled (set BATCH_LOCAL_ROOT)")
+    if not isinstance(paths, list) or not paths or not all(isinstance(p, str) for p in paths):
+        raise HTTPException(status_code=400, detail="Expected a non-empty list of paths")
+    if len(paths) > max_items:
+        raise HTTPException(status_code=400, detail=f"Too many files (max {max_items})")
+
+    root_path = Path(root).resolve()
+    resolved = []
+    for raw in paths:
+        path = (root_path / raw).resolve()
+        if not path.is_relative_to(root_path):
+            raise HTTPException(status_code=403, detail=f"Path outside BATCH_LOCAL_ROOT: {raw}")
+        if not path.is_file():
+            raise HTTPException(status_code=400, detail=f"File not found: {raw}")
+        if path.suffix.lower().lstrip(".") not in supported_formats:
+            raise HTTPException(status_code=415, detail=f"Unsupported audio format: {raw}")
+        resolved.append(path)
+    return resolved
+
+
+def _item_progress(status: str, manifest: Optional[ProcessingManifest]) -> float:
+    if status in TERMINAL_JOB_STATUSES:
+        return 1.0
+    if status != "running" or manifest is None or not manifest.stages:
+        return 0.0
+    done = sum(1 for stage in manifest.stages if stage.status == "completed")
+    return done / len(manifest.stages)
+
+
+def _batch_status(counts: Dict[str, int], total: int) -> str:
+    finished = sum(counts[status] for status in TERMINAL_JOB_STATUSES)
+    if finished < total:
+        return "running" if finished or counts["running"] else "queued"
+    if finished == counts["completed"]:
+        return "completed"
+    if not counts["completed"]:
+        return "cancelled" if not counts["failed"] else "failed"
+    return "partial"
+
+
+def batch_summary(
+    batch,
+    jobs: List,
+    manifest_for: Callable[[str], Optional[ProcessingManifest]]
+) -> Dict:
+    """Aggregate progress, per-item status and throughput of a batch."""
+    counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0, "cancelled": 0}
+    items = []
+    progress = 0.0
+    audio_seconds = 0.0
+    started = [job["started_at"] for job in jobs if job["started_at"] is not None]
+
+    for job in jobs:
+        status = job["status"]
+        counts[status] = counts.get(status, 0) + 1
+        manifest = manifest_for(job["job_id"]) if status != "queued" else None
+        item_progress = _item_progress(status, manifest)
+        progress += item_progress
+
+        if status == "completed" and manifest is not None:
+            audio_seconds += manifest.metadata.get("input_duration_seconds", 0.0)
+
+        items.append({
+            "job_id": job["job_id"],
+            "filename": job["filename"],
+            "status": status,
+            "progress": round(item_progress * 100, 1),
+            "error": job["error"],
+            "duration_seconds": (
+                round(job["finished_at"] - job["started_at"], 1)
+                if job["finished_at"] is not None and job["started_at"] is not None else None
+            )
+        })
+
+    total = len(jobs)
+    finished = sum(counts[status] for status in TERMINAL_JOB_STATUSES)
+    finished_at = [job["finished_at"] for job in jobs if job["finished_at"] is not None]
+    end = max(finished_at) if finished == total and finished_at else time.time()
+    elapsed = end - min(started) if started else 0.0
+    items_per_minute = finished / elapsed * 60 if elapsed > 0 else 0.0
+
+    return {
+        "batch_id": batch["batch_id"],
+        "status": _batch_status(counts, total),
+        "priority": batch["priority"],
+        "max_parallel": batch["max_parallel"],
+        "total": total,
+        "counts": counts,
+        "progress": round(progress / total * 100, 1) if total else 100.0,
+        "throughput": {
+            "elapsed_seconds": round(elapsed, 1),
+            "items_per_minute": round(items_per_minute, 2),
+            "audio_seconds_per_second": round(audio_seconds / elapsed, 2) if elapsed > 0 else 0.0,
+            "estimated_remaining_seconds": (
+                round((total - finished) / items_per_minute * 60, 1) if items_per_minute else None
+            )
+        },
+        "items": items
+    }
+
+
+def batch_archive_entries(
+    jobs: List,
+    outputs_for: Callable[[str], Optional[Dict[str, str]]],
+    output_dir: Path
+) -> List[Tuple[Path, str]]:
+    """Archive entries for every completed item, one numbered folder per input file."""
+    entries = []
+    for job in jobs:
+        if job["status"] != "completed":
+            continue
+        job_dir = (output_dir / job["job_id"]).resolve()
+        folder = f"{job['batch_index'] + 1:03d}_{Path(job['filename'] or job['job_id']).stem}"
+        for path in (outputs_for(job["job_id"]) or {}).values():
+            file_path = Path(path).resolve()
+            if not file_path.exists():
+                continue
+            try:
+                arcname = file_path.relative_to(job_dir).as_posix()
+            except ValueError:
+                arcname = file_path.name
+            entries.append((file_path, f"{folder}/{arcname}"))
+    return entries
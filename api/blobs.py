@@ -0,0 +1,70 @@
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from core.storage import evict_lru, link_or_copy
+
+logger = logging.getLogger(__name__)
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def normalize_sha256(value: str) -> str:
+    """Lower-case hex digest; raises ValueError for anything else."""
+    digest = value.strip().lower()
+    if not SHA256_PATTERN.fullmatch(digest):
+        raise ValueError("Expected a hex-encoded SHA-256 digest")
+    return digest
+
+
+class BlobStore:
+    """Uploaded inputs stored by content hash, so a file the server has seen is never uploaded twice.
+
+    Blobs are hardlinks of the uploads that created them and job inputs are
+    hardlinks of blobs, so a blob only takes space of its own once the jobs
+    using it are done. Least recently used blobs are evicted past max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def find(self, sha256: str) -> Optional[Path]:
+        return next(self.directory.glob(f"{sha256}.*"), None)
+
+    def _touch(self, path: Path) -> None:
+        os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+
+    def add(self, path: Path, sha256: str) -> Path:
+        blob = self.directory / f"{sha256}{path.suffix.lower()}"
+        with self._lock:
+            existing = self.find(sha256)
+            if existing is not None:
+                self._touch(existing)
+                return existing
+            link_or_copy(str(path), str(blob))
+            evict_lru(self.directory, self.max_bytes, keep=blob)
+        return blob
+
+    def checkout(self, sha256: str, dest_dir: Path, filename: str) -> Optional[Path]:
+        """Link a stored blob into dest_dir as a job input; None if it is not stored."""
+        with self._lock:
+            blob = self.find(sha256)
+            if blob is None:
+                return None
+            dest = dest_dir / f"{uuid4().hex}_{Path(filename).stem}{blob.suffix}"
+            try:
+                self._touch(blob)
+                link_or_copy(str(blob), str(dest))
+            except FileNotFoundError:
+                # Evicted by another API process in the meantime
+                return None
+        return dest
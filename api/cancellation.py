@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from api.scheduler import JobScheduler
+from core.pipeline import AudioPipeline
+
+logger = logging.getLogger(__name__)
+
+
+async def cancel_response(scheduler: JobScheduler, pipeline: AudioPipeline, job_id: str) -> JSONResponse:
+    """Cancel a queued job outright (200), or ask a running one to stop at its next checkpoint (202)."""
+    outcome = scheduler.cancel(job_id)
+    if outcome is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if outcome == "cancelled":
+        await asyncio.to_thread(pipeline.mark_cancelled, job_id)
+        job = scheduler.store.get_job(job_id)
+        if job["owns_input"]:
+            Path(job["input_path"]).unlink(missing_ok=True)
+        logger.info(f"Cancelled queued job {job_id}")
+        return JSONResponse({"job_id": job_id, "status": outcome})
+
+    if outcome == "cancelling":
+        logger.info(f"Cancellation requested for running job {job_id}")
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": outcome})
+
+    raise HTTPException(status_code=409, detail=f"Job already {scheduler.store.get_job(job_id)['status']}")
@@ -0,0 +1,59 @@
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+# Outputs only change when a job is reprocessed, so clients revalidate instead of refetching
+CACHE_CONTROL = "no-cache"
+
+
+def file_etag(stat: os.stat_result) -> str:
+    # Deduplicated outputs share an inode and therefore an ETag
+    base = f"{stat.st_ino}-{stat.st_size}-{stat.st_mtime_ns}"
+    return f'"{hashlib.md5(base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def file_response(request: Request, path: Path, filename: str, media_type: Optional[str] = None) -> Response:
+    """FileResponse with conditional GET on top of Starlette's Range/If-Range handling.
+
+    Starlette sends the body with the server's pathsend extension when
+    available and otherwise streams it in chunks from a worker thread.
+    """
+    stat = path.stat()
+    etag = file_etag(stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": CACHE_CONTROL
+    }
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat
+    )
@@ -0,0 +1,24 @@
+import json
+
+from fastapi.responses import JSONResponse
+
+from api.jobstore import JobStore
+
+
+def readiness_response(store: JobStore) -> JSONResponse:
+    """200 once a live pipeline worker has loaded and warmed up its model, 503 until then."""
+    workers = [
+        {
+            "worker_id": worker["worker_id"],
+            "ready": worker["ready_at"] is not None,
+            "warmup": json.loads(worker["warmup"]) if worker["warmup"] else None
+        }
+        for worker in store.alive_workers()
+    ]
+    if any(worker["ready"] for worker in workers):
+        status = "ready"
+    elif workers and all(worker["warmup"] and "error" in worker["warmup"] for worker in workers):
+        status = "warmup_failed"
+    else:
+        status = "warming_up"
+    return JSONResponse(status_code=200 if status == "ready" else 503, content={"status": status, "workers": workers})
@@ -0,0 +1,440 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from core.events import EventBus
+from core.metrics import REGISTRY, merge_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Workers heartbeat every few seconds; anything quieter than this is presumed dead
+WORKER_TIMEOUT_SECONDS = 30.0
+EVENT_RETENTION_SECONDS = 24 * 3600
+RETIRED_METRICS_SOURCE = "retired"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    input_path TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    status TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, enqueued_at);
+CREATE TABLE IF NOT EXISTS clients (
+    client_id TEXT PRIMARY KEY,
+    last_served INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scheduler_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_created ON events (created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    job_id TEXT
+);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    max_parallel INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    upload_offset INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    lease_until REAL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    source TEXT PRIMARY KEY,
+    snapshot TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first schema, created on databases that predate them
+ADDED_COLUMNS = {
+    "jobs": [
+        ("batch_id", "TEXT"),
+        ("batch_index", "INTEGER"),
+        ("filename", "TEXT"),
+        ("owns_input", "INTEGER NOT NULL DEFAULT 1"),
+        ("input_sha256", "TEXT"),
+        ("config_key", "TEXT"),
+        ("cancel_requested_at", "REAL"),
+        ("output_keys", "TEXT"),
+        ("estimated_seconds", "REAL")
+    ],
+    "workers": [
+        ("ready_at", "REAL"),
+        ("warmup", "TEXT")
+    ]
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id, batch_index);
+CREATE INDEX IF NOT EXISTS jobs_content ON jobs (input_sha256, config_key, status);
+CREATE INDEX IF NOT EXISTS jobs_recent ON jobs (enqueued_at, job_id);
+CREATE INDEX IF NOT EXISTS jobs_status_recent ON jobs (status, enqueued_at, job_id);
+"""
+
+
+def _encode_snapshot(snapshot: Dict[str, Dict]) -> str:
+    # Label tuples are not valid JSON keys, store samples as [labels, value] pairs
+    return json.dumps({
+        name: {**metric, "samples": [[list(key), value] for key, value in metric["samples"].items()]}
+        for name, metric in snapshot.items()
+    })
+
+
+def _decode_snapshot(text: str) -> Dict[str, Dict]:
+    return {
+        name: {
+            **metric,
+            "labels": tuple(metric["labels"]),
+            "samples": {tuple(key): value for key, value in metric["samples"]}
+        }
+        for name, metric in json.loads(text).items()
+    }
+
+
+class JobStore:
+    """Job queue, events, worker heartbeats and metrics shared through SQLite.
+
+    Every API process and model worker on the host opens the same database
+    file. WAL mode lets readers proceed while a writer commits; writers that
+    must not interleave (admission, claiming) use BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, path: str = ":memory:", busy_timeout: float = 30.0):
+        if path == ":memory:":
+            # Private in-memory database shared by this process's connections (tests)
+            self.uri = f"file:jobstore-{uuid4().hex}?mode=memory&cache=shared"
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.uri = f"file:{os.path.abspath(path)}"
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        # Keeps an in-memory database alive and creates the schema once
+        self._anchor = self._open()
+        self._anchor.executescript(SCHEMA)
+        self._migrate(self._anchor)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.uri, uri=True, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        with self.transaction(conn):
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for name, declaration in columns:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+        conn.executescript(INDEXES)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self, conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Connection]:
+        conn = conn or self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # Jobs
+
+    def get_job(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self.connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+    def count_jobs(self, status: str) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def finish_job(
+        self,
+        job_id: str,
+        status: str,
+        error: Optional[str] = None,
+        output_keys: Optional[List[str]] = None
+    ) -> None:
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, output_keys = ? WHERE job_id = ?",
+            (status, time.time(), error, json.dumps(output_keys) if output_keys is not None else None, job_id)
+        )
+
+    def list_jobs(
+        self,
+        statuses: Sequence[str] = (),
+        since: Optional[float] = None,
+        limit: int = 50,
+        before: Optional[Tuple[float, str]] = None
+    ) -> List[sqlite3.Row]:
+        """Jobs newest first, optionally filtered; before is the (enqueued_at, job_id) of the previous page's last job."""
+        conditions, params = [], []
+        if statuses:
+            conditions.append(f"status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if since is not None:
+            conditions.append("enqueued_at >= ?")
+            params.append(since)
+        if before is not None:
+            # Keyset pagination stays cheap at any depth, unlike OFFSET
+            conditions.append("(enqueued_at, job_id) < (?, ?)")
+            params.extend(before)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        return self.connection.execute(
+            f"SELECT * FROM jobs {where}ORDER BY enqueued_at DESC, job_id DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+
+    def completed_jobs_for(self, input_sha256: str, config_key: str) -> List[str]:
+        """Completed jobs for the same content and pipeline configuration, newest first."""
+        rows = self.connection.execute(
+            "SELECT job_id FROM jobs WHERE input_sha256 = ? AND config_key = ? AND status = 'completed' "
+            "ORDER BY finished_at DESC",
+            (input_sha256, config_key)
+        ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def add_reused_job(
+        self,
+        job_id: str,
+        client_id: str,
+        priority: str,
+        filename: Optional[str],
+        input_sha256: str,
+        config_key: str,
+        output_keys: List[str]
+    ) -> None:
+        """Record a job answered from earlier results; it never ran, so it has no start time."""
+        now = time.time()
+        self.connection.execute(
+            "INSERT INTO jobs (job_id, input_path, client_id, priority, status, enqueued_at, finished_at, "
+            "filename, owns_input, input_sha256, config_key, output_keys) "
+            "VALUES (?, '', ?, ?, 'completed', ?, ?, ?, 0, ?, ?, ?)",
+            (job_id, client_id, priority, now, now, filename, input_sha256, config_key, json.dumps(output_keys))
+        )
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self.connection.execute("SELECT cancel_requested_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row is not None and row[0] is not None
+
+    def running_jobs(self) -> List[sqlite3.Row]:
+        """Running jobs with the pid of the worker running them."""
+        return self.connection.execute(
+            "SELECT j.job_id, j.worker_id, j.started_at, j.cancel_requested_at, w.pid "
+            "FROM jobs j JOIN workers w ON w.worker_id = j.worker_id WHERE j.status = 'running'"
+        ).fetchall()
+
+    def orphaned_jobs(self, alive_worker_ids: List[str]) -> List[sqlite3.Row]:
+        """Running jobs whose worker is no longer alive."""
+        rows = self.connection.execute("SELECT * FROM jobs WHERE status = 'running'").fetchall()
+        return [row for row in rows if row["worker_id"] not in alive_worker_ids]
+
+    # Batches
+
+    def get_batch(self, batch_id: str) -> Optional[sqlite3.Row]:
+        return self.connection.execute("SELECT * FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+
+    def batch_jobs(self, batch_id: str) -> List[sqlite3.Row]:
+        return self.connection.execute(
+            "SELECT * FROM jobs WHERE batch_id = ? ORDER BY batch_index", (batch_id,)
+        ).fetchall()
+
+    # Events
+
+    def add_event(self, job_id: str, event: str, data: Dict) -> int:
+        cursor = self.connection.execute(
+            "INSERT INTO events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, event, json.dumps(data), time.time())
+        )
+        return cursor.lastrowid
+
+    def events_after(self, last_id: int, limit: int = 500) -> List[Tuple[int, str, str, Dict]]:
+        rows = self.connection.execute(
+            "SELECT id, job_id, event, data FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)
+        ).fetchall()
+        return [(row["id"], row["job_id"], row["event"], json.loads(row["data"])) for row in rows]
+
+    def first_event_since(self, timestamp: float) -> int:
+        """Id just before the first event created at or after timestamp."""
+        row = self.connection.execute("SELECT MIN(id) FROM events WHERE created_at >= ?", (timestamp,)).fetchone()
+        if row[0] is not None:
+            return row[0] - 1
+        return self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def prune_events(self, max_age: float = EVENT_RETENTION_SECONDS) -> None:
+        self.connection.execute("DELETE FROM events WHERE created_at < ?", (time.time() - max_age,))
+
+    # Workers
+
+    def register_worker(self, worker_id: str, pid: int) -> None:
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO workers (worker_id, pid, started_at, heartbeat_at, job_id) VALUES (?, ?, ?, ?, NULL)",
+            (worker_id, pid, now, now)
+        )
+
+    def heartbeat(self, worker_id: str, job_id: Optional[str] = None) -> None:
+        self.connection.execute(
+            "UPDATE workers SET heartbeat_at = ?, job_id = ? WHERE worker_id = ?",
+            (time.time(), job_id, worker_id)
+        )
+
+    def set_worker_warmup(self, worker_id: str, warmup: Dict, ready: bool) -> None:
+        """Record a worker's warm-up timings, or error, and whether it is ready for jobs."""
+        self.connection.execute(
+            "UPDATE workers SET warmup = ?, ready_at = ? WHERE worker_id = ?",
+            (json.dumps(warmup), time.time() if ready else None, worker_id)
+        )
+
+    def remove_worker(self, worker_id: str) -> None:
+        self.connection.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def alive_workers(self, timeout: float = WORKER_TIMEOUT_SECONDS) -> List[sqlite3.Row]:
+        return self.connection.execute(
+            "SELECT * FROM workers WHERE heartbeat_at >= ? ORDER BY started_at",
+            (time.time() - timeout,)
+        ).fetchall()
+
+    # Metrics
+
+    def put_metrics(self, source: str, snapshot: Dict[str, Dict]) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO metrics (source, snapshot, updated_at) VALUES (?, ?, ?)",
+            (source, _encode_snapshot(snapshot), time.time())
+        )
+
+    def metrics_snapshots(self, exclude: Optional[str] = None) -> List[Dict[str, Dict]]:
+        rows = self.connection.execute("SELECT source, snapshot FROM metrics").fetchall()
+        return [_decode_snapshot(row["snapshot"]) for row in rows if row["source"] != exclude]
+
+    def retire_metrics(self, source: str) -> None:
+        """Fold a finished process's counters into one row so totals stay monotonic."""
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT source, snapshot FROM metrics WHERE source IN (?, ?)",
+                (source, RETIRED_METRICS_SOURCE)
+            ).fetchall()
+            snapshots = []
+            for row in rows:
+                snapshot = _decode_snapshot(row["snapshot"])
+                # Gauges describe a live process and die with it
+                snapshots.append({k: v for k, v in snapshot.items() if v["type"] != "gauge"})
+            if not snapshots:
+                return
+            conn.execute("DELETE FROM metrics WHERE source = ?", (source,))
+            conn.execute(
+                "INSERT OR REPLACE INTO metrics (source, snapshot, updated_at) VALUES (?, ?, ?)",
+                (RETIRED_METRICS_SOURCE, _encode_snapshot(merge_snapshots(snapshots)), time.time())
+            )
+
+
+def store_event_bus(store: JobStore) -> EventBus:
+    """An EventBus whose events are written to the shared store instead of kept locally."""
+    bus = EventBus(history=0)
+    bus.subscribe(lambda event: store.add_event(event.job_id, event.event, event.data))
+    return bus
+
+
+class StateRelay:
+    """Background thread that feeds shared events into a local EventBus.
+
+    It also publishes this process's metrics so /metrics on any API process
+    sees every process.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        events: EventBus,
+        source: str,
+        poll_seconds: float = 0.25,
+        metrics_seconds: float = 5.0,
+        backlog_seconds: float = 3600.0
+    ):
+        self.store = store
+        self.events = events
+        self.source = source
+        self.poll_seconds = poll_seconds
+        self.metrics_seconds = metrics_seconds
+        self.backlog_seconds = backlog_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="state-relay", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        cursor = self.store.first_event_since(time.time() - self.backlog_seconds)
+        next_metrics = 0.0
+
+        while not self._stop.is_set():
+            try:
+                rows = self.store.events_after(cursor)
+                for event_id, job_id, event, data in rows:
+                    self.events.publish(job_id, event, data, event_id=event_id)
+                    cursor = event_id
+
+                if time.monotonic() >= next_metrics:
+                    self.store.put_metrics(self.source, REGISTRY.snapshot())
+                    next_metrics = time.monotonic() + self.metrics_seconds
+
+                if len(rows) < 500:
+                    self._stop.wait(self.poll_seconds)
+            except sqlite3.Error as e:
+                logger.error(f"State relay failed: {str(e)}")
+                self._stop.wait(1.0)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.store.retire_metrics(self.source)
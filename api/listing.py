@@ -0,0 +1,76 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_statuses(value: Optional[str]) -> List[str]:
+    """Comma-separated job statuses; raises ValueError for unknown ones."""
+    statuses = [item.strip() for item in (value or "").split(",") if item.strip()]
+    unknown = [status for status in statuses if status not in JOB_STATUSES]
+    if unknown:
+        raise ValueError(f"Unknown status: {unknown[0]}. Available: {list(JOB_STATUSES)}")
+    return statuses
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """Unix timestamp or ISO 8601 time (UTC unless it carries an offset)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("since must be a Unix timestamp or an ISO 8601 time")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def encode_cursor(job) -> str:
+    raw = json.dumps([job["enqueued_at"], job["job_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        enqueued_at, job_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(enqueued_at), str(job_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    # Same form as the manifests' created_at
+    return datetime.utcfromtimestamp(value).isoformat() if value is not None else None
+
+
+def _seconds(start: Optional[float], end: Optional[float]) -> Optional[float]:
+    return round(end - start, 1) if start is not None and end is not None else None
+
+
+def job_summary(job) -> Dict:
+    """Compact listing entry built from the job row alone, without reading the manifest."""
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "priority": job["priority"],
+        "batch_id": job["batch_id"],
+        "enqueued_at": _timestamp(job["enqueued_at"]),
+        "started_at": _timestamp(job["started_at"]),
+        "finished_at": _timestamp(job["finished_at"]),
+        "wait_seconds": _seconds(job["enqueued_at"], job["started_at"]),
+        "run_seconds": _seconds(job["started_at"], job["finished_at"]),
+        "estimated_run_seconds": round(job["estimated_seconds"], 1) if job["estimated_seconds"] is not None else None,
+        "output_keys": json.loads(job["output_keys"]) if job["output_keys"] else None,
+        "error": job["error"]
+    }
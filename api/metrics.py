@@ -0,0 +1,81 @@
+import time
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import LATENCY_BUCKETS, REGISTRY
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the last body byte is sent",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS
+)
+REQUEST_BYTES = REGISTRY.counter(
+    "http_request_body_bytes_total", "Request body bytes received (uploads on /process)", ("route",)
+)
+RESPONSE_BYTES = REGISTRY.counter(
+    "http_response_body_bytes_total", "Response body bytes sent (downloads on /download/*)", ("route",)
+)
+
+
+def _route_template(app, scope: Scope) -> str:
+    # Label by route template, never the raw path, to keep label cardinality bounded
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed and counted to the last chunk."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_template(scope["app"], scope)
+        start = time.perf_counter()
+        status = 500
+        received = 0
+        sent = 0
+        declared_length = 0
+        pathsend = False
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message) -> None:
+            nonlocal status, sent, declared_length, pathsend
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-length":
+                        declared_length = int(value)
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend":
+                # The server transfers the file itself, trust the declared length
+                pathsend = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route, status=str(status))
+            if received:
+                REQUEST_BYTES.inc(received, route=route)
+            sent = declared_length if pathsend else sent
+            if sent:
+                RESPONSE_BYTES.inc(sent, route=route)
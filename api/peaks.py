@@ -0,0 +1,65 @@
+import asyncio
+import hashlib
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+from api.downloads import CACHE_CONTROL, file_etag, is_not_modified
+from core.peaks import PeakLevel, analyze_audio, encode_dat, encode_json, level_for_zoom, read_peaks, write_peaks
+
+PEAK_FORMATS = ("json", "dat")
+DEFAULT_PEAK_PIXELS = 1000
+
+
+@lru_cache(maxsize=256)
+def _cached_levels(path: str, mtime_ns: int) -> List[PeakLevel]:
+    return read_peaks(path)
+
+
+def _compute_peaks(peaks_path: Path, track_path: Path) -> None:
+    # Another request may have finished it while this one waited for a thread
+    if not peaks_path.exists():
+        write_peaks(str(peaks_path), analyze_audio(str(track_path)))
+
+
+async def ensure_peaks(peaks_path: Path, track_path: Path) -> Path:
+    """Peaks written by the analysis stage, computed in one streaming pass when missing."""
+    if not peaks_path.exists():
+        # Jobs analysed before peaks were stored, or whose analysis stage has not run yet
+        await asyncio.to_thread(_compute_peaks, peaks_path, track_path)
+    return peaks_path
+
+
+def peaks_response(
+    request: Request,
+    peaks_path: Path,
+    zoom: Optional[int],
+    pixels: int,
+    format: str
+) -> Response:
+    if format not in PEAK_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported peaks format: {format}. Available: {list(PEAK_FORMATS)}")
+    if (zoom is not None and zoom < 1) or pixels < 1:
+        raise HTTPException(status_code=400, detail="zoom and pixels must be positive")
+
+    stat = peaks_path.stat()
+    levels = _cached_levels(str(peaks_path), stat.st_mtime_ns)
+    if zoom is None:
+        base = levels[0]
+        # Whole multiples of the base level merge exactly and never exceed the requested width
+        zoom = max(1, math.ceil(len(base) / pixels)) * base.samples_per_pixel
+    level = level_for_zoom(levels, zoom)
+
+    variant = f"{file_etag(stat)}-{level.samples_per_pixel}-{format}"
+    etag = f'"{hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if format == "dat":
+        return Response(encode_dat(level, level.sample_rate), media_type="application/octet-stream", headers=headers)
+    return JSONResponse(encode_json(level, level.sample_rate), headers=headers)
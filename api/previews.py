@@ -0,0 +1,60 @@
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class PreviewSources:
+    """Full-length uploads kept for preview jobs until they are upgraded.
+
+    Sources are named after their preview job. One that is never upgraded,
+    e.g. because its preview failed or was cancelled, is removed once it is
+    older than expiry_seconds.
+    """
+
+    def __init__(self, directory: str, expiry_seconds: float):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.expiry_seconds = expiry_seconds
+        self.logger = logging.getLogger(__name__)
+
+    def find(self, job_id: str) -> Optional[Path]:
+        return next(self.directory.glob(f"{job_id}.*"), None)
+
+    def keep(self, job_id: str, path: Path) -> Path:
+        self.expire()
+        source = self.directory / f"{job_id}{path.suffix}"
+        os.replace(path, source)
+        # The expiry counts from the preview, not from when the upload was written
+        os.utime(source)
+        return source
+
+    def claim(self, job_id: str, dest: Path) -> Optional[Path]:
+        """Move the source of a preview to dest; None if it was already claimed or has expired.
+
+        Claiming by moving makes concurrent upgrades race safely.
+        """
+        source = self.find(job_id)
+        if source is None:
+            return None
+        try:
+            os.replace(source, dest)
+        except FileNotFoundError:
+            return None
+        return source
+
+    def expire(self) -> int:
+        """Remove sources older than expiry_seconds."""
+        cutoff = time.time() - self.expiry_seconds
+        expired = 0
+        for path in self.directory.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    expired += 1
+            except FileNotFoundError:
+                continue
+        if expired:
+            self.logger.info(f"Expired {expired} preview sources that were never upgraded")
+        return expired
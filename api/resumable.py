@@ -0,0 +1,307 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import HTTPException, Request
+from starlette.requests import ClientDisconnect
+
+from api.jobstore import JobStore
+from api.uploads import PROBE_BYTES, UPLOAD_CHUNK_SIZE, sniff_format
+
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,checksum,termination"
+CHECKSUM_ALGORITHMS = ("sha1", "sha256", "md5")
+PATCH_CONTENT_TYPE = "application/offset+octet-stream"
+# tus status for a chunk whose Upload-Checksum does not match
+CHECKSUM_MISMATCH = 460
+# A PATCH holds its upload for at most this long, so a crashed process cannot block it forever
+LEASE_SECONDS = 600.0
+UPLOAD_EXPIRY_SECONDS = 24 * 3600
+
+
+def parse_metadata(header: str) -> Dict[str, str]:
+    """Decode a tus Upload-Metadata header: comma-separated "key base64value" pairs."""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in header.split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode("utf-8") if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail=f"Invalid Upload-Metadata value for {key}")
+    return metadata
+
+
+def parse_checksum(header: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """Algorithm and digest from a tus Upload-Checksum header ("sha256 <base64 digest>")."""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"Unsupported checksum algorithm: {algorithm}. Available: {list(CHECKSUM_ALGORITHMS)}")
+    try:
+        return algorithm, base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="Upload-Checksum digest must be base64")
+
+
+def _preallocate(path: Path, length: int) -> None:
+    with open(path, "wb") as f:
+        try:
+            # Reserves the blocks up front, so the upload cannot fail halfway on a full disk
+            os.posix_fallocate(f.fileno(), 0, length)
+        except (AttributeError, OSError):
+            f.truncate(length)
+
+
+class ResumableUploads:
+    """Resumable uploads following the tus 1.0 core protocol, creation, checksum and termination.
+
+    Each upload is a preallocated file that chunks are written into at their
+    offset. The offset only advances once a chunk is complete and, when the
+    client sent Upload-Checksum, verified, so an interrupted or corrupted
+    chunk is simply sent again. State lives in the JobStore, so any API
+    process can take the next chunk.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        directory: Path,
+        max_bytes: int,
+        supported_formats: List[str],
+        expiry_seconds: float = UPLOAD_EXPIRY_SECONDS,
+        max_per_client: int = 0,
+        max_client_bytes: int = 0
+    ):
+        self.store = store
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.supported_formats = supported_formats
+        self.expiry_seconds = expiry_seconds
+        self.max_per_client = max_per_client
+        self.max_client_bytes = max_client_bytes
+        self.logger = logging.getLogger(__name__)
+
+    def _path(self, upload: sqlite3.Row) -> Path:
+        return self.directory / f"{upload['upload_id']}{Path(upload['filename']).suffix.lower()}"
+
+    def create(self, length: int, filename: str, client_id: str) -> sqlite3.Row:
+        if length <= 0:
+            raise HTTPException(status_code=400, detail="Upload-Length must be positive")
+        if length > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File too large (max {self.max_bytes // (1024 * 1024)}MB)")
+        if not filename:
+            raise HTTPException(status_code=400, detail="No filename provided")
+        suffix = Path(filename).suffix.lower().lstrip(".")
+        if suffix not in self.supported_formats:
+            raise HTTPException(status_code=415, detail=f"Unsupported audio format: .{suffix}")
+
+        self.expire()
+        now = time.time()
+        upload_id = uuid4().hex
+        with self.store.transaction() as conn:
+            self._check_client(conn, client_id, length, now)
+            conn.execute(
+                "INSERT INTO uploads (upload_id, filename, client_id, length, upload_offset, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (upload_id, Path(filename).name, client_id, length, now, now)
+            )
+        upload = self.get(upload_id)
+        try:
+            _preallocate(self._path(upload), length)
+        except OSError as e:
+            self.store.connection.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+            raise HTTPException(status_code=507, detail=f"Cannot allocate upload: {str(e)}")
+        return upload
+
+    def _check_client(self, conn: sqlite3.Connection, client_id: str, length: int, now: float) -> None:
+        # Preallocated space is taken at creation, so open uploads are limited like queued jobs
+        count, total, oldest = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0), MIN(updated_at) FROM uploads WHERE client_id = ?",
+            (client_id,)
+        ).fetchone()
+        if self.max_client_bytes and total + length > self.max_client_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Open uploads of this client would exceed {self.max_client_bytes // (1024 * 1024)}MB"
+            )
+        if self.max_per_client and count >= self.max_per_client:
+            retry_after = max(1, int(oldest + self.expiry_seconds - now))
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many open uploads for this client (max {self.max_per_client}); finish or delete one",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+    def get(self, upload_id: str) -> sqlite3.Row:
+        upload = self.store.connection.execute("SELECT * FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()
+        if upload is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return upload
+
+    def expires_at(self, upload: sqlite3.Row) -> float:
+        return upload["updated_at"] + self.expiry_seconds
+
+    def _claim(self, upload_id: str, offset: int) -> None:
+        now = time.time()
+        with self.store.transaction() as conn:
+            upload = conn.execute("SELECT * FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()
+            if upload is None:
+                raise HTTPException(status_code=404, detail="Upload not found")
+            if upload["lease_until"] is not None and upload["lease_until"] > now:
+                raise HTTPException(status_code=409, detail="Another chunk of this upload is in progress")
+            if upload["upload_offset"] != offset:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Upload-Offset {offset} does not match the current offset {upload['upload_offset']}",
+                    headers={"Upload-Offset": str(upload["upload_offset"])}
+                )
+            conn.execute("UPDATE uploads SET lease_until = ? WHERE upload_id = ?", (now + LEASE_SECONDS, upload_id))
+
+    def _release(self, upload_id: str, offset: Optional[int] = None) -> None:
+        if offset is None:
+            self.store.connection.execute("UPDATE uploads SET lease_until = NULL WHERE upload_id = ?", (upload_id,))
+        else:
+            self.store.connection.execute(
+                "UPDATE uploads SET lease_until = NULL, upload_offset = ?, updated_at = ? WHERE upload_id = ?",
+                (offset, time.time(), upload_id)
+            )
+
+    async def patch(self, request: Request, upload_id: str) -> int:
+        """Write one chunk at Upload-Offset and return the new offset."""
+        if request.headers.get("content-type", "").split(";")[0].strip() != PATCH_CONTENT_TYPE:
+            raise HTTPException(status_code=415, detail=f"Chunks must be sent as {PATCH_CONTENT_TYPE}")
+        offset_header = request.headers.get("upload-offset", "")
+        if not offset_header.isdigit():
+            raise HTTPException(status_code=400, detail="Missing or invalid Upload-Offset header")
+        offset = int(offset_header)
+        checksum = parse_checksum(request.headers.get("upload-checksum"))
+
+        self._claim(upload_id, offset)
+        upload = self.get(upload_id)
+        digest = hashlib.new(checksum[0]) if checksum else None
+        written = 0
+        complete = False
+        try:
+            with open(self._path(upload), "r+b") as f:
+                f.seek(offset)
+                buffer = bytearray()
+                try:
+                    async for chunk in request.stream():
+                        if offset + written + len(buffer) + len(chunk) > upload["length"]:
+                            raise HTTPException(status_code=413, detail="Chunk extends past Upload-Length")
+                        buffer.extend(chunk)
+                        if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                            written += await asyncio.to_thread(self._write, f, buffer, digest)
+                            buffer = bytearray()
+                    complete = True
+                finally:
+                    if buffer and (complete or digest is None):
+                        written += await asyncio.to_thread(self._write, f, buffer, digest)
+        except ClientDisconnect:
+            # Without a checksum the received bytes are as good as any; with one, the chunk is resent
+            self._release(upload_id, offset + written if digest is None else None)
+            raise HTTPException(status_code=400, detail="Client disconnected")
+        except BaseException:
+            self._release(upload_id)
+            raise
+
+        if digest is not None and digest.digest() != checksum[1]:
+            self._release(upload_id)
+            raise HTTPException(status_code=CHECKSUM_MISMATCH, detail="Checksum mismatch")
+        end = offset + written
+        # The format probe runs once its bytes are in, or at the end for files shorter than it
+        if offset < PROBE_BYTES <= end or (offset < end == upload["length"] < PROBE_BYTES):
+            with open(self._path(upload), "rb") as f:
+                header = f.read(min(PROBE_BYTES, end))
+            try:
+                self._check_probe(upload, header)
+            except HTTPException:
+                self._release(upload_id)
+                raise
+
+        self._release(upload_id, end)
+        return end
+
+    def _write(self, f: BinaryIO, data: bytearray, digest) -> int:
+        f.write(data)
+        if digest is not None:
+            digest.update(data)
+        return len(data)
+
+    def _check_probe(self, upload: sqlite3.Row, header: bytes) -> None:
+        suffix = Path(upload["filename"]).suffix.lower().lstrip(".")
+        detected = sniff_format(header)
+        if detected is None:
+            raise HTTPException(status_code=415, detail=f"{upload['filename']}: content is not a supported audio format")
+        if detected != suffix:
+            raise HTTPException(status_code=415, detail=f"{upload['filename']}: content ({detected}) does not match extension .{suffix}")
+
+    def complete(self, upload_id: str, dest_dir: Path) -> Tuple[Path, str]:
+        """Hand over a fully received upload as a file in dest_dir; it can be finalized once."""
+        upload = self.get(upload_id)
+        if upload["upload_offset"] < upload["length"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete ({upload['upload_offset']} of {upload['length']} bytes)",
+                headers={"Upload-Offset": str(upload["upload_offset"])}
+            )
+        with open(self._path(upload), "rb") as f:
+            # Chunks that were cut off may have skipped the probe
+            self._check_probe(upload, f.read(PROBE_BYTES))
+
+        cursor = self.store.connection.execute(
+            "DELETE FROM uploads WHERE upload_id = ? AND upload_offset = length AND "
+            "(lease_until IS NULL OR lease_until < ?)",
+            (upload_id, time.time())
+        )
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=409, detail="Upload is already being finalized")
+
+        dest = dest_dir / f"{uuid4().hex}_{upload['filename']}"
+        os.replace(self._path(upload), dest)
+        self.logger.info(f"Resumable upload {upload_id} of {upload['filename']} complete ({upload['length'] / (1024 * 1024):.1f}MB)")
+        return dest, upload["filename"]
+
+    def restore(self, upload: sqlite3.Row, path: Path) -> None:
+        """Undo complete() for an input the queue could not take, so finalize can be retried."""
+        os.replace(path, self._path(upload))
+        row = {**dict(upload), "lease_until": None, "updated_at": time.time()}
+        self.store.connection.execute(
+            f"INSERT OR REPLACE INTO uploads ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+            tuple(row.values())
+        )
+        self.logger.info(f"Resumable upload {upload['upload_id']} restored after the queue refused it")
+
+    def delete(self, upload_id: str) -> None:
+        upload = self.get(upload_id)
+        if upload["lease_until"] is not None and upload["lease_until"] > time.time():
+            raise HTTPException(status_code=409, detail="A chunk of this upload is in progress")
+        self.store.connection.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+        self._path(upload).unlink(missing_ok=True)
+
+    def expire(self) -> int:
+        """Remove uploads idle for longer than expiry_seconds."""
+        cutoff = time.time() - self.expiry_seconds
+        expired = self.store.connection.execute(
+            "SELECT * FROM uploads WHERE updated_at < ? AND (lease_until IS NULL OR lease_until < ?)",
+            (cutoff, time.time())
+        ).fetchall()
+        for upload in expired:
+            self.store.connection.execute("DELETE FROM uploads WHERE upload_id = ?", (upload["upload_id"],))
+            self._path(upload).unlink(missing_ok=True)
+        if expired:
+            self.logger.info(f"Expired {len(expired)} idle resumable uploads")
+        return len(expired)
@@ -0,0 +1,298 @@
+import math
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from api.jobstore import JobStore
+
+PRIORITIES = ("interactive", "batch")
+DEFAULT_PRIORITY = "interactive"
+# Dispatches given to interactive jobs for every batch job while both are waiting
+INTERACTIVE_WEIGHT = 3
+# Finished jobs averaged for wait and run time estimates
+HISTORY_WINDOW = 50
+
+
+class QueueFullError(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class QueuedJob:
+    job_id: str
+    input_path: str
+    client_id: str = "anonymous"
+    priority: str = DEFAULT_PRIORITY
+    enqueued_at: float = field(default_factory=time.time)
+    filename: Optional[str] = None
+    batch_id: Optional[str] = None
+    # False for server-local batch inputs, which must survive the job
+    owns_input: bool = True
+    # Content hash and pipeline configuration, so later submissions of the same file can reuse the outputs
+    input_sha256: Optional[str] = None
+    config_key: Optional[str] = None
+    # Worker seconds predicted from the input's duration, None when it could not be probed
+    estimated_seconds: Optional[float] = None
+
+
+class JobScheduler:
+    """Bounded admission queue with priority classes and per-client fair share.
+
+    Interactive jobs are preferred over batch jobs by INTERACTIVE_WEIGHT to 1,
+    so batch work still drains under sustained interactive load. Within a
+    class, the least recently served client goes first so one client's burst
+    cannot hold everyone else back. Among that client's jobs (and among
+    clients never served), shorter jobs go first: jobs are ordered by
+    enqueue time plus estimated run time, so a long job is only overtaken
+    by shorter ones submitted less than the difference later and never
+    starves. State lives in the JobStore, so every API
+    process admits into, and every model worker claims from, the same queue.
+
+    Batch items are held outside the depth and per-client limits; instead at
+    most max_parallel items of a batch run at once, and the batch competes
+    for workers as its client's share.
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        max_depth: int = 32,
+        max_per_client: int = 8,
+        workers: int = 1,
+        default_run_seconds: float = 60.0
+    ):
+        self.store = store if store is not None else JobStore()
+        self.max_depth = max_depth
+        self.max_per_client = max_per_client
+        self.workers = max(1, workers)
+        self.default_run_seconds = default_run_seconds
+
+    def _worker_count(self) -> int:
+        return len(self.store.alive_workers()) or self.workers
+
+    def _avg_seconds(self, start_column: str, end_column: str) -> Optional[float]:
+        row = self.store.connection.execute(
+            f"SELECT AVG({end_column} - {start_column}) FROM ("
+            f"SELECT {start_column}, {end_column} FROM jobs WHERE {end_column} IS NOT NULL AND {start_column} IS NOT NULL "
+            # A cancelled run says nothing about how long a job takes
+            f"AND status != 'cancelled' "
+            f"ORDER BY {end_column} DESC LIMIT ?)",
+            (HISTORY_WINDOW,)
+        ).fetchone()
+        return row[0]
+
+    def avg_run_seconds(self) -> float:
+        return self._avg_seconds("started_at", "finished_at") or self.default_run_seconds
+
+    def _retry_after(self) -> int:
+        # A slot frees up roughly once per average run across all workers
+        return max(1, math.ceil(self.avg_run_seconds() / self._worker_count()))
+
+    def check_priority(self, priority: str) -> None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Available: {list(PRIORITIES)}")
+
+    def _check(self, conn: sqlite3.Connection, client_id: str, priority: str) -> None:
+        self.check_priority(priority)
+
+        # A batch with queued items takes one slot, however many items it holds
+        depth = conn.execute(
+            "SELECT COUNT(DISTINCT COALESCE(batch_id, job_id)) FROM jobs WHERE status = 'queued'"
+        ).fetchone()[0]
+        if depth >= self.max_depth:
+            raise QueueFullError("Processing queue is full", self._retry_after())
+
+        client_depth = conn.execute(
+            "SELECT COUNT(DISTINCT COALESCE(batch_id, job_id)) FROM jobs WHERE status = 'queued' AND client_id = ?",
+            (client_id,)
+        ).fetchone()[0]
+        if client_depth >= self.max_per_client:
+            raise QueueFullError(
+                f"Too many queued jobs for this client (max {self.max_per_client})",
+                self._retry_after()
+            )
+
+    def check_admission(self, client_id: str, priority: str) -> None:
+        """Raise ValueError for an unknown priority or QueueFullError when saturated."""
+        self._check(self.store.connection, client_id, priority)
+
+    def admit(self, job: QueuedJob) -> int:
+        """Queue a job and return its position (1 = next)."""
+        with self.store.transaction() as conn:
+            self._check(conn, job.client_id, job.priority)
+            self._insert(conn, job)
+            priorities = PRIORITIES if job.priority == "batch" else ("interactive",)
+            return conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND priority IN ({','.join('?' * len(priorities))})",
+                priorities
+            ).fetchone()[0]
+
+    def _insert(self, conn: sqlite3.Connection, job: QueuedJob, batch_index: Optional[int] = None) -> None:
+        conn.execute(
+            "INSERT INTO jobs (job_id, input_path, client_id, priority, status, enqueued_at, "
+            "filename, batch_id, batch_index, owns_input, input_sha256, config_key, estimated_seconds) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.job_id, job.input_path, job.client_id, job.priority, job.enqueued_at, job.filename,
+                job.batch_id, batch_index, int(job.owns_input), job.input_sha256, job.config_key, job.estimated_seconds
+            )
+        )
+
+    def admit_batch(self, batch_id: str, jobs: List[QueuedJob], client_id: str, max_parallel: int) -> None:
+        """Queue all items of a batch atomically, at batch priority; raises QueueFullError when saturated."""
+        if max_parallel < 1:
+            raise ValueError("max_parallel must be at least 1")
+        with self.store.transaction() as conn:
+            self._check(conn, client_id, "batch")
+            conn.execute(
+                "INSERT INTO batches (batch_id, client_id, priority, max_parallel, created_at) VALUES (?, ?, ?, ?, ?)",
+                (batch_id, client_id, "batch", max_parallel, time.time())
+            )
+            for index, job in enumerate(jobs):
+                job.batch_id, job.client_id, job.priority = batch_id, client_id, "batch"
+                self._insert(conn, job, batch_index=index)
+
+    def _state(self, conn: sqlite3.Connection, key: str) -> int:
+        row = conn.execute("SELECT value FROM scheduler_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_state(self, conn: sqlite3.Connection, key: str, value: int) -> None:
+        conn.execute("INSERT OR REPLACE INTO scheduler_state (key, value) VALUES (?, ?)", (key, value))
+
+    def next(self, worker_id: Optional[str] = None) -> Optional[QueuedJob]:
+        """Claim the next job for a worker and mark it running."""
+        default_seconds = self.avg_run_seconds()
+        with self.store.transaction() as conn:
+            streak = self._state(conn, "interactive_streak")
+            order = ("batch", "interactive") if streak >= INTERACTIVE_WEIGHT else PRIORITIES
+
+            for priority in order:
+                row = conn.execute(
+                    "SELECT j.* FROM jobs j LEFT JOIN clients c ON c.client_id = j.client_id "
+                    "LEFT JOIN batches b ON b.batch_id = j.batch_id "
+                    "WHERE j.status = 'queued' AND j.priority = ? AND (j.batch_id IS NULL OR ("
+                    "SELECT COUNT(*) FROM jobs r WHERE r.batch_id = j.batch_id AND r.status = 'running'"
+                    ") < b.max_parallel) "
+                    "ORDER BY COALESCE(c.last_served, 0), j.enqueued_at + COALESCE(j.estimated_seconds, ?) LIMIT 1",
+                    (priority, default_seconds)
+                ).fetchone()
+                if row is None:
+                    continue
+
+                served = self._state(conn, "served") + 1
+                self._set_state(conn, "served", served)
+                self._set_state(conn, "interactive_streak", streak + 1 if priority == "interactive" else 0)
+                conn.execute(
+                    "INSERT OR REPLACE INTO clients (client_id, last_served) VALUES (?, ?)",
+                    (row["client_id"], served)
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, worker_id = ? WHERE job_id = ?",
+                    (time.time(), worker_id, row["job_id"])
+                )
+                return QueuedJob(
+                    job_id=row["job_id"],
+                    input_path=row["input_path"],
+                    client_id=row["client_id"],
+                    priority=row["priority"],
+                    enqueued_at=row["enqueued_at"],
+                    filename=row["filename"],
+                    batch_id=row["batch_id"],
+                    owns_input=bool(row["owns_input"]),
+                    input_sha256=row["input_sha256"],
+                    config_key=row["config_key"],
+                    estimated_seconds=row["estimated_seconds"]
+                )
+            return None
+
+    def complete(
+        self,
+        job_id: str,
+        status: str,
+        error: Optional[str] = None,
+        output_keys: Optional[List[str]] = None
+    ) -> None:
+        self.store.finish_job(job_id, status, error, output_keys)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job: queued jobs are cancelled outright, running ones are asked to stop.
+
+        Returns "cancelled" when this call cancelled the job, "cancelling",
+        "finished" for a job that had already ended (cancelled included), or
+        None for an unknown job.
+        """
+        now = time.time()
+        with self.store.transaction() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "queued":
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ?, cancel_requested_at = ? WHERE job_id = ?",
+                    (now, now, job_id)
+                )
+                return "cancelled"
+            if row["status"] == "running":
+                conn.execute(
+                    "UPDATE jobs SET cancel_requested_at = COALESCE(cancel_requested_at, ?) WHERE job_id = ?",
+                    (now, job_id)
+                )
+                return "cancelling"
+            return "finished"
+
+    def estimated_wait(self, position: int) -> float:
+        return round(math.ceil(position / self._worker_count()) * self.avg_run_seconds(), 1)
+
+    def estimated_wait_for(self, job_id: str) -> float:
+        """Seconds until a queued job starts: the estimated work ahead of it, spread over the workers.
+
+        Work ahead is what remains of running jobs plus the queued jobs that
+        would be dispatched first, judged by the same shortest-job-first key.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] != "queued":
+            return 0.0
+
+        default_seconds = self.avg_run_seconds()
+        priorities = PRIORITIES if job["priority"] == "batch" else ("interactive",)
+        key = job["enqueued_at"] + (job["estimated_seconds"] if job["estimated_seconds"] is not None else default_seconds)
+        conn = self.store.connection
+        queued = conn.execute(
+            f"SELECT COALESCE(SUM(COALESCE(estimated_seconds, ?)), 0) FROM jobs WHERE status = 'queued' "
+            f"AND job_id != ? AND priority IN ({','.join('?' * len(priorities))}) "
+            f"AND enqueued_at + COALESCE(estimated_seconds, ?) <= ?",
+            (default_seconds, job_id, *priorities, default_seconds, key)
+        ).fetchone()[0]
+        running = conn.execute(
+            "SELECT COALESCE(SUM(MAX(COALESCE(estimated_seconds, ?) - (? - started_at), 0)), 0) "
+            "FROM jobs WHERE status = 'running'",
+            (default_seconds, time.time())
+        ).fetchone()[0]
+        return round((queued + running) / self._worker_count(), 1)
+
+    def __len__(self) -> int:
+        return self.store.count_jobs("queued")
+
+    def stats(self) -> Dict:
+        conn = self.store.connection
+        by_priority = dict.fromkeys(PRIORITIES, 0)
+        for row in conn.execute("SELECT priority, COUNT(*) FROM jobs WHERE status = 'queued' GROUP BY priority"):
+            by_priority[row[0]] = row[1]
+        depth = sum(by_priority.values())
+        oldest, clients = conn.execute(
+            "SELECT MIN(enqueued_at), COUNT(DISTINCT client_id) FROM jobs WHERE status = 'queued'"
+        ).fetchone()
+
+        return {
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "by_priority": by_priority,
+            "clients": clients,
+            "oldest_wait_seconds": round(time.time() - oldest, 1) if oldest is not None else 0.0,
+            "avg_wait_seconds": round(self._avg_seconds("enqueued_at", "started_at") or 0.0, 1),
+            "avg_run_seconds": round(self.avg_run_seconds(), 1),
+            "estimated_wait_seconds": self.estimated_wait(depth)
+        }
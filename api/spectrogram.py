@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+from uuid import uuid4
+
+import numpy as np
+import soundfile as sf
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+from api.downloads import CACHE_CONTROL, is_not_modified
+from core.metrics import CACHE_REQUESTS
+from core.spectrogram import FREQUENCY_SCALES, TileGrid, compute_spectrogram, encode_png, render_tile, tile_time_range
+from core.storage import evict_lru
+
+# Only held while a track's spectrogram is being computed
+_compute_locks: Dict[str, asyncio.Lock] = {}
+
+
+class TileCache:
+    """Disk cache of spectrograms and their rendered tiles with least-recently-used eviction.
+
+    Spectrograms are keyed by the track file and its mtime, tiles by the
+    spectrogram file, its mtime and the tile coordinates, so a changed track
+    never serves stale tiles. Both count towards max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+        self.logger = logging.getLogger(__name__)
+
+    def tile_path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.png"
+
+    def spectrogram_path(self, track_path: Path) -> Path:
+        stat = track_path.stat()
+        key = f"{track_path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}"
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.npy"
+
+    def touch(self, path: Path) -> None:
+        # Recency lives in atime, set explicitly because many filesystems mount noatime
+        os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+
+    def get(self, path: Path) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+            self.touch(path)
+        except FileNotFoundError:
+            CACHE_REQUESTS.inc(cache="spectrogram_tile", result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache="spectrogram_tile", result="hit")
+        return data
+
+    def put(self, path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self.added(path, len(data))
+
+    def added(self, path: Path, size: int) -> None:
+        """Account for a file of size bytes just written at path, evicting older ones past max_bytes."""
+        with self._lock:
+            # Scanning the directory on every write would dominate, so track the size and scan only to evict
+            if self._total is None:
+                self._total = evict_lru(self.directory, self.max_bytes, keep=path)
+            else:
+                self._total += size
+                if self._total > self.max_bytes:
+                    self._total = evict_lru(self.directory, self.max_bytes, keep=path)
+
+
+@lru_cache(maxsize=64)
+def _load_spectrogram(path: str, mtime_ns: int) -> np.ndarray:
+    return np.load(path, mmap_mode="r")
+
+
+async def ensure_spectrogram(cache: TileCache, track_path: Path) -> Path:
+    """Spectrogram of a track in the tile cache, computed in a streaming pass whenever it is missing."""
+    spec_path = cache.spectrogram_path(track_path)
+    try:
+        cache.touch(spec_path)
+        return spec_path
+    except FileNotFoundError:
+        pass
+
+    # Concurrent tile requests for a new track in this process share one computation
+    key = str(spec_path)
+    lock = _compute_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            if not spec_path.exists():
+                await asyncio.to_thread(compute_spectrogram, str(track_path), str(spec_path))
+                cache.added(spec_path, spec_path.stat().st_size)
+    finally:
+        # Requests still waiting hold the lock themselves and find the file on wakeup
+        if _compute_locks.get(key) is lock:
+            del _compute_locks[key]
+    return spec_path
+
+
+def _render(spec: np.ndarray, grid: TileGrid, zoom: int, x: int, scale: str) -> bytes:
+    return encode_png(render_tile(spec, grid, zoom, x, scale))
+
+
+async def tile_response(
+    request: Request,
+    cache: TileCache,
+    spec_path: Path,
+    track_path: Path,
+    zoom: Optional[int],
+    x: int,
+    scale: str
+) -> Response:
+    if scale not in FREQUENCY_SCALES:
+        raise HTTPException(status_code=400, detail=f"Unsupported frequency scale: {scale}. Available: {list(FREQUENCY_SCALES)}")
+
+    stat = spec_path.stat()
+    spec = _load_spectrogram(str(spec_path), stat.st_mtime_ns)
+    grid = TileGrid(frames=spec.shape[0], sample_rate=sf.info(str(track_path)).samplerate)
+    zoom = 0 if zoom is None else zoom
+    try:
+        grid.check(zoom, x)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    key = f"{spec_path.resolve()}|{stat.st_mtime_ns}|{zoom}|{x}|{scale}"
+    etag = f'"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+    start, end = tile_time_range(grid, zoom, x)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL,
+        "X-Tile-Start": f"{start:.3f}",
+        "X-Tile-End": f"{end:.3f}",
+        "X-Tile-Count": str(grid.tile_count(zoom)),
+        "X-Max-Zoom": str(grid.max_zoom)
+    }
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    path = cache.tile_path(key)
+    data = cache.get(path)
+    if data is None:
+        data = await asyncio.to_thread(_render, spec, grid, zoom, x, scale)
+        cache.put(path, data)
+    return Response(data, media_type="image/png", headers=headers)
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from typing import AsyncIterator
+
+from fastapi import Request
+
+from core.events import TERMINAL_STATUSES, EventBus, JobEvent
+from core.pipeline import ProcessingManifest
+
+HEARTBEAT_SECONDS = 15.0
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop reverse proxies from buffering the stream
+    "X-Accel-Buffering": "no"
+}
+
+
+def _snapshot(manifest: ProcessingManifest) -> str:
+    payload = json.dumps({
+        "job_id": manifest.job_id,
+        "status": manifest.status,
+        "stages": [s.to_dict() for s in manifest.stages],
+        "outputs": manifest.outputs
+    })
+    return f"event: snapshot\ndata: {payload}\n\n"
+
+
+async def job_event_stream(
+    request: Request,
+    events: EventBus,
+    manifest: ProcessingManifest,
+    last_event_id: int = 0
+) -> AsyncIterator[str]:
+    """Yield SSE frames for one job: a manifest snapshot, missed events, then live ones.
+
+    The stream ends after the job's completed/failed status event.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def deliver(event: JobEvent) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    # Subscribe before replaying history so nothing published in between is lost
+    unsubscribe = events.subscribe(deliver, job_id=manifest.job_id)
+    try:
+        yield f"retry: 3000\n\n{_snapshot(manifest)}"
+
+        sent_id = last_event_id
+        for event in events.history(manifest.job_id, after_id=last_event_id):
+            sent_id = event.id
+            yield event.to_sse()
+            if event.is_terminal:
+                return
+
+        if manifest.status in TERMINAL_STATUSES:
+            return
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+
+            if event.id <= sent_id:
+                continue
+            sent_id = event.id
+            yield event.to_sse()
+            if event.is_terminal:
+                return
+    finally:
+        unsubscribe()
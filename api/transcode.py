@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from core.metrics import CACHE_REQUESTS
+from core.storage import evict_lru
+
+logger = logging.getLogger(__name__)
+
+BLOCK_FRAMES = 65536
+STREAM_CHUNK_SIZE = 256 * 1024
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+@dataclass(frozen=True)
+class TranscodeFormat:
+    name: str
+    container: str
+    subtype: str
+    media_type: str
+    extension: str
+    # kbps; None for lossless formats, which ignore the bitrate
+    default_bitrate: Optional[int] = None
+    min_bitrate: Optional[int] = None
+    max_bitrate: Optional[int] = None
+
+    def compression_level(self, bitrate: int, channels: int) -> Optional[float]:
+        # libsndfile takes a 0-1 compression level and maps it linearly onto the codec's bitrate range
+        if self.name == "mp3":
+            level = (320 - bitrate) / 288
+        elif self.name == "opus":
+            level = (256 - bitrate / channels) / 250
+        else:
+            return None
+        return min(max(level, 0.0), 1.0)
+
+
+TRANSCODE_FORMATS: Dict[str, TranscodeFormat] = {
+    "wav": TranscodeFormat("wav", "WAV", "PCM_16", "audio/wav", ".wav"),
+    "flac": TranscodeFormat("flac", "FLAC", "PCM_16", "audio/flac", ".flac"),
+    "mp3": TranscodeFormat("mp3", "MP3", "MPEG_LAYER_III", "audio/mpeg", ".mp3", 192, 32, 320),
+    "opus": TranscodeFormat("opus", "OGG", "OPUS", "audio/ogg", ".opus", 128, 12, 512)
+}
+FORMAT_ALIASES = {"ogg": "opus"}
+
+
+def resolve_format(name: str, bitrate: Optional[int]) -> Tuple[TranscodeFormat, Optional[int]]:
+    """Look up a delivery format and clamp the bitrate to what it supports; raises ValueError."""
+    spec = TRANSCODE_FORMATS.get(FORMAT_ALIASES.get(name.lower(), name.lower()))
+    if spec is None:
+        raise ValueError(f"Unsupported format: {name}. Available: {sorted([*TRANSCODE_FORMATS, *FORMAT_ALIASES])}")
+    if spec.default_bitrate is None:
+        return spec, None
+    if bitrate is None:
+        return spec, spec.default_bitrate
+    return spec, min(max(bitrate, spec.min_bitrate), spec.max_bitrate)
+
+
+def _wav16_header(frames: int, channels: int, sr: int) -> bytes:
+    # Sizes are known up front, so the header is final even while the file is still being written
+    data_bytes = frames * channels * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, channels, sr, sr * channels * 2, channels * 2, 16,
+        b"data", data_bytes
+    )
+
+
+def transcode(source: Path, dest: BinaryIO, spec: TranscodeFormat, bitrate: Optional[int] = None) -> None:
+    """Encode source into dest block by block, so the output grows while it is produced."""
+    with sf.SoundFile(str(source)) as reader:
+        channels, sr = reader.channels, reader.samplerate
+
+        if spec.name == "wav":
+            dest.write(_wav16_header(reader.frames, channels, sr))
+            for block in reader.blocks(BLOCK_FRAMES, dtype="float32", always_2d=True):
+                dest.write((np.clip(block, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+                dest.flush()
+            return
+
+        out_sr = sr
+        resampler = None
+        if spec.name == "opus" and sr not in OPUS_SAMPLE_RATES:
+            out_sr = 48000
+            resampler = soxr.ResampleStream(sr, out_sr, channels, dtype="float32")
+
+        level = spec.compression_level(bitrate, channels) if bitrate else None
+        with sf.SoundFile(
+            dest, "w",
+            samplerate=out_sr,
+            channels=channels,
+            format=spec.container,
+            subtype=spec.subtype,
+            compression_level=level,
+            bitrate_mode="CONSTANT" if spec.name == "mp3" else None
+        ) as writer:
+            for block in reader.blocks(BLOCK_FRAMES, dtype="float32", always_2d=True):
+                if resampler is not None:
+                    block = resampler.resample_chunk(block)
+                writer.write(np.clip(block, -1.0, 1.0))
+                dest.flush()
+            if resampler is not None:
+                writer.write(np.clip(resampler.resample_chunk(np.zeros((0, channels), dtype="float32"), last=True), -1.0, 1.0))
+
+
+@dataclass
+class _Encoding:
+    path: Path
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[Exception] = None
+
+
+class TranscodeCache:
+    """Disk cache of transcoded tracks with least-recently-used eviction.
+
+    A miss starts one background encode per key. Every request for that key
+    reads the partially written file as it grows, so the first bytes go out
+    while the rest is still being encoded. Entries are keyed by track,
+    format, bitrate and the source's size and mtime, so reprocessed jobs
+    never get stale audio.
+
+    Lossy and FLAC headers are completed when the encoder closes; a reader
+    that streams the file mid-encode gets the initial header (FLAC total
+    samples and MD5 marked unknown), which decoders accept.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._encoding: Dict[str, _Encoding] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def cache_path(self, source: Path, spec: TranscodeFormat, bitrate: Optional[int]) -> Path:
+        stat = source.stat()
+        key = f"{source.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{spec.name}|{bitrate}"
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return self.directory / f"{digest}{spec.extension}"
+
+    def lookup(self, path: Path) -> bool:
+        """True when path is fully cached; marks it recently used."""
+        try:
+            # Recency lives in atime, set explicitly; mtime stays put because it feeds the ETag
+            os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+        except FileNotFoundError:
+            return False
+        CACHE_REQUESTS.inc(cache="transcode", result="hit")
+        return True
+
+    def stream(self, source: Path, path: Path, spec: TranscodeFormat, bitrate: Optional[int]) -> Iterator[bytes]:
+        """Start (or join) the encode for path and yield its bytes as they are written."""
+        with self._lock:
+            encoding = self._encoding.get(str(path))
+            if encoding is None:
+                CACHE_REQUESTS.inc(cache="transcode", result="miss")
+                encoding = _Encoding(path.with_name(f".{path.name}.{uuid4().hex}.part"))
+                encoding.path.touch()
+                self._encoding[str(path)] = encoding
+                threading.Thread(
+                    target=self._encode,
+                    args=(source, path, encoding, spec, bitrate),
+                    name="transcode",
+                    daemon=True
+                ).start()
+            # Opened under the lock, before the finished file can be renamed away
+            handle = open(encoding.path, "rb")
+
+        return self._tail(handle, encoding)
+
+    def _encode(self, source: Path, path: Path, encoding: _Encoding, spec: TranscodeFormat, bitrate: Optional[int]) -> None:
+        try:
+            with open(encoding.path, "r+b") as dest:
+                transcode(source, dest, spec, bitrate)
+        except Exception as e:
+            self.logger.error(f"Transcoding {source.name} to {spec.name} failed: {str(e)}")
+            encoding.error = e
+            with self._lock:
+                self._encoding.pop(str(path), None)
+            encoding.path.unlink(missing_ok=True)
+            encoding.done.set()
+            return
+
+        with self._lock:
+            os.replace(encoding.path, path)
+            self._encoding.pop(str(path), None)
+        self.logger.info(f"Transcoded {source.name} to {spec.name} ({path.stat().st_size / (1024 * 1024):.1f}MB)")
+        try:
+            self.evict(keep=path)
+        finally:
+            encoding.done.set()
+
+    def _tail(self, handle: BinaryIO, encoding: _Encoding) -> Iterator[bytes]:
+        # The handle stays valid after the finished file is renamed into place
+        with handle as f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                    continue
+                if encoding.done.is_set():
+                    chunk = f.read()
+                    if chunk:
+                        yield chunk
+                        continue
+                    if encoding.error is not None:
+                        raise encoding.error
+                    return
+                encoding.done.wait(0.05)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        evict_lru(self.directory, self.max_bytes, keep=keep)
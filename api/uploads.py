@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+PROBE_BYTES = 12
+# Multipart boundaries and part headers on top of the file body
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """Identify an audio container from its first bytes."""
+    if len(header) >= 12 and header[:4] in (b"RIFF", b"RIFX", b"RF64") and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[:3] == b"ID3" or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+class _FilePartReceiver:
+    """Multipart callbacks that route parts named field_name into a list of pending chunks.
+
+    Pending chunks are tagged with the index of the file part they belong to.
+    """
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.filenames: List[str] = []
+        self.pending: List[Tuple[int, bytes]] = []
+        self.current: Optional[int] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        }
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name == self.field_name:
+            self.current = len(self.filenames)
+            self.filenames.append(options.get(b"filename", b"").decode("utf-8", "replace"))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self.current is not None:
+            self.pending.append((self.current, data[start:end]))
+
+    def _on_part_end(self):
+        self.current = None
+
+
+@dataclass
+class _IncomingFile:
+    filename: str
+    part_path: Path
+    handle: BinaryIO
+    received: int = 0
+    probe: bytes = b""
+    probed: bool = False
+    buffer: bytearray = field(default_factory=bytearray)
+    digest: Any = field(default_factory=hashlib.sha256)
+
+    def flush(self) -> None:
+        # Hashing rides along with the disk write, so the content hash costs no extra pass
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.handle.write(data)
+        self.digest.update(data)
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.filename).suffix.lower().lstrip(".")
+
+    def check_probe(self) -> None:
+        detected = sniff_format(self.probe)
+        if detected is None:
+            raise HTTPException(status_code=415, detail=f"{self.filename}: content is not a supported audio format")
+        if detected != self.suffix:
+            raise HTTPException(
+                status_code=415,
+                detail=f"{self.filename}: content ({detected}) does not match extension .{self.suffix}"
+            )
+        self.probed = True
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+
+
+async def receive_uploads(
+    request: Request,
+    dest_dir: Path,
+    max_bytes: int,
+    supported_formats: List[str],
+    field_name: str = "file",
+    max_files: int = 1,
+    max_total_bytes: Optional[int] = None
+) -> List[Tuple[Path, str, str]]:
+    """Stream every multipart part named field_name to its own unique file.
+
+    Size limits (max_bytes per file, max_total_bytes per request) and a
+    format probe are enforced while the body arrives, so bad uploads are
+    rejected without reading the rest of the request. Returns the stored
+    paths with the client's filenames and the content's SHA-256, in upload
+    order.
+    """
+    max_total_bytes = max_total_bytes or max_bytes
+    content_type = request.headers.get("content-type", "")
+    mime, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if mime != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data upload")
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_total_bytes + MULTIPART_OVERHEAD_BYTES * max_files:
+        raise _too_large(max_total_bytes)
+
+    receiver = _FilePartReceiver(field_name)
+    parser = MultipartParser(boundary, receiver.callbacks())
+    files: List[_IncomingFile] = []
+    results: List[Tuple[Path, str, str]] = []
+    total = 0
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+
+            for filename in receiver.filenames[len(files):]:
+                if len(files) >= max_files:
+                    raise HTTPException(status_code=400, detail=f"Too many files (max {max_files})")
+                if not filename:
+                    raise HTTPException(status_code=400, detail="No filename provided")
+                suffix = Path(filename).suffix.lower().lstrip(".")
+                if suffix not in supported_formats:
+                    raise HTTPException(status_code=415, detail=f"Unsupported audio format: .{suffix}")
+                part_path = dest_dir / f".{uuid4().hex}.part"
+                files.append(_IncomingFile(filename, part_path, open(part_path, "wb")))
+
+            for index, data in receiver.pending:
+                incoming = files[index]
+                incoming.received += len(data)
+                total += len(data)
+                if incoming.received > max_bytes:
+                    raise _too_large(max_bytes)
+                if total > max_total_bytes:
+                    raise _too_large(max_total_bytes)
+
+                if not incoming.probed:
+                    incoming.probe += data[:PROBE_BYTES - len(incoming.probe)]
+                    if len(incoming.probe) >= PROBE_BYTES:
+                        incoming.check_probe()
+
+                # Disk writes happen off the event loop in fixed-size blocks
+                incoming.buffer.extend(data)
+                if len(incoming.buffer) >= UPLOAD_CHUNK_SIZE:
+                    await asyncio.to_thread(incoming.flush)
+            receiver.pending.clear()
+
+            # Files shorter than the probe are checked once their part ends
+            for index, incoming in enumerate(files):
+                if not incoming.probed and incoming.received and index != receiver.current:
+                    incoming.check_probe()
+
+        parser.finalize()
+
+        if not files:
+            raise HTTPException(status_code=400, detail=f"Missing form field: {field_name}")
+
+        for incoming in files:
+            if incoming.received == 0:
+                raise HTTPException(status_code=400, detail=f"{incoming.filename}: empty file")
+            if not incoming.probed:
+                incoming.check_probe()
+            if incoming.buffer:
+                await asyncio.to_thread(incoming.flush)
+            incoming.handle.close()
+
+        for incoming in files:
+            final_path = dest_dir / f"{uuid4().hex}_{Path(incoming.filename).name}"
+            incoming.part_path.rename(final_path)
+            results.append((final_path, incoming.filename, incoming.digest.hexdigest()))
+            logger.info(f"Received upload {incoming.filename} ({incoming.received / (1024 * 1024):.1f}MB)")
+        return results
+
+    except BaseException:
+        for incoming in files:
+            incoming.handle.close()
+            incoming.part_path.unlink(missing_ok=True)
+        for path, _, _ in results:
+            path.unlink(missing_ok=True)
+        raise
+
+
+async def receive_upload(
+    request: Request,
+    dest_dir: Path,
+    max_bytes: int,
+    supported_formats: List[str],
+    field_name: str = "file"
+) -> Tuple[Path, str, str]:
+    """Stream a single-file multipart upload; see receive_uploads."""
+    uploads = await receive_uploads(request, dest_dir, max_bytes, supported_formats, field_name=field_name)
+    return uploads[0]
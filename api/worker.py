@@ -0,0 +1,482 @@
+import argparse
+import logging
+import os
+import signal
+import sqlite3
+import threading
+import time
+from dataclasses import replace
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from config import (
+    SEPARATOR_MODEL,
+    DEVICE,
+    TARGET_DB,
+    OUTPUT_SUBTYPE,
+    CHUNKED_PROCESSING,
+    CHUNK_MIN_DURATION_SECONDS,
+    CHUNK_OVERLAP_SECONDS,
+    CHUNK_MAX_SECONDS,
+    CHUNK_WORKERS,
+    SEPARATION_CHUNK_WORKERS,
+    WORKER_PROCESSES,
+    WORKER_MAX_TASKS,
+    WORKER_MAX_RSS_MB,
+    JOB_TIMEOUT_SECONDS,
+    JOB_MAX_RSS_MB,
+    JOB_DB_PATH,
+    LOGGING_FORMAT
+)
+from api.jobstore import JobStore, store_event_bus
+from api.scheduler import JobScheduler
+from core.chunking import ChunkingConfig
+from core.events import EventBus
+from core.metrics import REGISTRY, MetricsRegistry, process_group_rss_bytes, process_rss_bytes
+from core.pipeline import AudioPipeline, JobCancelled
+from core.processors import (
+    SeparationStage,
+    HarmonicPercussiveStage,
+    CompositeTrackStage,
+    SeparatedTrackHarmonicPercussiveStage,
+    NormalizationStage,
+    AnalysisStage
+)
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 5.0
+MONITOR_SECONDS = 1.0
+# Running jobs check for cancellation at most this often
+CANCEL_POLL_SECONDS = 0.5
+# A job that has not stopped this long after being cancelled has its worker killed
+CANCEL_GRACE_SECONDS = 10.0
+# A worker that crashes sooner than this after starting is restarted with exponential backoff
+MIN_UPTIME_SECONDS = 60.0
+MAX_RESTART_DELAY_SECONDS = 60.0
+METRICS_SECONDS = 5.0
+
+
+def build_pipeline(output_dir: str, events: Optional[EventBus] = None) -> AudioPipeline:
+    pipeline = AudioPipeline(output_base_dir=output_dir, output_subtype=OUTPUT_SUBTYPE, events=events)
+
+    chunking = None
+    if CHUNKED_PROCESSING:
+        chunking = ChunkingConfig(
+            min_duration_seconds=CHUNK_MIN_DURATION_SECONDS,
+            overlap_seconds=CHUNK_OVERLAP_SECONDS,
+            max_chunk_seconds=CHUNK_MAX_SECONDS,
+            workers=CHUNK_WORKERS
+        )
+
+    pipeline.add_stage(SeparationStage(
+        separator_type="demucs",
+        separator_model=SEPARATOR_MODEL,
+        device=DEVICE,
+        chunking=replace(chunking, workers=SEPARATION_CHUNK_WORKERS) if chunking else None
+    ))
+    pipeline.add_stage(SeparatedTrackHarmonicPercussiveStage(chunking=chunking))
+    pipeline.add_stage(HarmonicPercussiveStage(chunking=chunking))
+    pipeline.add_stage(CompositeTrackStage(chunking=chunking))
+    pipeline.add_stage(NormalizationStage(target_db=TARGET_DB))
+    pipeline.add_stage(AnalysisStage())
+    return pipeline
+
+
+def _heartbeat(store: JobStore, worker_id: str, current: Dict, stop: threading.Event) -> None:
+    while not stop.wait(HEARTBEAT_SECONDS):
+        try:
+            store.heartbeat(worker_id, current.get("job_id"))
+        except sqlite3.Error as e:
+            logger.error(f"Heartbeat failed: {str(e)}")
+
+
+def _cancel_poller(store: JobStore, job_id: str) -> Callable[[], bool]:
+    next_check = 0.0
+
+    def should_cancel() -> bool:
+        nonlocal next_check
+        now = time.monotonic()
+        if now < next_check:
+            return False
+        next_check = now + CANCEL_POLL_SECONDS
+        return store.cancel_requested(job_id)
+
+    return should_cancel
+
+
+def worker_rss_bytes(pid: int) -> Optional[int]:
+    """Memory of a worker including its chunk workers, which share its process group."""
+    rss = process_group_rss_bytes(pid)
+    return rss if rss is not None else process_rss_bytes(pid)
+
+
+def _worker_main(output_dir: str, db_path: str, stop_event, max_tasks: int = 0, max_rss_bytes: int = 0) -> None:
+    logging.basicConfig(level=logging.INFO, format=LOGGING_FORMAT)
+    if hasattr(os, "setpgid"):
+        # Own process group, so a forced stop also takes down the chunk workers this process starts
+        os.setpgid(0, 0)
+    worker_id = f"worker-{os.getpid()}"
+    worker_logger = logging.getLogger(f"worker.{os.getpid()}")
+
+    store = JobStore(db_path)
+    scheduler = JobScheduler(store)
+    # Pipeline events go to the shared store, every API process relays them to its subscribers
+    pipeline = build_pipeline(output_dir, events=store_event_bus(store))
+
+    store.register_worker(worker_id, os.getpid())
+    store.put_metrics(worker_id, REGISTRY.snapshot())
+    current: Dict = {}
+    heartbeat_stop = threading.Event()
+    threading.Thread(
+        target=_heartbeat,
+        args=(store, worker_id, current, heartbeat_stop),
+        name="heartbeat",
+        daemon=True
+    ).start()
+
+    try:
+        # Jobs only start once the model is in memory and has run once
+        warmup = pipeline.warm_up()
+        store.set_worker_warmup(worker_id, warmup, ready=True)
+        worker_logger.info(f"Worker ready, warm-up took {warmup['total_seconds']:.1f}s")
+    except Exception as e:
+        # Still takes jobs, so they fail with the stage's error instead of waiting forever
+        store.set_worker_warmup(worker_id, {"error": str(e)}, ready=False)
+        worker_logger.error(f"Warm-up failed: {str(e)}")
+
+    tasks = 0
+    try:
+        while not stop_event.is_set():
+            job = scheduler.next(worker_id)
+            if job is None:
+                stop_event.wait(POLL_SECONDS)
+                continue
+
+            current["job_id"] = job.job_id
+            store.heartbeat(worker_id, job.job_id)
+            worker_logger.info(f"Job {job.job_id} started")
+
+            try:
+                manifest = pipeline.process(job.input_path, job_id=job.job_id, should_cancel=_cancel_poller(store, job.job_id))
+                scheduler.complete(job.job_id, "completed", output_keys=list(manifest.outputs))
+                worker_logger.info(f"Job {job.job_id} completed")
+            except JobCancelled:
+                worker_logger.info(f"Job {job.job_id} cancelled")
+                scheduler.complete(job.job_id, "cancelled")
+            except Exception as e:
+                worker_logger.error(f"Job {job.job_id} failed: {str(e)}")
+                scheduler.complete(job.job_id, "failed", str(e))
+            finally:
+                current.pop("job_id", None)
+                if job.owns_input:
+                    Path(job.input_path).unlink(missing_ok=True)
+                store.heartbeat(worker_id)
+                store.put_metrics(worker_id, REGISTRY.snapshot())
+                store.prune_events()
+
+            # Leaks in native libraries only go away with the process; the pool starts a fresh one
+            tasks += 1
+            if max_tasks and tasks >= max_tasks:
+                worker_logger.info(f"Recycling after {tasks} jobs")
+                break
+            rss = worker_rss_bytes(os.getpid())
+            if max_rss_bytes and rss is not None and rss > max_rss_bytes:
+                worker_logger.info(f"Recycling at {rss / (1024 * 1024):.0f}MB resident memory")
+                break
+    finally:
+        heartbeat_stop.set()
+        # Chunk workers hold model copies of their own and go with the worker
+        pipeline.close()
+        store.remove_worker(worker_id)
+        store.retire_metrics(worker_id)
+        worker_logger.info("Worker stopped")
+
+
+def acquire_worker_lock(path: str):
+    """Non-blocking exclusive lock on path; returns the open file or None if another process holds it.
+
+    Keep the returned file open for as long as the lock should be held.
+    """
+    lock_file = open(path, "a+")
+    try:
+        try:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            import msvcrt
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class WorkerPool:
+    """Supervised model-holding worker processes that claim jobs from the shared JobStore.
+
+    Processes are spawned rather than forked and are not daemonic, so they
+    can start their own chunk workers. They are independent of the HTTP
+    processes: one pool serves every API worker on the host, either embedded
+    in whichever API process wins the worker lock or run standalone with
+    `python -m api.worker`.
+
+    Each worker preloads the model and retires itself after max_tasks jobs
+    or past max_rss_mb. The monitor replaces workers that exit, and kills
+    (then replaces) a worker whose job runs past job_timeout or job_max_rss_mb,
+    failing the job with a structured reason instead of taking anything
+    else down with it.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        db_path: str,
+        processes: int = 1,
+        max_tasks: int = WORKER_MAX_TASKS,
+        max_rss_mb: int = WORKER_MAX_RSS_MB,
+        job_timeout: float = JOB_TIMEOUT_SECONDS,
+        job_max_rss_mb: int = JOB_MAX_RSS_MB
+    ):
+        self.output_dir = output_dir
+        self.db_path = db_path
+        self.processes = max(1, processes)
+        self.max_tasks = max_tasks
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.job_timeout = job_timeout
+        self.job_max_rss_bytes = job_max_rss_mb * 1024 * 1024
+        self.store = JobStore(db_path)
+        self.scheduler = JobScheduler(self.store, workers=self.processes)
+        self._context = get_context("spawn")
+        # One event per process: a process killed while waiting on a shared event would leave it unusable
+        self._stop_events: Dict[int, object] = {}
+        self._workers = []
+        self._started_at: Dict[int, float] = {}
+        self._crashes = [0] * self.processes
+        self._respawn_at: Dict[int, float] = {}
+        self._monitor: Optional[threading.Thread] = None
+        self._monitor_stop = threading.Event()
+        # Published under its own source, so an embedding API process does not count it twice
+        self.metrics = MetricsRegistry()
+        self.metrics_source = f"pool-{os.getpid()}"
+        self._exits = self.metrics.counter(
+            "worker_exits_total", "Pipeline worker processes replaced, by reason", ("reason",)
+        )
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    def _spawn(self):
+        stop_event = self._context.Event()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.output_dir, self.db_path, stop_event, self.max_tasks, self.max_rss_bytes)
+        )
+        process.start()
+        self._stop_events[process.pid] = stop_event
+        self._started_at[process.pid] = time.monotonic()
+        return process
+
+    def start(self) -> None:
+        if self.started:
+            return
+
+        self._workers = [self._spawn() for _ in range(self.processes)]
+
+        self._monitor_stop.clear()
+        self._monitor = threading.Thread(target=self._watch, name="worker-monitor", daemon=True)
+        self._monitor.start()
+        logger.info(f"Started {self.processes} pipeline worker processes")
+
+    def _forget(self, process) -> None:
+        self._stop_events.pop(process.pid, None)
+        self._started_at.pop(process.pid, None)
+        self.store.remove_worker(f"worker-{process.pid}")
+        self.store.retire_metrics(f"worker-{process.pid}")
+
+    def _kill(self, process) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            process.kill()
+        process.join(HEARTBEAT_SECONDS)
+        self._forget(process)
+
+    def _limit_exceeded(self, row, now: float) -> Optional[Tuple[str, str]]:
+        """Reason and message when a running job must be stopped by force."""
+        if row["cancel_requested_at"] is not None and time.time() - row["cancel_requested_at"] > CANCEL_GRACE_SECONDS:
+            return "cancelled", "Job did not stop after cancellation"
+        if self.job_timeout and row["started_at"] is not None and now - row["started_at"] > self.job_timeout:
+            return "timeout", f"Job exceeded the time limit of {self.job_timeout:.0f}s"
+        if self.job_max_rss_bytes:
+            rss = worker_rss_bytes(row["pid"])
+            if rss is not None and rss > self.job_max_rss_bytes:
+                return "memory_limit", (
+                    f"Job exceeded the memory limit of {self.job_max_rss_bytes // (1024 * 1024)}MB "
+                    f"({rss // (1024 * 1024)}MB resident)"
+                )
+        return None
+
+    def _enforce_limits(self, pipeline: AudioPipeline) -> None:
+        """Kill workers whose job was cancelled without stopping, or ran past its time or memory limit."""
+        for row in self.store.running_jobs():
+            index = next((i for i, p in enumerate(self._workers) if p.pid == row["pid"]), None)
+            if index is None:
+                # Another pool's worker
+                continue
+            exceeded = self._limit_exceeded(row, time.time())
+            if exceeded is None:
+                continue
+
+            reason, message = exceeded
+            logger.warning(f"Job {row['job_id']}: {message}, killing {row['worker_id']}")
+            self._kill(self._workers[index])
+            self._exits.inc(reason=reason)
+            job = self.store.get_job(row["job_id"])
+            if job is not None and job["status"] == "running":
+                if reason == "cancelled":
+                    self.scheduler.complete(row["job_id"], "cancelled")
+                    pipeline.mark_cancelled(row["job_id"])
+                else:
+                    self.scheduler.complete(row["job_id"], "failed", message)
+                    pipeline.mark_failed(row["job_id"], message, reason)
+            if not self._monitor_stop.is_set():
+                self._workers[index] = self._spawn()
+
+    def _replace_exited(self, pipeline: AudioPipeline) -> None:
+        """Start a fresh worker in place of every one that exited, recycled or crashed."""
+        now = time.monotonic()
+        for index, process in enumerate(self._workers):
+            if process.is_alive() or self._monitor_stop.is_set():
+                continue
+
+            if process.pid in self._started_at:
+                uptime = now - self._started_at[process.pid]
+                if process.exitcode == 0:
+                    self._exits.inc(reason="recycled")
+                    self._crashes[index] = 0
+                else:
+                    self._exits.inc(reason="crashed")
+                    self._fail_jobs_of(process, pipeline)
+                    self._crashes[index] = self._crashes[index] + 1 if uptime < MIN_UPTIME_SECONDS else 1
+                    logger.error(f"Worker {process.pid} exited with code {process.exitcode} after {uptime:.0f}s")
+                self._forget(process)
+                delay = min(MAX_RESTART_DELAY_SECONDS, 2.0 ** (self._crashes[index] - 1)) if self._crashes[index] > 1 else 0.0
+                self._respawn_at[index] = now + delay
+
+            if now >= self._respawn_at.get(index, 0.0):
+                self._workers[index] = self._spawn()
+                self._respawn_at.pop(index, None)
+
+    def _fail_jobs_of(self, process, pipeline: AudioPipeline) -> None:
+        # Signal deaths (negative exit codes) are most often the kernel's OOM killer
+        cause = f"signal {-process.exitcode}" if process.exitcode < 0 else f"exit code {process.exitcode}"
+        message = f"Worker process died while running the job ({cause})"
+        for row in self.store.running_jobs():
+            if row["pid"] != process.pid:
+                continue
+            logger.error(f"Job {row['job_id']} lost with worker {process.pid}")
+            if row["cancel_requested_at"] is not None:
+                self.scheduler.complete(row["job_id"], "cancelled")
+                pipeline.mark_cancelled(row["job_id"])
+            else:
+                self.scheduler.complete(row["job_id"], "failed", message)
+                pipeline.mark_failed(row["job_id"], message, "worker_exited")
+
+    def _watch(self) -> None:
+        pipeline = AudioPipeline(output_base_dir=self.output_dir, events=store_event_bus(self.store))
+        next_metrics = 0.0
+
+        while not self._monitor_stop.wait(MONITOR_SECONDS):
+            try:
+                self._enforce_limits(pipeline)
+                self._replace_exited(pipeline)
+                # Jobs of workers that are not this pool's, or vanished without a trace
+                alive = [row["worker_id"] for row in self.store.alive_workers()]
+                for row in self.store.orphaned_jobs(alive):
+                    if row["cancel_requested_at"] is not None:
+                        logger.info(f"Cancelled job {row['job_id']} orphaned by {row['worker_id']}")
+                        self.scheduler.complete(row["job_id"], "cancelled")
+                        pipeline.mark_cancelled(row["job_id"])
+                        continue
+                    error = "Worker process exited while running the job"
+                    logger.error(f"Job {row['job_id']} orphaned by {row['worker_id']}")
+                    self.scheduler.complete(row["job_id"], "failed", error)
+                    pipeline.mark_failed(row["job_id"], error)
+
+                if time.monotonic() >= next_metrics:
+                    self.store.put_metrics(self.metrics_source, self.metrics.snapshot())
+                    next_metrics = time.monotonic() + METRICS_SECONDS
+            except sqlite3.Error as e:
+                logger.error(f"Worker monitor failed: {str(e)}")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if not self.started:
+            return
+
+        self._monitor_stop.set()
+        self._monitor.join(timeout)
+        for stop_event in self._stop_events.values():
+            stop_event.set()
+
+        for process in self._workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+                self.store.remove_worker(f"worker-{process.pid}")
+                self.store.retire_metrics(f"worker-{process.pid}")
+
+        self._workers = []
+        self._stop_events = {}
+        self._started_at = {}
+        self.store.put_metrics(self.metrics_source, self.metrics.snapshot())
+        self.store.retire_metrics(self.metrics_source)
+        logger.info("Pipeline worker processes stopped")
+
+    def wait(self) -> None:
+        """Block until stop(); workers come and go meanwhile as they are recycled or replaced."""
+        # Short waits keep the main thread responsive to signals
+        while not self._monitor_stop.wait(MONITOR_SECONDS):
+            pass
+        for process in list(self._workers):
+            process.join()
+
+
+def pool_stats(store: JobStore, configured: int) -> Dict:
+    alive = store.alive_workers()
+    return {
+        "workers": configured,
+        "alive_workers": len(alive),
+        "ready_workers": sum(1 for worker in alive if worker["ready_at"] is not None),
+        "queued": store.count_jobs("queued"),
+        "running": store.count_jobs("running")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run model-holding pipeline workers")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--output-dir", default="./outputs")
+    parser.add_argument("--db", default=JOB_DB_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=LOGGING_FORMAT)
+    pool = WorkerPool(args.output_dir, args.db, processes=args.processes)
+
+    def handle_signal(signum, frame):
+        logger.info("Stopping workers")
+        pool.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    pool.start()
+    pool.wait()
+
+
+if __name__ == "__main__":
+    main()
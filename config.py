@@ -20,8 +20,53 @@ SEPARATOR_MODEL = os.getenv("SEPARATOR_MODEL", "htdemucs_ft")
 
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "500"))
 SUPPORTED_FORMATS = ["wav", "mp3", "flac", "ogg"]
+MAX_INPUT_DURATION_SECONDS = float(os.getenv("MAX_INPUT_DURATION_SECONDS", "3600"))
+# Estimated worker seconds a single job may take; 0 disables the check
+MAX_JOB_COMPUTE_SECONDS = float(os.getenv("MAX_JOB_COMPUTE_SECONDS", "0"))
+# Worker seconds per second of audio assumed until stage timings have been observed
+DEFAULT_REALTIME_FACTOR = float(os.getenv("DEFAULT_REALTIME_FACTOR", "1.0"))
 
 TARGET_DB = float(os.getenv("TARGET_DB", "-20.0"))
+OUTPUT_SUBTYPE = os.getenv("OUTPUT_SUBTYPE", "FLOAT").upper()
+
+CHUNKED_PROCESSING = os.getenv("CHUNKED_PROCESSING", "false").lower() == "true"
+CHUNK_MIN_DURATION_SECONDS = float(os.getenv("CHUNK_MIN_DURATION_SECONDS", "180"))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", "5"))
+CHUNK_MAX_SECONDS = float(os.getenv("CHUNK_MAX_SECONDS", "600"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "0"))
+# Each separation chunk worker holds its own model copy, on top of the one in its pipeline worker
+SEPARATION_CHUNK_WORKERS = int(os.getenv("SEPARATION_CHUNK_WORKERS", "2"))
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+# Workers are replaced after this many jobs, or once their resident memory passes WORKER_MAX_RSS_MB; 0 disables
+WORKER_MAX_TASKS = int(os.getenv("WORKER_MAX_TASKS", "100"))
+WORKER_MAX_RSS_MB = int(os.getenv("WORKER_MAX_RSS_MB", "8192"))
+# Hard limits per running job, enforced by killing the worker; 0 disables
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "7200"))
+JOB_MAX_RSS_MB = int(os.getenv("JOB_MAX_RSS_MB", "16384"))
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "32"))
+MAX_QUEUED_PER_CLIENT = int(os.getenv("MAX_QUEUED_PER_CLIENT", "8"))
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "500"))
+MAX_BATCH_SIZE_MB = int(os.getenv("MAX_BATCH_SIZE_MB", "10000"))
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "2"))
+# Directory server-local batch paths must live under; empty disables path submissions
+BATCH_LOCAL_ROOT = os.getenv("BATCH_LOCAL_ROOT", "")
+PREVIEW_SECONDS = float(os.getenv("PREVIEW_SECONDS", "20"))
+# Full-length uploads of previews that are not upgraded within this time are deleted
+PREVIEW_UPGRADE_HOURS = float(os.getenv("PREVIEW_UPGRADE_HOURS", "24"))
+TRANSCODE_CACHE_DIR = os.getenv("TRANSCODE_CACHE_DIR", "./outputs/.transcode")
+TRANSCODE_CACHE_MB = int(os.getenv("TRANSCODE_CACHE_MB", "2048"))
+SPECTROGRAM_TILE_CACHE_DIR = os.getenv("SPECTROGRAM_TILE_CACHE_DIR", "./outputs/.tiles")
+SPECTROGRAM_TILE_CACHE_MB = int(os.getenv("SPECTROGRAM_TILE_CACHE_MB", "256"))
+# Resumable uploads idle for longer are discarded
+UPLOAD_EXPIRY_HOURS = float(os.getenv("UPLOAD_EXPIRY_HOURS", "24"))
+# Resumable uploads preallocate their full length, so each client's open ones are capped; 0 disables
+MAX_OPEN_UPLOADS_PER_CLIENT = int(os.getenv("MAX_OPEN_UPLOADS_PER_CLIENT", "4"))
+MAX_UPLOAD_MB_PER_CLIENT = int(os.getenv("MAX_UPLOAD_MB_PER_CLIENT", "2000"))
+BLOB_DIR = os.getenv("BLOB_DIR", "./uploads/blobs")
+BLOB_STORE_MB = int(os.getenv("BLOB_STORE_MB", "10240"))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "./outputs/jobs.db")
+EMBEDDED_WORKERS = os.getenv("EMBEDDED_WORKERS", "true").lower() == "true"
 
 LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "INFO")
 LOGGING_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -45,7 +90,41 @@ __all__ = [
     "SEPARATOR_MODEL",
     "MAX_FILE_SIZE_MB",
     "SUPPORTED_FORMATS",
+    "MAX_INPUT_DURATION_SECONDS",
+    "MAX_JOB_COMPUTE_SECONDS",
+    "DEFAULT_REALTIME_FACTOR",
     "TARGET_DB",
+    "OUTPUT_SUBTYPE",
+    "CHUNKED_PROCESSING",
+    "CHUNK_MIN_DURATION_SECONDS",
+    "CHUNK_OVERLAP_SECONDS",
+    "CHUNK_MAX_SECONDS",
+    "CHUNK_WORKERS",
+    "SEPARATION_CHUNK_WORKERS",
+    "WORKER_PROCESSES",
+    "WORKER_MAX_TASKS",
+    "WORKER_MAX_RSS_MB",
+    "JOB_TIMEOUT_SECONDS",
+    "JOB_MAX_RSS_MB",
+    "MAX_QUEUE_DEPTH",
+    "MAX_QUEUED_PER_CLIENT",
+    "MAX_BATCH_ITEMS",
+    "MAX_BATCH_SIZE_MB",
+    "BATCH_MAX_PARALLEL",
+    "BATCH_LOCAL_ROOT",
+    "PREVIEW_SECONDS",
+    "PREVIEW_UPGRADE_HOURS",
+    "TRANSCODE_CACHE_DIR",
+    "TRANSCODE_CACHE_MB",
+    "SPECTROGRAM_TILE_CACHE_DIR",
+    "SPECTROGRAM_TILE_CACHE_MB",
+    "UPLOAD_EXPIRY_HOURS",
+    "MAX_OPEN_UPLOADS_PER_CLIENT",
+    "MAX_UPLOAD_MB_PER_CLIENT",
+    "BLOB_DIR",
+    "BLOB_STORE_MB",
+    "JOB_DB_PATH",
+    "EMBEDDED_WORKERS",
     "LOGGING_LEVEL",
     "LOGGING_FORMAT",
     "JOB_RETENTION_DAYS",
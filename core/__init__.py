@@ -4,7 +4,8 @@ from core.processors import (
     SeparationStage,
     HarmonicPercussiveStage,
     CompositeTrackStage,
-    NormalizationStage
+    NormalizationStage,
+    AnalysisStage
 )
 
 __all__ = [
@@ -18,5 +19,6 @@ __all__ = [
     "SeparationStage",
     "HarmonicPercussiveStage",
     "CompositeTrackStage",
-    "NormalizationStage"
+    "NormalizationStage",
+    "AnalysisStage"
 ]
\ No newline at end of file
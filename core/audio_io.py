@@ -0,0 +1,161 @@
+import json
+import logging
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from core.metrics import CACHE_REQUESTS
+from core.storage import INTERMEDIATE_DIR
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_DTYPE = np.float32
+INPUT_INTERMEDIATE = "input"
+
+OUTPUT_SUBTYPES = ["PCM_16", "PCM_24", "FLOAT"]
+# Float keeps the float32 compute path lossless and does not clip stems above 0 dBFS
+DEFAULT_OUTPUT_SUBTYPE = "FLOAT"
+
+
+def buffer_nbytes(buffer) -> int:
+    """Bytes owned by a numpy array or torch tensor; views and memmaps count as 0."""
+    if isinstance(buffer, np.ndarray):
+        return int(buffer.nbytes) if buffer.flags.owndata else 0
+
+    if hasattr(buffer, "element_size") and hasattr(buffer, "nelement"):
+        return int(buffer.element_size() * buffer.nelement())
+
+    return 0
+
+
+def write_audio(path: str, audio: np.ndarray, sr: int, subtype: str = DEFAULT_OUTPUT_SUBTYPE) -> str:
+    """Encode a (channels, frames) or mono float32 array as a deliverable file.
+
+    Falls back to the container's default subtype when it cannot hold the
+    requested one (e.g. FLOAT in FLAC).
+    """
+    import soundfile as sf
+
+    if subtype not in OUTPUT_SUBTYPES:
+        raise ValueError(f"Unsupported output subtype: {subtype}. Available: {OUTPUT_SUBTYPES}")
+
+    audio = np.asarray(audio)
+    data = audio.T if audio.ndim == 2 else audio
+
+    file_format = Path(path).suffix.lstrip(".").upper()
+    if not sf.check_format(file_format, subtype):
+        subtype = None
+
+    sf.write(str(path), data, sr, subtype=subtype)
+    return str(path)
+
+
+def matches_output(path: str, subtype: str) -> bool:
+    """Whether path is already a WAV in the given subtype, so it can be delivered as is."""
+    import soundfile as sf
+
+    try:
+        info = sf.info(path)
+    except Exception:
+        return False
+    return info.format in ("WAV", "WAVEX") and info.subtype == subtype
+
+
+def intermediate_path(output_dir: str, name: str) -> Path:
+    return Path(output_dir) / INTERMEDIATE_DIR / f"{name}.npy"
+
+
+def write_intermediate(path: str, audio: np.ndarray, sr: int) -> str:
+    """Store audio as a raw float32 (channels, frames) .npy with a JSON header.
+
+    The .npy can be memory-mapped by later stages without decoding.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    audio = np.asarray(audio, dtype=SAMPLE_DTYPE)
+    if audio.ndim == 1:
+        audio = audio[np.newaxis, :]
+
+    np.save(path, np.ascontiguousarray(audio))
+    header = {
+        "sample_rate": int(sr),
+        "channels": int(audio.shape[0]),
+        "frames": int(audio.shape[1])
+    }
+    with open(path.with_suffix(".json"), "w") as f:
+        json.dump(header, f)
+
+    return str(path)
+
+
+def read_intermediate(path: str) -> Tuple[np.ndarray, int]:
+    """Memory-map an intermediate written by write_intermediate.
+
+    Returns a read-only (channels, frames) float32 array and the sample rate.
+    """
+    path = Path(path)
+    with open(path.with_suffix(".json"), "r") as f:
+        header = json.load(f)
+
+    audio = np.load(path, mmap_mode="r")
+    return audio, header["sample_rate"]
+
+
+def has_intermediate(path: str) -> bool:
+    path = Path(path)
+    return path.exists() and path.with_suffix(".json").exists()
+
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    if audio.ndim == 1:
+        return audio
+    if audio.shape[0] == 1:
+        return audio[0]
+    return np.asarray(audio).mean(axis=0, dtype=SAMPLE_DTYPE)
+
+
+def decode_audio(input_path: str) -> Tuple[np.ndarray, int]:
+    """Decode a file to a (channels, frames) float32 array at its native rate."""
+    import soundfile as sf
+
+    try:
+        data, sr = sf.read(input_path, dtype="float32", always_2d=True)
+        return data.T, sr
+    except Exception as e:
+        logger.warning(f"soundfile.read failed ({str(e)}), trying librosa...")
+        import librosa
+        y, sr = librosa.load(input_path, sr=None, mono=False)
+        if y.ndim == 1:
+            y = y[np.newaxis, :]
+        return y, sr
+
+
+def load_input(input_path: str, output_dir: str, mono: bool = True) -> Tuple[np.ndarray, int]:
+    """Decode the job input once and share it between stages via an intermediate."""
+    cached = intermediate_path(output_dir, INPUT_INTERMEDIATE)
+
+    if has_intermediate(str(cached)):
+        CACHE_REQUESTS.inc(cache="intermediate", result="hit")
+        audio, sr = read_intermediate(str(cached))
+    else:
+        CACHE_REQUESTS.inc(cache="intermediate", result="miss")
+        audio, sr = decode_audio(input_path)
+        write_intermediate(str(cached), audio, sr)
+
+    return (to_mono(audio) if mono else audio), sr
+
+
+def load_track(track_path: str, output_dir: str, mono: bool = True) -> Tuple[np.ndarray, int]:
+    """Read a stage output, preferring its intermediate over decoding the WAV."""
+    cached = intermediate_path(output_dir, Path(track_path).stem)
+
+    if has_intermediate(str(cached)):
+        CACHE_REQUESTS.inc(cache="intermediate", result="hit")
+        audio, sr = read_intermediate(str(cached))
+    else:
+        CACHE_REQUESTS.inc(cache="intermediate", result="miss")
+        audio, sr = decode_audio(track_path)
+
+    return (to_mono(audio) if mono else audio), sr
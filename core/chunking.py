@@ -0,0 +1,171 @@
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Chunk = Tuple[int, int]
+
+
+@dataclass
+class ChunkingConfig:
+    """When and how to split long inputs into overlapping time chunks.
+
+    workers=0 uses every available core; the chunk count is a multiple of the
+    worker count so all processes stay busy. Chunk starts are multiples of
+    align_frames (the default STFT hop) so spectral frames line up with an
+    unchunked run.
+    """
+    min_duration_seconds: float = 180.0
+    overlap_seconds: float = 5.0
+    max_chunk_seconds: float = 600.0
+    workers: int = 0
+    align_frames: int = 512
+
+    def resolve_workers(self) -> int:
+        if self.workers > 0:
+            return self.workers
+        return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+    def applies_to(self, frames: int, sr: int) -> bool:
+        return self.resolve_workers() > 1 and frames / sr >= self.min_duration_seconds
+
+    def plan(self, frames: int, sr: int) -> List[Chunk]:
+        workers = self.resolve_workers()
+        overlap = int(self.overlap_seconds * sr)
+
+        count = workers
+        while frames / count > self.max_chunk_seconds * sr:
+            count += workers
+
+        return plan_chunks(frames, count, overlap, self.align_frames)
+
+
+def plan_chunks(frames: int, count: int, overlap: int, align: int = 1) -> List[Chunk]:
+    """Split [0, frames) into about count chunks overlapping their neighbours by overlap frames."""
+    if count <= 1 or frames <= overlap * 2:
+        return [(0, frames)]
+
+    length = math.ceil((frames + (count - 1) * overlap) / count)
+    step = math.ceil((length - overlap) / align) * align
+    length = step + overlap
+    if length <= overlap * 2:
+        return [(0, frames)]
+
+    chunks = []
+    start = 0
+    while True:
+        end = min(start + length, frames)
+        chunks.append((start, end))
+        if end >= frames:
+            break
+        start += step
+
+    return chunks
+
+
+def overlap_add(pieces: Iterable[np.ndarray], chunks: List[Chunk], frames: int) -> np.ndarray:
+    """Stitch per-chunk results along their last axis with linear crossfades.
+
+    Neighbouring fade-out and fade-in ramps sum to one, so no normalisation
+    buffer is needed. Pieces are consumed one at a time.
+    """
+    out = None
+
+    for idx, (piece, (start, end)) in enumerate(zip(pieces, chunks)):
+        if out is None:
+            out = np.zeros(piece.shape[:-1] + (frames,), dtype=np.float32)
+
+        weights = np.ones(end - start, dtype=np.float32)
+
+        fade_in = chunks[idx - 1][1] - start if idx > 0 else 0
+        if fade_in > 0:
+            weights[:fade_in] = (np.arange(fade_in, dtype=np.float32) + 0.5) / fade_in
+
+        fade_out = end - chunks[idx + 1][0] if idx < len(chunks) - 1 else 0
+        if fade_out > 0:
+            weights[-fade_out:] = 1.0 - (np.arange(fade_out, dtype=np.float32) + 0.5) / fade_out
+
+        out[..., start:end] += piece[..., :end - start] * weights
+
+    return out
+
+
+def _collect(futures: List, progress: Optional[Callable[[float], None]]) -> Iterator[np.ndarray]:
+    for idx, future in enumerate(futures):
+        result = future.result()
+        if progress is not None:
+            progress((idx + 1) / len(futures))
+        yield result
+
+
+class ChunkRunner:
+    """Runs a picklable function over overlapping chunks in worker processes.
+
+    Persistent runners keep their pool (and whatever the initializer loaded,
+    e.g. a model) alive between calls.
+    """
+
+    def __init__(
+        self,
+        config: ChunkingConfig,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        persistent: bool = False
+    ):
+        self.config = config
+        self.initializer = initializer
+        self.initargs = initargs
+        self.persistent = persistent
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn avoids forking a process that may already hold torch/OpenMP threads
+        return ProcessPoolExecutor(
+            max_workers=self.config.resolve_workers(),
+            mp_context=get_context("spawn"),
+            initializer=self.initializer,
+            initargs=self.initargs
+        )
+
+    def run(
+        self,
+        fn: Callable,
+        audio: np.ndarray,
+        sr: int,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> np.ndarray:
+        frames = audio.shape[-1]
+        chunks = self.config.plan(frames, sr)
+        logger.info(f"Processing {frames / sr:.1f}s in {len(chunks)} chunks on {self.config.resolve_workers()} workers")
+
+        executor = self._executor or self._create_executor()
+        futures = []
+        try:
+            futures = [
+                executor.submit(fn, np.ascontiguousarray(audio[..., start:end]))
+                for start, end in chunks
+            ]
+            # Results are stitched in order as they arrive instead of being held together
+            return overlap_add(_collect(futures, progress), chunks, frames)
+        except BaseException:
+            # A failed or cancelled job must not leave its remaining chunks queued on a persistent pool
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if self.persistent:
+                self._executor = executor
+            else:
+                executor.shutdown()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
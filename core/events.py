@@ -0,0 +1,97 @@
+import json
+import logging
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+Subscriber = Callable[["JobEvent"], None]
+
+
+@dataclass
+class JobEvent:
+    job_id: str
+    event: str
+    data: Dict
+    id: int = 0
+    timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.event == "status" and self.data.get("status") in TERMINAL_STATUSES
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_sse(self) -> str:
+        payload = json.dumps({"job_id": self.job_id, "timestamp": self.timestamp, **self.data})
+        return f"id: {self.id}\nevent: {self.event}\ndata: {payload}\n\n"
+
+
+class EventBus:
+    """Thread-safe in-process publish/subscribe for job events.
+
+    The last `history` events of the most recent `max_jobs` jobs are kept so
+    late subscribers can catch up from a Last-Event-ID.
+    """
+
+    def __init__(self, history: int = 256, max_jobs: int = 1000):
+        self.history_size = history
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Optional[str], Subscriber]] = []
+        self._history: "OrderedDict[str, Deque[JobEvent]]" = OrderedDict()
+        self._sequence: Dict[str, int] = {}
+
+    def subscribe(self, callback: Subscriber, job_id: Optional[str] = None) -> Callable[[], None]:
+        """Register callback for one job (or all jobs); returns an unsubscribe function."""
+        entry = (job_id, callback)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+
+        return unsubscribe
+
+    def publish(self, job_id: str, event: str, data: Optional[Dict] = None, event_id: Optional[int] = None) -> JobEvent:
+        """Publish an event; event_id keeps ids assigned elsewhere (e.g. a shared store)."""
+        with self._lock:
+            sequence = event_id if event_id is not None else self._sequence.get(job_id, 0) + 1
+            self._sequence[job_id] = sequence
+            job_event = JobEvent(job_id=job_id, event=event, data=dict(data or {}), id=sequence)
+
+            if self.history_size:
+                if job_id not in self._history:
+                    self._history[job_id] = deque(maxlen=self.history_size)
+                    while len(self._history) > self.max_jobs:
+                        evicted, _ = self._history.popitem(last=False)
+                        self._sequence.pop(evicted, None)
+                self._history[job_id].append(job_event)
+
+            subscribers = [cb for sub_job, cb in self._subscribers if sub_job in (None, job_id)]
+
+        # Callbacks run outside the lock so they may publish or unsubscribe
+        for callback in subscribers:
+            try:
+                callback(job_event)
+            except Exception as e:
+                logger.error(f"Event subscriber failed: {str(e)}")
+
+        return job_event
+
+    def history(self, job_id: str, after_id: int = 0) -> List[JobEvent]:
+        with self._lock:
+            return [e for e in self._history.get(job_id, ()) if e.id > after_id]
+
+    def discard(self, job_id: str) -> None:
+        with self._lock:
+            self._history.pop(job_id, None)
+            self._sequence.pop(job_id, None)
@@ -0,0 +1,63 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+import soundfile as sf
+
+from core.audio_io import decode_audio, to_mono
+
+logger = logging.getLogger(__name__)
+
+HOP_SECONDS = 0.5
+
+
+def _hop_energy(input_path: str, hop_seconds: float) -> Tuple[np.ndarray, int, int]:
+    """Mean square of each hop, plus sample rate and total frames, reading in hop-sized blocks."""
+    try:
+        with sf.SoundFile(input_path) as f:
+            hop = max(1, int(f.samplerate * hop_seconds))
+            energies = [
+                float(np.mean(np.square(block)))
+                for block in f.blocks(hop, dtype="float32", always_2d=True)
+            ]
+            return np.array(energies), f.samplerate, f.frames
+    except RuntimeError as e:
+        logger.warning(f"Streaming read failed ({str(e)}), decoding {input_path} in full")
+
+    audio, sr = decode_audio(input_path)
+    mono = to_mono(audio)
+    hop = max(1, int(sr * hop_seconds))
+    padded = np.pad(mono, (0, -len(mono) % hop))
+    return np.mean(np.square(padded.reshape(-1, hop)), axis=1), sr, len(mono)
+
+
+def loudest_window(input_path: str, seconds: float, hop_seconds: float = HOP_SECONDS) -> Tuple[float, float, float]:
+    """Start and length of the highest-energy window of the given length, and the total duration.
+
+    Dense passages (choruses, drops) show every source at once, which makes
+    them the most telling excerpt to judge a separation by.
+    """
+    energies, sr, frames = _hop_energy(input_path, hop_seconds)
+    total = frames / sr
+    hops = max(1, int(round(seconds / hop_seconds)))
+    if len(energies) <= hops:
+        return 0.0, total, total
+
+    sums = np.convolve(energies, np.ones(hops), mode="valid")
+    start = int(np.argmax(sums)) * hop_seconds
+    return start, min(hops * hop_seconds, total - start), total
+
+
+def write_excerpt(input_path: str, dest_path: str, start: float, duration: float) -> str:
+    """Copy [start, start + duration) seconds of input_path to a float WAV."""
+    try:
+        with sf.SoundFile(input_path) as f:
+            sr = f.samplerate
+            f.seek(int(start * sr))
+            audio = f.read(int(duration * sr), dtype="float32", always_2d=True)
+    except RuntimeError:
+        decoded, sr = decode_audio(input_path)
+        audio = decoded[:, int(start * sr):int((start + duration) * sr)].T
+
+    sf.write(dest_path, audio, sr, subtype="FLOAT")
+    return dest_path
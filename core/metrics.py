@@ -0,0 +1,223 @@
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0)
+REALTIME_FACTOR_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._samples: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            samples = {key: _copy(value) for key, value in self._samples.items()}
+        return {"type": self.type_name, "help": self.help, "labels": self.labelnames, "samples": samples}
+
+
+def _copy(value):
+    return {**value, "buckets": list(value["buckets"])} if isinstance(value, dict) else value
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._samples[key] = sample
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample["buckets"][idx] += 1
+            sample["sum"] += value
+            sample["count"] += 1
+
+    def snapshot(self) -> Dict:
+        return {**super().snapshot(), "bucket_bounds": self.buckets}
+
+
+class MetricsRegistry:
+    """Process-local metrics in the Prometheus text exposition format.
+
+    Worker processes ship snapshot() to the API process, which renders its
+    own registry merged with those snapshots (counters and histograms add up,
+    gauges are summed across processes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render(self, extra: Iterable[Dict[str, Dict]] = ()) -> str:
+        return render_snapshots([self.snapshot(), *extra])
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Dict]]) -> Dict[str, Dict]:
+    merged: Dict[str, Dict] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for key, value in metric["samples"].items():
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = _copy(value)
+                elif isinstance(value, dict):
+                    current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                    current["sum"] += value["sum"]
+                    current["count"] += value["count"]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render_snapshots(snapshots: Iterable[Dict[str, Dict]]) -> str:
+    lines: List[str] = []
+
+    for name, metric in sorted(merge_snapshots(snapshots).items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labels"]
+
+        for key, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                continue
+
+            for bound, count in zip(metric["bucket_bounds"], value["buckets"]):
+                labels = _format_labels(labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{name}_bucket{labels} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, ('le', '+Inf'))} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, key)} {value['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size from /proc; None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_group_rss_bytes(pgid: int) -> Optional[int]:
+    """Resident set size summed over a process group, e.g. a worker and the chunk workers it started."""
+    try:
+        entries = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    total = None
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Fields after the parenthesised command name: state, ppid, pgrp, ...
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[2]) == pgid:
+            rss = process_rss_bytes(int(entry))
+            if rss is not None:
+                total = (total or 0) + rss
+    return total
+
+
+REGISTRY = MetricsRegistry()
+
+# Shared by every cache so hit ratios are one query: rate(hit) / rate(hit + miss)
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
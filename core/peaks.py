@@ -0,0 +1,239 @@
+import logging
+import os
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+from uuid import uuid4
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PEAKS_MAGIC = b"PKPY"
+PEAKS_FILE_HEADER = struct.Struct("<4sI")
+# audiowaveform .dat v1 header: version, flags (1 = 8-bit), sample rate, samples per pixel, length
+DAT_HEADER = struct.Struct("<iIiiI")
+DAT_VERSION = 1
+DAT_FLAG_8BIT = 1
+
+DEFAULT_SAMPLES_PER_PIXEL = 256
+MIN_LEVEL_PIXELS = 256
+STREAM_BLOCK_FRAMES = 65536
+
+
+@dataclass
+class PeakLevel:
+    samples_per_pixel: int
+    mins: np.ndarray
+    maxs: np.ndarray
+    sample_rate: int = 0
+
+    def __len__(self):
+        return len(self.mins)
+
+
+@dataclass
+class TrackAnalysis:
+    sample_rate: int
+    channels: int
+    frames: int
+    rms: float
+    peak: float
+    levels: List[PeakLevel] = field(default_factory=list)
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "duration_seconds": round(self.duration_seconds, 3),
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "frames": self.frames,
+            "rms": round(self.rms, 6),
+            "peak": round(self.peak, 6),
+            "rms_db": round(_to_db(self.rms), 2),
+            "peak_db": round(_to_db(self.peak), 2),
+            "peak_levels": [level.samples_per_pixel for level in self.levels]
+        }
+
+
+def _to_db(value: float) -> float:
+    return float(20 * np.log10(value)) if value > 0 else -120.0
+
+
+def _build_pyramid(base: PeakLevel) -> List[PeakLevel]:
+    levels = [base]
+    while len(levels[-1]) > MIN_LEVEL_PIXELS:
+        prev = levels[-1]
+        count = len(prev)
+        if count % 2:
+            mins = np.append(prev.mins, prev.mins[-1])
+            maxs = np.append(prev.maxs, prev.maxs[-1])
+        else:
+            mins, maxs = prev.mins, prev.maxs
+        levels.append(PeakLevel(
+            samples_per_pixel=prev.samples_per_pixel * 2,
+            mins=np.minimum(mins[0::2], mins[1::2]),
+            maxs=np.maximum(maxs[0::2], maxs[1::2]),
+            sample_rate=prev.sample_rate
+        ))
+    return levels
+
+
+def analyze_audio(path: str, samples_per_pixel: int = DEFAULT_SAMPLES_PER_PIXEL) -> TrackAnalysis:
+    """Compute statistics and a min/max peak pyramid in one streaming pass.
+
+    Channels are merged per pixel like audiowaveform does, so memory stays
+    bounded by one block plus the base peak level.
+    """
+    import soundfile as sf
+
+    info = sf.info(path)
+    sum_squares = 0.0
+    peak = 0.0
+    frames = 0
+    mins: List[np.ndarray] = []
+    maxs: List[np.ndarray] = []
+    carry = np.empty((0, info.channels), dtype=np.float32)
+
+    for block in sf.blocks(path, blocksize=STREAM_BLOCK_FRAMES, dtype="float32", always_2d=True):
+        frames += len(block)
+        flat = block.reshape(-1)
+        sum_squares += float(np.dot(flat, flat))
+        if len(flat):
+            peak = max(peak, float(np.abs(flat).max()))
+
+        if len(carry):
+            block = np.concatenate([carry, block])
+        usable = len(block) - len(block) % samples_per_pixel
+        if usable:
+            pixels = block[:usable].reshape(-1, samples_per_pixel * info.channels)
+            mins.append(pixels.min(axis=1))
+            maxs.append(pixels.max(axis=1))
+        carry = block[usable:]
+
+    if len(carry):
+        mins.append(carry.min(keepdims=True).reshape(1))
+        maxs.append(carry.max(keepdims=True).reshape(1))
+
+    base = PeakLevel(
+        samples_per_pixel=samples_per_pixel,
+        mins=np.concatenate(mins) if mins else np.zeros(0, dtype=np.float32),
+        maxs=np.concatenate(maxs) if maxs else np.zeros(0, dtype=np.float32),
+        sample_rate=info.samplerate
+    )
+    total_samples = frames * info.channels
+
+    return TrackAnalysis(
+        sample_rate=info.samplerate,
+        channels=info.channels,
+        frames=frames,
+        rms=float(np.sqrt(sum_squares / total_samples)) if total_samples else 0.0,
+        peak=peak,
+        levels=_build_pyramid(base)
+    )
+
+
+def _quantize(values: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(values * 127.0), -128, 127).astype(np.int8)
+
+
+def _interleave(level: PeakLevel) -> np.ndarray:
+    pairs = np.empty(len(level) * 2, dtype=np.int8)
+    pairs[0::2] = _quantize(level.mins)
+    pairs[1::2] = _quantize(level.maxs)
+    return pairs
+
+
+def encode_dat(level: PeakLevel, sample_rate: int) -> bytes:
+    """One level as a standalone 8-bit audiowaveform .dat v1 file."""
+    header = DAT_HEADER.pack(DAT_VERSION, DAT_FLAG_8BIT, sample_rate, level.samples_per_pixel, len(level))
+    return header + _interleave(level).tobytes()
+
+
+def encode_json(level: PeakLevel, sample_rate: int) -> Dict:
+    """One level in audiowaveform's JSON layout (version 2, one channel), as read by peaks.js."""
+    return {
+        "version": 2,
+        "channels": 1,
+        "sample_rate": sample_rate,
+        "samples_per_pixel": level.samples_per_pixel,
+        "bits": 8,
+        "length": len(level),
+        "data": _interleave(level).tolist()
+    }
+
+
+def write_peaks(path: str, analysis: TrackAnalysis) -> str:
+    """Write the pyramid as a sequence of 8-bit audiowaveform .dat v1 blocks."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Peaks are served while jobs run, never expose a half-written file; concurrent writers each use their own
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(PEAKS_FILE_HEADER.pack(PEAKS_MAGIC, len(analysis.levels)))
+            for level in analysis.levels:
+                f.write(encode_dat(level, analysis.sample_rate))
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return str(path)
+
+
+def read_peaks(path: str) -> List[PeakLevel]:
+    """Read a pyramid written by write_peaks, values scaled back to [-1, 1]."""
+    with open(path, "rb") as f:
+        magic, level_count = PEAKS_FILE_HEADER.unpack(f.read(PEAKS_FILE_HEADER.size))
+        if magic != PEAKS_MAGIC:
+            raise ValueError(f"Not a peaks file: {path}")
+
+        levels = []
+        for _ in range(level_count):
+            _, _, sample_rate, samples_per_pixel, length = DAT_HEADER.unpack(f.read(DAT_HEADER.size))
+            pairs = np.frombuffer(f.read(length * 2), dtype=np.int8).astype(np.float32) / 127.0
+            levels.append(PeakLevel(
+                samples_per_pixel=samples_per_pixel,
+                mins=pairs[0::2],
+                maxs=pairs[1::2],
+                sample_rate=sample_rate
+            ))
+
+    return levels
+
+
+def level_for_zoom(levels: List[PeakLevel], samples_per_pixel: int) -> PeakLevel:
+    """Peaks at the requested zoom, derived from the finest stored level that is not finer than needed.
+
+    Zooms between pyramid levels are served by merging whole pixels, exact
+    for multiples of the base resolution and slightly finer otherwise;
+    zooms finer than the base level return the base level.
+    """
+    candidates = sorted(
+        (level for level in levels if level.samples_per_pixel <= samples_per_pixel),
+        key=lambda level: level.samples_per_pixel,
+        reverse=True
+    )
+    if not candidates:
+        return levels[0]
+    # Prefer the coarsest level that divides the zoom exactly, then the coarsest one
+    source = next((level for level in candidates if samples_per_pixel % level.samples_per_pixel == 0), candidates[0])
+    # A zoom coarser than the whole track is one pixel, not a padded array of the zoom's size
+    factor = min(max(1, samples_per_pixel // source.samples_per_pixel), max(1, len(source)))
+    if factor == 1:
+        return source
+
+    pad = -len(source) % factor
+    mins = np.append(source.mins, np.repeat(source.mins[-1:], pad)) if pad else source.mins
+    maxs = np.append(source.maxs, np.repeat(source.maxs[-1:], pad)) if pad else source.maxs
+    return PeakLevel(
+        samples_per_pixel=source.samples_per_pixel * factor,
+        mins=mins.reshape(-1, factor).min(axis=1),
+        maxs=maxs.reshape(-1, factor).max(axis=1),
+        sample_rate=source.sample_rate
+    )
@@ -1,15 +1,48 @@
+import hashlib
 import json
 import logging
 import os
+import shutil
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, is_dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from uuid import uuid4
 
+from core.audio_io import DEFAULT_OUTPUT_SUBTYPE, OUTPUT_SUBTYPES, buffer_nbytes
+from core.events import TERMINAL_STATUSES, EventBus
+from core.metrics import REALTIME_FACTOR_BUCKETS, REGISTRY, STAGE_BUCKETS
+from core.storage import INTERMEDIATE_DIR, OutputDeduplicator, link_or_copy
+
 logger = logging.getLogger(__name__)
 
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Wall time per pipeline stage", ("stage",), STAGE_BUCKETS
+)
+STAGE_REALTIME_FACTOR = REGISTRY.histogram(
+    "pipeline_stage_realtime_factor", "Stage wall time divided by input audio duration", ("stage",), REALTIME_FACTOR_BUCKETS
+)
+JOBS_TOTAL = REGISTRY.counter("pipeline_jobs_total", "Finished pipeline jobs by outcome", ("status",))
+WARMUP_SECONDS = REGISTRY.histogram(
+    "pipeline_warmup_seconds", "Worker start-up time per stage, loading models and running a dummy inference",
+    ("stage", "phase"), STAGE_BUCKETS
+)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def audio_duration(path: str) -> Optional[float]:
+    """Duration from the file header, None if it cannot be read without decoding."""
+    try:
+        import soundfile as sf
+        return float(sf.info(path).duration)
+    except Exception:
+        return None
+
 
 @dataclass
 class ProcessingStage:
@@ -20,6 +53,7 @@ class ProcessingStage:
     completed_at: Optional[str] = None
     error: Optional[str] = None
     duration_seconds: Optional[float] = None
+    audio_buffer_bytes: Optional[int] = None
 
     def to_dict(self):
         return asdict(self)
@@ -46,12 +80,49 @@ class ProcessingManifest:
         return json.dumps(self.to_dict(), indent=2)
 
 
+def _rebase_paths(value, old_dir: str, new_dir: str):
+    """Copy of a manifest value with paths under old_dir moved to new_dir."""
+    if isinstance(value, str) and value.startswith(old_dir + os.sep):
+        return new_dir + value[len(old_dir):]
+    if isinstance(value, dict):
+        return {key: _rebase_paths(item, old_dir, new_dir) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rebase_paths(item, old_dir, new_dir) for item in value]
+    return value
+
+
 class PipelineStage(ABC):
     def __init__(self, name: str, processor_type: str):
         self.name = name
         self.processor_type = processor_type
+        self.output_subtype = DEFAULT_OUTPUT_SUBTYPE
+        self.buffer_bytes = 0
+        self.previous_outputs: Dict[str, str] = {}
+        self.metadata: Dict = {}
+        self.progress_callback: Optional[Callable[[float], None]] = None
+        self.should_cancel: Optional[Callable[[], bool]] = None
         self.logger = logging.getLogger(f"stage.{name}")
 
+    def track_buffers(self, *buffers) -> None:
+        for buffer in buffers:
+            self.buffer_bytes += buffer_nbytes(buffer)
+
+    def report_progress(self, fraction: float) -> None:
+        # Progress comes between units of work (model segments, chunks), which makes it the cancellation point
+        if self.should_cancel is not None and self.should_cancel():
+            raise JobCancelled(f"Job cancelled during stage {self.name}")
+        if self.progress_callback is not None:
+            self.progress_callback(min(max(fraction, 0.0), 1.0))
+
+    def preload(self) -> None:
+        """Load models and other expensive state ahead of the first job."""
+
+    def warm_up(self) -> None:
+        """Run a short dummy inference after preload, so one-time setup is not paid by the first job."""
+
+    def close(self) -> None:
+        """Release processes and models kept between jobs."""
+
     @abstractmethod
     def execute(self, input_path: str, output_dir: str) -> Dict[str, str]:
         pass
@@ -62,80 +133,328 @@ class PipelineStage(ABC):
 
 
 class AudioPipeline:
-    def __init__(self, output_base_dir: str = "./outputs"):
+    def __init__(
+        self,
+        output_base_dir: str = "./outputs",
+        keep_intermediates: bool = False,
+        output_subtype: str = DEFAULT_OUTPUT_SUBTYPE,
+        events: Optional[EventBus] = None
+    ):
+        if output_subtype not in OUTPUT_SUBTYPES:
+            raise ValueError(f"Unsupported output subtype: {output_subtype}. Available: {OUTPUT_SUBTYPES}")
+
         self.stages: List[PipelineStage] = []
         self.output_base_dir = Path(output_base_dir)
         self.output_base_dir.mkdir(parents=True, exist_ok=True)
+        self.keep_intermediates = keep_intermediates
+        self.output_subtype = output_subtype
+        self.events = events
         self.logger = logging.getLogger("pipeline")
 
     def add_stage(self, stage: PipelineStage) -> None:
+        stage.output_subtype = self.output_subtype
         self.stages.append(stage)
         self.logger.info(f"Added stage: {stage.name}")
 
-    def process(self, input_file: str) -> ProcessingManifest:
+    def warm_up(self) -> Dict:
+        """Preload and warm up every stage; returns the time each phase took."""
+        started = time.perf_counter()
+        stages = {}
+        for stage in self.stages:
+            start = time.perf_counter()
+            stage.preload()
+            loaded = time.perf_counter()
+            stage.warm_up()
+            done = time.perf_counter()
+            WARMUP_SECONDS.observe(loaded - start, stage=stage.name, phase="load")
+            WARMUP_SECONDS.observe(done - loaded, stage=stage.name, phase="inference")
+            stages[stage.name] = {"load_seconds": round(loaded - start, 3), "inference_seconds": round(done - loaded, 3)}
+        return {"total_seconds": round(time.perf_counter() - started, 3), "stages": stages}
+
+    def close(self) -> None:
+        for stage in self.stages:
+            stage.close()
+
+    def config_key(self) -> str:
+        """Digest of the stages and their settings; jobs with equal keys turn equal inputs into equal outputs."""
+        stages = []
+        for stage in self.stages:
+            settings = {
+                name: asdict(value) if is_dataclass(value) else value
+                for name, value in sorted(vars(stage).items())
+                # Loaded models and helpers start out as None, so None is skipped to keep the key stable
+                if is_dataclass(value) or isinstance(value, (str, int, float, bool))
+            }
+            # Per-run state, not configuration
+            for name in ("buffer_bytes", "metadata", "previous_outputs", "progress_callback", "should_cancel"):
+                settings.pop(name, None)
+            stages.append([type(stage).__name__, settings])
+        config = {"stages": stages, "output_subtype": self.output_subtype}
+        return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+    def create_job(self, input_file: str, metadata: Optional[Dict] = None) -> ProcessingManifest:
+        """Register a job and persist a queued manifest before any work starts."""
         job_id = str(uuid4())
-        job_dir = self.output_base_dir / job_id
-        job_dir.mkdir(parents=True, exist_ok=True)
+        (self.output_base_dir / job_id).mkdir(parents=True, exist_ok=True)
 
         manifest = ProcessingManifest(
             job_id=job_id,
             input_file=input_file,
             created_at=datetime.utcnow().isoformat(),
             version="1.0",
-            stages=[],
+            stages=[
+                ProcessingStage(name=stage.name, processor_type=stage.processor_type, status="pending")
+                for stage in self.stages
+            ],
             outputs={},
-            metadata={"processor_count": len(self.stages)},
-            status="processing"
+            metadata={"processor_count": len(self.stages), **(metadata or {})},
+            status="queued"
         )
+        self._write_manifest(manifest)
+        self._publish(job_id, "status", {"status": manifest.status})
+        return manifest
 
-        for stage in self.stages:
-            stage_record = ProcessingStage(
-                name=stage.name,
-                processor_type=stage.processor_type,
-                status="pending"
-            )
+    def process(
+        self,
+        input_file: str,
+        job_id: Optional[str] = None,
+        should_cancel: Optional[Callable[[], bool]] = None
+    ) -> ProcessingManifest:
+        """Run every stage on input_file.
+
+        should_cancel is polled between stages and whenever a stage reports
+        progress; once it returns True the job's outputs are removed, the
+        manifest is marked cancelled and JobCancelled is raised.
+        """
+        manifest = self.get_job_status(job_id) if job_id else None
+        if manifest is None:
+            manifest = self.create_job(input_file)
+
+        job_id = manifest.job_id
+        job_dir = self.output_base_dir / job_id
+        manifest.stages = [
+            ProcessingStage(name=stage.name, processor_type=stage.processor_type, status="pending")
+            for stage in self.stages
+        ]
+        manifest.status = "processing"
+        input_duration = audio_duration(input_file)
+        if input_duration:
+            manifest.metadata["input_duration_seconds"] = round(input_duration, 3)
+        self._write_manifest(manifest)
+        self._publish(job_id, "status", {"status": manifest.status})
+        deduplicator = OutputDeduplicator()
 
+        for index, (stage, stage_record) in enumerate(zip(self.stages, manifest.stages)):
             try:
+                if should_cancel is not None and should_cancel():
+                    raise JobCancelled(f"Job cancelled before stage {stage.name}")
                 if not stage.validate_input(input_file):
                     raise ValueError(f"Invalid input for stage {stage.name}")
 
                 stage_record.status = "processing"
                 stage_record.started_at = datetime.utcnow().isoformat()
+                self._write_manifest(manifest)
+                self._publish_stage(job_id, index, stage_record)
+
+                stage.buffer_bytes = 0
+                stage.previous_outputs = dict(manifest.outputs)
+                stage.metadata = {}
+                stage.progress_callback = self._progress_publisher(job_id, stage.name)
+                stage.should_cancel = should_cancel
 
                 outputs = stage.execute(input_file, str(job_dir))
+                for key, path in outputs.items():
+                    deduplicator.add(key, path)
+                    self._publish(job_id, "output", {"stage": stage.name, "key": key, "path": path})
                 manifest.outputs.update(outputs)
+                manifest.metadata.update(stage.metadata)
 
                 stage_record.status = "completed"
                 stage_record.completed_at = datetime.utcnow().isoformat()
+                stage_record.audio_buffer_bytes = stage.buffer_bytes
+
+                self.logger.info(
+                    f"Stage {stage.name} completed successfully "
+                    f"({stage.buffer_bytes / (1024 * 1024):.1f}MB audio buffers)"
+                )
 
-                self.logger.info(f"Stage {stage.name} completed successfully")
+            except JobCancelled:
+                if stage_record.started_at:
+                    stage_record.status = "cancelled"
+                    stage_record.completed_at = datetime.utcnow().isoformat()
+                manifest.status = "cancelled"
+                manifest.outputs = {}
+                JOBS_TOTAL.inc(status="cancelled")
+                self.logger.info(f"Job {job_id} cancelled at stage {stage.name}")
+                self._remove_outputs(job_dir)
+                raise
 
             except Exception as e:
                 stage_record.status = "failed"
                 stage_record.error = str(e)
                 stage_record.completed_at = datetime.utcnow().isoformat()
                 manifest.status = "failed"
+                manifest.metadata["failure"] = {"reason": "stage_error", "stage": stage.name, "message": str(e)}
+                JOBS_TOTAL.inc(status="failed")
                 self.logger.error(f"Stage {stage.name} failed: {str(e)}")
+                self._cleanup_intermediates(job_dir)
                 raise
 
             finally:
+                stage.progress_callback = None
+                stage.should_cancel = None
                 if stage_record.started_at and stage_record.completed_at:
-                    from datetime import datetime as dt
-                    start = dt.fromisoformat(stage_record.started_at)
-                    end = dt.fromisoformat(stage_record.completed_at)
+                    start = datetime.fromisoformat(stage_record.started_at)
+                    end = datetime.fromisoformat(stage_record.completed_at)
                     stage_record.duration_seconds = (end - start).total_seconds()
+                    STAGE_SECONDS.observe(stage_record.duration_seconds, stage=stage.name)
+                    if input_duration:
+                        STAGE_REALTIME_FACTOR.observe(stage_record.duration_seconds / input_duration, stage=stage.name)
 
-                manifest.stages.append(stage_record)
+                self._write_manifest(manifest)
+                self._publish_stage(job_id, index, stage_record)
+                if manifest.status == "failed":
+                    self._publish(job_id, "status", {"status": manifest.status, "error": stage_record.error})
+                elif manifest.status == "cancelled":
+                    self._publish(job_id, "status", {"status": manifest.status})
 
-        manifest.status = "completed"
+        self._cleanup_intermediates(job_dir)
 
-        manifest_path = job_dir / "manifest.json"
-        with open(manifest_path, "w") as f:
-            f.write(manifest.to_json())
+        manifest.status = "completed"
+        JOBS_TOTAL.inc(status="completed")
+        manifest.metadata["aliases"] = deduplicator.aliases
+        manifest.metadata["bytes_deduplicated"] = deduplicator.bytes_saved
+        self._write_manifest(manifest)
+        self._publish(job_id, "status", {"status": manifest.status})
 
         self.logger.info(f"Pipeline completed. Job ID: {job_id}")
         return manifest
 
+    def clone_job(self, source_job_id: str, input_file: str, metadata: Optional[Dict] = None) -> Optional[ProcessingManifest]:
+        """New completed job sharing a finished job's outputs through hardlinks.
+
+        Returns None when the source job is not completed or its outputs are gone.
+        """
+        source = self.get_job_status(source_job_id)
+        if source is None or source.status != "completed":
+            return None
+        if not all(os.path.isfile(path) for path in source.outputs.values()):
+            return None
+
+        job_id = str(uuid4())
+        source_dir = self.output_base_dir / source_job_id
+        job_dir = self.output_base_dir / job_id
+        try:
+            for path in source_dir.rglob("*"):
+                relative = path.relative_to(source_dir)
+                if not path.is_file() or relative.parts[0] in (INTERMEDIATE_DIR, "manifest.json") or path.name.startswith("."):
+                    continue
+                link_or_copy(str(path), str(job_dir / relative))
+        except OSError as e:
+            # The source job was cleaned up while being linked
+            self.logger.warning(f"Could not reuse outputs of job {source_job_id}: {str(e)}")
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return None
+
+        old_dir, new_dir = str(source_dir), str(job_dir)
+        manifest = ProcessingManifest(
+            job_id=job_id,
+            input_file=input_file,
+            created_at=datetime.utcnow().isoformat(),
+            version=source.version,
+            stages=source.stages,
+            outputs=_rebase_paths(source.outputs, old_dir, new_dir),
+            metadata={**_rebase_paths(source.metadata, old_dir, new_dir), **(metadata or {}), "reused_from": source_job_id},
+            status="completed"
+        )
+        self._write_manifest(manifest)
+        self._publish(job_id, "status", {"status": manifest.status})
+        self.logger.info(f"Job {job_id} reuses the outputs of job {source_job_id}")
+        return manifest
+
+    def mark_failed(self, job_id: str, error: str, reason: str = "worker_exited") -> Optional[ProcessingManifest]:
+        """Fail a job that cannot finish on its own, e.g. after its worker process died or was killed."""
+        return self._abort(job_id, "failed", error, reason)
+
+    def mark_cancelled(self, job_id: str) -> Optional[ProcessingManifest]:
+        """Cancel a job that is not running here: still queued, or its worker was terminated."""
+        return self._abort(job_id, "cancelled")
+
+    def _abort(
+        self,
+        job_id: str,
+        status: str,
+        error: Optional[str] = None,
+        reason: Optional[str] = None
+    ) -> Optional[ProcessingManifest]:
+        manifest = self.get_job_status(job_id)
+        if manifest is None or manifest.status in TERMINAL_STATUSES:
+            return manifest
+
+        now = datetime.utcnow().isoformat()
+        stage_name = None
+        for stage_record in manifest.stages:
+            if stage_record.status == "processing":
+                stage_record.status = status
+                stage_record.error = error
+                stage_record.completed_at = now
+                stage_name = stage_record.name
+        if reason is not None:
+            manifest.metadata["failure"] = {"reason": reason, "stage": stage_name, "message": error}
+        manifest.status = status
+        JOBS_TOTAL.inc(status=status)
+        job_dir = self.output_base_dir / job_id
+        if status == "cancelled":
+            manifest.outputs = {}
+            self._remove_outputs(job_dir)
+        else:
+            self._cleanup_intermediates(job_dir)
+        self._write_manifest(manifest)
+        self._publish(job_id, "status", {"status": manifest.status, **({"error": error} if error else {})})
+        return manifest
+
+    def _publish(self, job_id: str, event: str, data: Dict) -> None:
+        if self.events is not None:
+            self.events.publish(job_id, event, data)
+
+    def _publish_stage(self, job_id: str, index: int, stage_record: ProcessingStage) -> None:
+        self._publish(job_id, "stage", {
+            **stage_record.to_dict(),
+            "index": index,
+            "total": len(self.stages)
+        })
+
+    def _progress_publisher(self, job_id: str, stage_name: str) -> Optional[Callable[[float], None]]:
+        if self.events is None:
+            return None
+        return lambda fraction: self._publish(job_id, "progress", {
+            "stage": stage_name,
+            "progress": round(fraction * 100, 1)
+        })
+
+    def _write_manifest(self, manifest: ProcessingManifest) -> None:
+        # Status is polled while the job runs, never expose a half-written file
+        manifest_path = self.output_base_dir / manifest.job_id / "manifest.json"
+        tmp_path = manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(manifest.to_json())
+        os.replace(tmp_path, manifest_path)
+
+    def _cleanup_intermediates(self, job_dir: Path) -> None:
+        # Raw float32 intermediates only serve later stages, deliverables stay encoded
+        if not self.keep_intermediates:
+            shutil.rmtree(job_dir / INTERMEDIATE_DIR, ignore_errors=True)
+
+    def _remove_outputs(self, job_dir: Path) -> None:
+        # A cancelled job keeps only its manifest
+        for path in job_dir.iterdir():
+            if path.name == "manifest.json":
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
     def get_job_status(self, job_id: str) -> Optional[ProcessingManifest]:
         manifest_path = self.output_base_dir / job_id / "manifest.json"
         if manifest_path.exists():
@@ -0,0 +1,82 @@
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+import soundfile as sf
+
+from core.metrics import merge_snapshots
+from core.pipeline import STAGE_REALTIME_FACTOR
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AudioProbe:
+    duration_seconds: float
+    sample_rate: int
+    channels: int
+    frames: int
+    codec: str
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def probe_audio(path: str) -> Optional[AudioProbe]:
+    """Stream parameters from the container header, without decoding; None if the header cannot be read."""
+    try:
+        info = sf.info(path)
+    except Exception as e:
+        logger.warning(f"Cannot probe {path}: {str(e)}")
+        return None
+    return AudioProbe(
+        duration_seconds=round(float(info.duration), 3),
+        sample_rate=info.samplerate,
+        channels=info.channels,
+        frames=info.frames,
+        codec=f"{info.format}/{info.subtype}"
+    )
+
+
+class CostModel:
+    """Worker seconds a job takes, from its input duration and the real-time factors observed per stage.
+
+    Factors are the mean of pipeline_stage_realtime_factor across every
+    process's published metrics. A stage not yet observed counts as its
+    share of default_factor, so estimates start coarse and calibrate
+    themselves as jobs finish.
+    """
+
+    def __init__(
+        self,
+        stage_names: List[str],
+        snapshots: Callable[[], Iterable[Dict[str, Dict]]],
+        default_factor: float = 1.0,
+        refresh_seconds: float = 30.0
+    ):
+        self.stage_names = stage_names
+        self.snapshots = snapshots
+        self.default_factor = default_factor
+        self.refresh_seconds = refresh_seconds
+        self._factors: Dict[str, float] = {}
+        self._refreshed_at: Optional[float] = None
+
+    def stage_factors(self) -> Dict[str, float]:
+        now = time.monotonic()
+        if self._refreshed_at is None or now - self._refreshed_at >= self.refresh_seconds:
+            metric = merge_snapshots(self.snapshots()).get(STAGE_REALTIME_FACTOR.name, {"samples": {}})
+            self._factors = {
+                key[0]: sample["sum"] / sample["count"]
+                for key, sample in metric["samples"].items() if sample["count"]
+            }
+            self._refreshed_at = now
+
+        fallback = self.default_factor / max(1, len(self.stage_names))
+        return {name: self._factors.get(name, fallback) for name in self.stage_names}
+
+    def realtime_factor(self) -> float:
+        return sum(self.stage_factors().values())
+
+    def estimate(self, duration_seconds: float) -> float:
+        return duration_seconds * self.realtime_factor()
@@ -1,19 +1,48 @@
 import logging
+import os
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
+import numpy as np
+
+from core.audio_io import load_input, load_track, matches_output, write_audio
+from core.chunking import ChunkingConfig, ChunkRunner
+from core.peaks import DEFAULT_SAMPLES_PER_PIXEL, analyze_audio, write_peaks
 from core.pipeline import PipelineStage
-from core.separator import SeparatorFactory
+from core.separator import SeparatorFactory, init_chunk_worker, separate_chunk, save_sources
+from core.storage import link_or_copy
 
 logger = logging.getLogger(__name__)
 
 
+def _hpss_chunk(y: np.ndarray) -> np.ndarray:
+    import librosa
+
+    harmonic, percussive = librosa.effects.hpss(y)
+    return np.stack([harmonic, percussive])
+
+
+def harmonic_percussive(
+    y: np.ndarray,
+    sr: int,
+    chunking: Optional[ChunkingConfig] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """librosa HPSS, split over worker processes for long inputs when chunking is set."""
+    if chunking is not None and chunking.applies_to(len(y), sr):
+        stacked = ChunkRunner(chunking).run(_hpss_chunk, y, sr)
+        return stacked[0], stacked[1]
+
+    import librosa
+    return librosa.effects.hpss(y)
+
+
 class SeparationStage(PipelineStage):
     def __init__(
         self,
         separator_type: str = "demucs",
         separator_model: str = "htdemucs_ft",
-        device: str = "cpu"
+        device: str = "cpu",
+        chunking: Optional[ChunkingConfig] = None
     ):
         super().__init__(
             name="audio_separation",
@@ -22,7 +51,9 @@ class SeparationStage(PipelineStage):
         self.separator_type = separator_type
         self.separator_model = separator_model
         self.device = device
+        self.chunking = chunking
         self.separator = None
+        self.chunk_runner = None
 
     def _get_separator(self):
         if self.separator is None:
@@ -33,6 +64,43 @@ class SeparationStage(PipelineStage):
             )
         return self.separator
 
+    def preload(self) -> None:
+        self._get_separator()
+
+    def warm_up(self) -> None:
+        self._get_separator().warm_up()
+
+    def close(self) -> None:
+        if self.chunk_runner is not None:
+            self.chunk_runner.shutdown()
+            self.chunk_runner = None
+
+    def _get_chunk_runner(self, separator_class: type) -> ChunkRunner:
+        # Workers keep their model loaded between jobs
+        if self.chunk_runner is None:
+            workers = self.chunking.resolve_workers()
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            self.chunk_runner = ChunkRunner(
+                self.chunking,
+                initializer=init_chunk_worker,
+                initargs=(
+                    separator_class,
+                    {"model_name": self.separator_model, "device": self.device},
+                    threads
+                ),
+                persistent=True
+            )
+        return self.chunk_runner
+
+    def _execute_chunked(self, separator_class: type, y: np.ndarray, sr: int, output_dir: str) -> Dict[str, str]:
+        audio, sr = separator_class.prepare_audio(y, sr)
+        sources = self._get_chunk_runner(separator_class).run(separate_chunk, audio, sr, self.report_progress)
+        self.track_buffers(audio, sources)
+
+        outputs = save_sources(sources, separator_class.TRACKS, sr, output_dir, self.output_subtype)
+        self.logger.info(f"Chunked separation completed with {len(outputs)} tracks")
+        return outputs
+
     def validate_input(self, input_path: str) -> bool:
         path = Path(input_path)
         if not path.exists():
@@ -51,49 +119,59 @@ class SeparationStage(PipelineStage):
         return True
 
     def execute(self, input_path: str, output_dir: str) -> Dict[str, str]:
+        separator_class = SeparatorFactory.get_separator_class(self.separator_type)
+
+        if self.chunking is not None and separator_class.supports_chunking:
+            y, sr = load_input(input_path, output_dir, mono=False)
+            if self.chunking.applies_to(y.shape[-1], sr):
+                self.logger.info(f"Starting chunked separation of {input_path}")
+                return self._execute_chunked(separator_class, y, sr, output_dir)
+
         separator = self._get_separator()
 
         if not separator.validate():
             raise RuntimeError("Separator model not properly initialized")
 
+        separator.output_subtype = self.output_subtype
+        separator.buffer_bytes = 0
+        separator.progress_callback = self.report_progress
+
         self.logger.info(f"Starting separation of {input_path}")
         outputs = separator.separate(input_path, output_dir)
+        self.buffer_bytes += separator.buffer_bytes
 
         self.logger.info(f"Separation completed with {len(outputs)} tracks")
         return outputs
 
 
 class HarmonicPercussiveStage(PipelineStage):
-    def __init__(self):
+    def __init__(self, chunking: Optional[ChunkingConfig] = None):
         super().__init__(
             name="harmonic_percussive_separation",
             processor_type="decomposition"
         )
+        self.chunking = chunking
 
     def validate_input(self, input_path: str) -> bool:
         return Path(input_path).exists()
 
     def execute(self, input_path: str, output_dir: str) -> Dict[str, str]:
-        import librosa
-        import soundfile as sf
-
         try:
             output_path = Path(output_dir) / "harmonic_percussive"
             output_path.mkdir(parents=True, exist_ok=True)
 
             self.logger.info(f"Loading audio from {input_path}")
-            result = librosa.load(input_path, sr=None)
-            self.logger.info(f"librosa.load returned: {type(result)}, len={len(result) if isinstance(result, tuple) else 'N/A'}")
-            y, sr = result
+            y, sr = load_input(input_path, output_dir)
             self.logger.info(f"Audio loaded: shape={getattr(y, 'shape', 'N/A')}, sr={sr}")
-            
-            harmonic, percussive = librosa.effects.hpss(y)
+
+            harmonic, percussive = harmonic_percussive(y, sr, self.chunking)
+            self.track_buffers(y, harmonic, percussive)
 
             harmonic_path = output_path / "harmonic.wav"
             percussive_path = output_path / "percussive.wav"
 
-            sf.write(str(harmonic_path), harmonic, sr)
-            sf.write(str(percussive_path), percussive, sr)
+            write_audio(str(harmonic_path), harmonic, sr, self.output_subtype)
+            write_audio(str(percussive_path), percussive, sr, self.output_subtype)
 
             self.logger.info("Harmonic/percussive separation completed")
             return {
@@ -107,39 +185,58 @@ class HarmonicPercussiveStage(PipelineStage):
 
 
 class CompositeTrackStage(PipelineStage):
-    def __init__(self):
+    def __init__(self, chunking: Optional[ChunkingConfig] = None):
         super().__init__(
             name="composite_track_creation",
             processor_type="composition"
         )
+        self.chunking = chunking
 
     def validate_input(self, input_path: str) -> bool:
         return Path(input_path).exists()
 
     def execute(self, input_path: str, output_dir: str) -> Dict[str, str]:
-        import librosa
-        import soundfile as sf
-
         try:
             output_path = Path(output_dir) / "composite"
             output_path.mkdir(parents=True, exist_ok=True)
 
-            self.logger.info(f"Loading audio from {input_path}")
-            result = librosa.load(input_path, sr=None)
-            self.logger.info(f"librosa.load returned: {type(result)}, len={len(result) if isinstance(result, tuple) else 'N/A'}")
-            y, sr = result
-            self.logger.info(f"Audio loaded: shape={getattr(y, 'shape', 'N/A')}, sr={sr}")
-
             main_path = output_path / "main.wav"
-            sf.write(str(main_path), y, sr)
-
-            harmonic, percussive = librosa.effects.hpss(y)
-
             main_harmonic_path = output_path / "main_harmonic.wav"
             main_percussive_path = output_path / "main_percussive.wav"
 
-            sf.write(str(main_harmonic_path), harmonic, sr)
-            sf.write(str(main_percussive_path), percussive, sr)
+            # Mix-level H/P files from HarmonicPercussiveStage are identical, reuse them
+            hp_dir = Path(output_dir) / "harmonic_percussive"
+            harmonic_src = hp_dir / "harmonic.wav"
+            percussive_src = hp_dir / "percussive.wav"
+
+            y, sr = None, None
+
+            if matches_output(input_path, self.output_subtype):
+                link_or_copy(input_path, str(main_path))
+                self.logger.info(f"Linked WAV input to {main_path}")
+            else:
+                self.logger.info(f"Loading audio from {input_path}")
+                y, sr = load_input(input_path, output_dir)
+                self.logger.info(f"Audio loaded: shape={getattr(y, 'shape', 'N/A')}, sr={sr}")
+                self.track_buffers(y)
+                write_audio(str(main_path), y, sr, self.output_subtype)
+
+            if harmonic_src.exists() and percussive_src.exists():
+                link_or_copy(str(harmonic_src), str(main_harmonic_path))
+                link_or_copy(str(percussive_src), str(main_percussive_path))
+                self.logger.info("Reused mix-level harmonic/percussive outputs")
+            else:
+                if y is None:
+                    self.logger.info(f"Loading audio from {input_path}")
+                    y, sr = load_input(input_path, output_dir)
+                    self.logger.info(f"Audio loaded: shape={getattr(y, 'shape', 'N/A')}, sr={sr}")
+                    self.track_buffers(y)
+
+                harmonic, percussive = harmonic_percussive(y, sr, self.chunking)
+                self.track_buffers(harmonic, percussive)
+
+                write_audio(str(main_harmonic_path), harmonic, sr, self.output_subtype)
+                write_audio(str(main_percussive_path), percussive, sr, self.output_subtype)
 
             self.logger.info("Composite track creation completed")
             return {
@@ -155,20 +252,18 @@ class CompositeTrackStage(PipelineStage):
 
 class SeparatedTrackHarmonicPercussiveStage(PipelineStage):
     """Apply harmonic/percussive separation to each separated track"""
-    def __init__(self):
+    def __init__(self, chunking: Optional[ChunkingConfig] = None):
         super().__init__(
             name="separated_track_harmonic_percussive",
             processor_type="decomposition"
         )
+        self.chunking = chunking
 
     def validate_input(self, input_path: str) -> bool:
         # This stage works on the demucs_output directory from previous stage
         return Path(input_path).exists()
 
     def execute(self, input_path: str, output_dir: str) -> Dict[str, str]:
-        import librosa
-        import soundfile as sf
-
         try:
             # Look for demucs_output directory
             demucs_output_dir = Path(output_dir) / "demucs_output"
@@ -182,7 +277,8 @@ class SeparatedTrackHarmonicPercussiveStage(PipelineStage):
             outputs = {}
             track_names = ["vocals", "drums", "bass", "other"]
             
-            for track_name in track_names:
+            for index, track_name in enumerate(track_names):
+                self.report_progress(index / len(track_names))
                 track_file = demucs_output_dir / f"{track_name}.wav"
                 
                 if not track_file.exists():
@@ -191,20 +287,24 @@ class SeparatedTrackHarmonicPercussiveStage(PipelineStage):
 
                 try:
                     self.logger.info(f"Processing {track_name} track...")
-                    y, sr = librosa.load(str(track_file), sr=None)
+                    y, sr = load_track(str(track_file), output_dir)
                     
                     # Apply harmonic/percussive source separation
-                    harmonic, percussive = librosa.effects.hpss(y)
+                    harmonic, percussive = harmonic_percussive(y, sr, self.chunking)
+                    self.track_buffers(y, harmonic, percussive)
                     
                     # Save harmonic component
                     harmonic_path = output_path / f"{track_name}_harmonic.wav"
-                    sf.write(str(harmonic_path), harmonic, sr)
+                    write_audio(str(harmonic_path), harmonic, sr, self.output_subtype)
                     outputs[f"{track_name}_harmonic"] = str(harmonic_path)
                     
                     # Save percussive component
                     percussive_path = output_path / f"{track_name}_percussive.wav"
-                    sf.write(str(percussive_path), percussive, sr)
+                    write_audio(str(percussive_path), percussive, sr, self.output_subtype)
                     outputs[f"{track_name}_percussive"] = str(percussive_path)
+
+                    # Release this track's buffers before loading the next one
+                    del y, harmonic, percussive
                     
                     self.logger.info(f"Completed H/P analysis for {track_name}")
                     
@@ -232,9 +332,6 @@ class NormalizationStage(PipelineStage):
         return Path(input_path).exists()
 
     def execute(self, input_path: str, output_dir: str) -> Dict[str, str]:
-        from pathlib import Path
-        import soundfile as sf
-        import librosa
         import numpy as np
 
         try:
@@ -242,30 +339,70 @@ class NormalizationStage(PipelineStage):
             output_path.mkdir(parents=True, exist_ok=True)
 
             self.logger.info(f"Reading audio from {input_path}")
-            # Try soundfile first, fallback to librosa for compatibility
-            try:
-                result = sf.read(input_path)
-                self.logger.info(f"sf.read returned: {type(result)}, len={len(result) if isinstance(result, tuple) else 'N/A'}")
-                y, sr = result
-            except Exception as e:
-                self.logger.warning(f"soundfile.read failed ({str(e)}), trying librosa...")
-                y, sr = librosa.load(input_path, sr=None, mono=True)
-            
+            y, sr = load_input(input_path, output_dir, mono=False)
             self.logger.info(f"Audio loaded: shape={getattr(y, 'shape', 'N/A')}, sr={sr}")
 
-            rms = np.sqrt(np.mean(y ** 2))
+            # float32 dot product avoids materialising y ** 2 as a second buffer
+            y = np.asarray(y)
+            flat = y.reshape(-1)
+            rms = np.sqrt(np.dot(flat, flat) / max(flat.size, 1))
             if rms > 0:
                 target_amplitude = 10 ** (self.target_db / 20.0)
-                y_normalized = y * (target_amplitude / rms)
+                y_normalized = np.multiply(y, target_amplitude / rms, dtype=np.float32)
             else:
-                y_normalized = y
+                y_normalized = np.array(y, dtype=np.float32)
+            self.track_buffers(y, y_normalized)
 
             normalized_path = output_path / f"normalized_{Path(input_path).name}"
-            sf.write(str(normalized_path), y_normalized, sr)
+            write_audio(str(normalized_path), y_normalized, sr, self.output_subtype)
 
             self.logger.info(f"Normalization completed (target: {self.target_db}dB)")
             return {"normalized": str(normalized_path)}
 
         except Exception as e:
             self.logger.error(f"Normalization failed: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+
+class AnalysisStage(PipelineStage):
+    """Summarise every output and store a waveform peak pyramid next to it"""
+    def __init__(self, samples_per_pixel: int = DEFAULT_SAMPLES_PER_PIXEL):
+        super().__init__(
+            name="output_analysis",
+            processor_type="analysis"
+        )
+        self.samples_per_pixel = samples_per_pixel
+
+    def validate_input(self, input_path: str) -> bool:
+        return Path(input_path).exists()
+
+    def execute(self, input_path: str, output_dir: str) -> Dict[str, str]:
+        output_path = Path(output_dir) / "analysis"
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        summaries = {}
+        # Deduplicated outputs share an inode, analyse each file once
+        by_inode = {}
+
+        for key, track_path in self.previous_outputs.items():
+            try:
+                stat = os.stat(track_path)
+                inode = (stat.st_dev, stat.st_ino)
+
+                if inode not in by_inode:
+                    analysis = analyze_audio(track_path, self.samples_per_pixel)
+                    for level in analysis.levels:
+                        self.track_buffers(level.mins, level.maxs)
+
+                    peaks_path = write_peaks(str(output_path / f"{key}.peaks"), analysis)
+                    by_inode[inode] = {**analysis.summary(), "peaks_file": peaks_path}
+
+                summaries[key] = by_inode[inode]
+
+            except Exception as e:
+                self.logger.error(f"Failed to analyse {key}: {str(e)}")
+                continue
+
+        self.metadata["analysis"] = summaries
+        self.logger.info(f"Analysis completed for {len(summaries)} outputs")
+        return {}
@@ -1,14 +1,41 @@
 import logging
+import threading
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.audio_io import (
+    DEFAULT_OUTPUT_SUBTYPE,
+    buffer_nbytes,
+    intermediate_path,
+    load_input,
+    write_audio,
+    write_intermediate
+)
+from core.metrics import REGISTRY
+
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "separator_model_load_seconds",
+    "Time to load a separation model",
+    ("model",),
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+MODELS_LOADED = REGISTRY.gauge("separator_models_loaded", "Separation models held in memory", ("model",))
 
 logger = logging.getLogger(__name__)
 
 
 class SeparatorModel(ABC):
+    supports_chunking = False
+
     def __init__(self, model_name: str):
         self.model_name = model_name
+        self.output_subtype = DEFAULT_OUTPUT_SUBTYPE
+        self.buffer_bytes = 0
+        self.progress_callback: Optional[Callable[[float], None]] = None
         self.logger = logging.getLogger(f"separator.{model_name}")
 
     @abstractmethod
@@ -19,23 +46,38 @@ class SeparatorModel(ABC):
     def validate(self) -> bool:
         pass
 
+    def warm_up(self) -> None:
+        """Run the model once on a dummy input."""
+
     @abstractmethod
     def get_supported_tracks(self) -> List[str]:
         pass
 
 
 class DemucsModel(SeparatorModel):
+    SAMPLE_RATE = 44100
+    TRACKS = ["drums", "bass", "other", "vocals"]
+    supports_chunking = True
+    # apply_model has no progress hook, so progress is estimated from elapsed time at this interval
+    PROGRESS_INTERVAL_SECONDS = 1.0
+    WARMUP_SECONDS = 1.0
+
     def __init__(self, model_name: str = "htdemucs_ft", device: str = "cpu"):
         super().__init__(model_name)
         self.device = device
         self.demucs = None
+        # Wall seconds per second of audio, learnt from earlier runs to pace progress estimates
+        self.seconds_per_audio_second = 1.0
         self._load_model()
 
     def _load_model(self):
         try:
             from demucs.pretrained import get_model
+            start = time.perf_counter()
             self.demucs = get_model(self.model_name)
             self.demucs.to(self.device)
+            MODEL_LOAD_SECONDS.observe(time.perf_counter() - start, model=self.model_name)
+            MODELS_LOADED.inc(model=self.model_name)
             self.logger.info(f"Demucs model {self.model_name} loaded on {self.device}")
         except ImportError:
             raise RuntimeError("Demucs not installed. Install with: pip install demucs")
@@ -43,90 +85,164 @@ class DemucsModel(SeparatorModel):
     def validate(self) -> bool:
         return self.demucs is not None
 
+    def warm_up(self) -> None:
+        # The first forward pass pays for allocator pools and kernel selection
+        self._apply(np.zeros((2, int(self.WARMUP_SECONDS * self.SAMPLE_RATE)), dtype=np.float32))
+        self.buffer_bytes = 0
+
     def get_supported_tracks(self) -> List[str]:
-        return ["drums", "bass", "other", "vocals"]
+        return list(self.TRACKS)
 
-    def separate(self, input_path: str, output_dir: str) -> Dict[str, str]:
+    @classmethod
+    def prepare_audio(cls, audio: np.ndarray, sr: int) -> Tuple[np.ndarray, int]:
+        """Bring (channels, frames) audio to the stereo 44.1 kHz layout Demucs expects."""
         import torch
         import torchaudio
-        import librosa
-        from pathlib import Path
+
+        wav = torch.from_numpy(np.array(audio, dtype=np.float32))
+
+        # Demucs expects (channels, samples) format
+        if wav.dim() == 1:
+            wav = wav.unsqueeze(0)  # Add channel dimension if mono
+
+        # Ensure stereo (Demucs needs at least 2 channels)
+        if wav.shape[0] == 1:
+            wav = wav.repeat(2, 1)  # Duplicate mono to stereo
+
+        # Resample to 44.1 kHz if needed (Demucs standard)
+        if sr != cls.SAMPLE_RATE:
+            logger.info(f"Resampling from {sr} to {cls.SAMPLE_RATE} Hz...")
+            resampler = torchaudio.transforms.Resample(sr, cls.SAMPLE_RATE)
+            wav = resampler(wav)
+
+        return wav.numpy(), cls.SAMPLE_RATE
+
+    def separate_array(
+        self,
+        audio: np.ndarray,
+        sr: int,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> np.ndarray:
+        """Separate (channels, frames) audio into a (sources, channels, frames) float32 array.
+
+        The whole input always goes through the model in one call, so a
+        progress callback never changes the result; it receives estimates
+        paced by how long earlier runs took, then 1.0 once done.
+        """
+        audio, sr = self.prepare_audio(audio, sr)
+        if progress is None:
+            return self._apply(audio)
+
+        duration = audio.shape[-1] / sr
+        expected = max(duration * self.seconds_per_audio_second, 1e-3)
+        start = time.perf_counter()
+        done = threading.Event()
+        failures: List[BaseException] = []
+
+        def report():
+            while not done.wait(self.PROGRESS_INTERVAL_SECONDS):
+                try:
+                    progress(min(0.99, (time.perf_counter() - start) / expected))
+                except BaseException as e:
+                    # e.g. a cancellation; raised once the model call returns
+                    failures.append(e)
+                    return
+
+        reporter = threading.Thread(target=report, name="separation-progress", daemon=True)
+        reporter.start()
+        try:
+            sources = self._apply(audio)
+        finally:
+            done.set()
+            reporter.join()
+        if failures:
+            raise failures[0]
+
+        if duration > 0:
+            self.seconds_per_audio_second = (time.perf_counter() - start) / duration
+        progress(1.0)
+        return sources
+
+    def _apply(self, audio: np.ndarray) -> np.ndarray:
+        import torch
         from demucs.apply import apply_model
 
+        # apply_model expects [batch, channels, samples]
+        wav = torch.from_numpy(audio).unsqueeze(0).to(self.device)
+        del audio
+        self.buffer_bytes += buffer_nbytes(wav)
+        self.logger.info(f"Audio prepared for separation: shape={wav.shape}, device={self.device}")
+
+        # Run separation using apply_model() from demucs.apply
+        with torch.no_grad():
+            result = apply_model(self.demucs, wav)
+            self.logger.info(f"apply_model returned: {type(result)}, shape: {result.shape}")
+
+            # apply_model returns tensor with shape [batch, sources, channels, length]
+            # Remove batch dimension since we process one file at a time
+            if result.shape[0] == 1:
+                result = result.squeeze(0)  # Now shape is [sources, channels, length]
+
+            self.logger.info(f"sources shape after batch squeeze: {result.shape}")
+
+        # The mix is no longer needed once the sources exist
+        del wav
+        sources = result.cpu().numpy()
+        self.buffer_bytes += buffer_nbytes(sources)
+        return sources
+
+    def separate(self, input_path: str, output_dir: str) -> Dict[str, str]:
         try:
-            output_path = Path(output_dir) / "demucs_output"
-            output_path.mkdir(parents=True, exist_ok=True)
-
-            # Try to load audio file with torchaudio, fallback to librosa
-            try:
-                wav, sr = torchaudio.load(input_path)
-                self.logger.info(f"Loaded audio with torchaudio: {wav.shape}, sr={sr}")
-            except Exception as e:
-                self.logger.warning(f"torchaudio load failed ({str(e)}), trying librosa...")
-                # Fallback: use librosa to load
-                y, sr = librosa.load(input_path, sr=44100, mono=False)
-                
-                # Convert numpy to torch tensor
-                wav = torch.from_numpy(y).float()
-                
-                # Ensure stereo format
-                if wav.dim() == 1:
-                    wav = wav.unsqueeze(0)
-                
-                self.logger.info(f"Loaded audio with librosa: {wav.shape}, sr={sr}")
-            
-            # Ensure audio is in correct format for Demucs
-            # Demucs expects (channels, samples) format
-            if wav.dim() == 1:
-                wav = wav.unsqueeze(0)  # Add channel dimension if mono
-            
-            # Ensure stereo (Demucs needs at least 2 channels)
-            if wav.shape[0] == 1:
-                wav = wav.repeat(2, 1)  # Duplicate mono to stereo
-            
-            # Resample to 44.1 kHz if needed (Demucs standard)
-            if sr != 44100:
-                self.logger.info(f"Resampling from {sr} to 44100 Hz...")
-                resampler = torchaudio.transforms.Resample(sr, 44100)
-                wav = resampler(wav)
-                sr = 44100
-            
-            # Add batch dimension if missing (apply_model expects [batch, channels, samples])
-            if wav.dim() == 2:
-                wav = wav.unsqueeze(0)
-            
-            wav = wav.to(self.device)
-            self.logger.info(f"Audio prepared for separation: shape={wav.shape}, device={self.device}")
-
-            # Run separation using apply_model() from demucs.apply
-            with torch.no_grad():
-                result = apply_model(self.demucs, wav)
-                self.logger.info(f"apply_model returned: {type(result)}, shape: {result.shape}")
-                
-                # apply_model returns tensor with shape [batch, sources, channels, length]
-                # Remove batch dimension since we process one file at a time
-                if result.shape[0] == 1:
-                    result = result.squeeze(0)  # Now shape is [sources, channels, length]
-                
-                self.logger.info(f"sources shape after batch squeeze: {result.shape}")
-                sources = result
-
-            outputs = {}
-            for track_idx, track_name in enumerate(self.get_supported_tracks()):
-                track_path = output_path / f"{track_name}.wav"
-                # Save on CPU to avoid memory issues
-                source = sources[track_idx]  # Get the separated track
-                torchaudio.save(str(track_path), source.cpu(), sr)
-                outputs[track_name] = str(track_path)
-                self.logger.info(f"Saved {track_name} to {track_path}")
-
-            return outputs
+            # Decode once through the shared input intermediate
+            y, sr = load_input(input_path, output_dir, mono=False)
+            self.logger.info(f"Loaded audio: {y.shape}, sr={sr}")
+
+            sources = self.separate_array(y, sr, self.progress_callback)
+            return save_sources(sources, self.TRACKS, self.SAMPLE_RATE, output_dir, self.output_subtype)
 
         except Exception as e:
             self.logger.error(f"Separation failed: {str(e)}")
             raise
 
 
+def save_sources(
+    sources: np.ndarray,
+    track_names: List[str],
+    sr: int,
+    output_dir: str,
+    subtype: str = DEFAULT_OUTPUT_SUBTYPE
+) -> Dict[str, str]:
+    output_path = Path(output_dir) / "demucs_output"
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    outputs = {}
+    for track_idx, track_name in enumerate(track_names):
+        track_path = output_path / f"{track_name}.wav"
+        source = sources[track_idx]
+        write_audio(str(track_path), source, sr, subtype)
+        write_intermediate(str(intermediate_path(output_dir, track_name)), source, sr)
+        outputs[track_name] = str(track_path)
+        logger.info(f"Saved {track_name} to {track_path}")
+
+    return outputs
+
+
+# Per-process separator used by chunked separation workers
+_chunk_separator: Optional[SeparatorModel] = None
+
+
+def init_chunk_worker(separator_class: type, kwargs: Dict, threads: int) -> None:
+    global _chunk_separator
+    import torch
+
+    torch.set_num_threads(threads)
+    _chunk_separator = separator_class(**kwargs)
+
+
+def separate_chunk(chunk: np.ndarray) -> np.ndarray:
+    return _chunk_separator.separate_array(chunk, _chunk_separator.SAMPLE_RATE)
+
+
 class SeparatorFactory:
     _separators = {
         "demucs": DemucsModel
@@ -139,14 +255,17 @@ class SeparatorFactory:
 
     @classmethod
     def create_separator(cls, separator_type: str, **kwargs) -> SeparatorModel:
+        separator_class = cls.get_separator_class(separator_type)
+        return separator_class(**kwargs)
+
+    @classmethod
+    def get_separator_class(cls, separator_type: str) -> type:
         if separator_type not in cls._separators:
             raise ValueError(
                 f"Unknown separator type: {separator_type}. "
                 f"Available: {list(cls._separators.keys())}"
             )
-
-        separator_class = cls._separators[separator_type]
-        return separator_class(**kwargs)
+        return cls._separators[separator_type]
 
     @classmethod
     def get_available_separators(cls) -> List[str]:
@@ -0,0 +1,175 @@
+import itertools
+import logging
+import math
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Tuple
+from uuid import uuid4
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+N_FFT = 2048
+HOP_LENGTH = 1024
+STREAM_BLOCK_FRAMES = 65536
+
+TILE_WIDTH = 256
+TILE_HEIGHT = 256
+FREQUENCY_SCALES = ("linear", "log")
+LOG_MIN_HZ = 20.0
+# dB range mapped onto the colour scale; fixed so neighbouring tiles line up
+MIN_DB = -90.0
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Magma-like colour map anchors, interpolated into a 256 entry palette
+PALETTE_ANCHORS = np.array([
+    (0, 0, 4), (81, 18, 124), (183, 55, 121), (252, 137, 97), (252, 253, 191)
+], dtype=np.float32)
+
+
+def _palette() -> bytes:
+    positions = np.linspace(0, len(PALETTE_ANCHORS) - 1, 256)
+    channels = [np.interp(positions, np.arange(len(PALETTE_ANCHORS)), PALETTE_ANCHORS[:, c]) for c in range(3)]
+    return np.round(np.stack(channels, axis=1)).astype(np.uint8).tobytes()
+
+
+PALETTE = _palette()
+
+
+def _stft_magnitudes(buffer: np.ndarray, window: np.ndarray, hop_length: int, limit: int) -> np.ndarray:
+    n_fft = len(window)
+    count = min(max(0, (len(buffer) - n_fft) // hop_length + 1), limit)
+    frames = np.lib.stride_tricks.sliding_window_view(buffer, n_fft)[::hop_length][:count]
+    # Scaled so a full-scale sine reads 1.0
+    return (np.abs(np.fft.rfft(frames * window, axis=1)) * (2.0 / window.sum())).astype(np.float32)
+
+
+def compute_spectrogram(path: str, dest_path: str, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH) -> str:
+    """Magnitude STFT of the mono mixdown in one streaming pass, saved as a (frames, bins) float32 .npy.
+
+    Frames are centred like librosa's, frame i on sample i * hop_length. The
+    result is written straight into a memory-mapped file, so memory stays
+    bounded by one block whatever the track length.
+    """
+    import soundfile as sf
+
+    info = sf.info(path)
+    count = info.frames // hop_length + 1
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+
+    dest = Path(dest_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    # API processes may compute the same track at once, each writes its own file and the last rename wins
+    tmp_path = dest.with_name(f".{dest.name}.{uuid4().hex}.tmp")
+
+    try:
+        spec = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(count, n_fft // 2 + 1))
+        row = 0
+        buffer = np.zeros(n_fft // 2, dtype=np.float32)
+        blocks = sf.blocks(path, blocksize=STREAM_BLOCK_FRAMES, dtype="float32", always_2d=True)
+        # Trailing half window of silence, the mirror of the leading one
+        for block in itertools.chain(blocks, [np.zeros((n_fft // 2, 1), dtype=np.float32)]):
+            buffer = np.concatenate([buffer, block.mean(axis=1)])
+            magnitudes = _stft_magnitudes(buffer, window, hop_length, count - row)
+            spec[row:row + len(magnitudes)] = magnitudes
+            row += len(magnitudes)
+            buffer = buffer[len(magnitudes) * hop_length:]
+
+        spec.flush()
+        del spec
+        os.replace(tmp_path, dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return str(dest)
+
+
+@dataclass
+class TileGrid:
+    """Tile layout of a spectrogram: zoom 0 fits the whole track in one tile, each zoom doubles the width."""
+    frames: int
+    sample_rate: int
+    hop_length: int = HOP_LENGTH
+
+    @property
+    def max_zoom(self) -> int:
+        return max(0, math.ceil(math.log2(max(1, math.ceil(self.frames / TILE_WIDTH)))))
+
+    def frames_per_pixel(self, zoom: int) -> int:
+        return 2 ** (self.max_zoom - zoom)
+
+    def tile_count(self, zoom: int) -> int:
+        return math.ceil(self.frames / (TILE_WIDTH * self.frames_per_pixel(zoom)))
+
+    def tile_seconds(self, zoom: int) -> float:
+        return TILE_WIDTH * self.frames_per_pixel(zoom) * self.hop_length / self.sample_rate
+
+    def check(self, zoom: int, x: int) -> None:
+        if not 0 <= zoom <= self.max_zoom:
+            raise ValueError(f"zoom must be between 0 and {self.max_zoom}")
+        if not 0 <= x < self.tile_count(zoom):
+            raise ValueError(f"x must be between 0 and {self.tile_count(zoom) - 1} at zoom {zoom}")
+
+
+def _row_bins(bins: int, sample_rate: int, scale: str, height: int) -> np.ndarray:
+    """First FFT bin of each image row, bottom row first."""
+    if scale == "log":
+        nyquist = sample_rate / 2
+        edges = np.geomspace(min(LOG_MIN_HZ, nyquist), nyquist, height + 1) / nyquist * (bins - 1)
+    else:
+        edges = np.linspace(0, bins, height + 1)
+    return np.minimum(edges[:-1].astype(np.int64), bins - 1)
+
+
+def render_tile(spec: np.ndarray, grid: TileGrid, zoom: int, x: int, scale: str = "linear") -> np.ndarray:
+    """One TILE_HEIGHT x TILE_WIDTH tile as 8-bit colour indices, highest frequency on top.
+
+    Only the frames under the tile are read, and each pixel keeps the loudest
+    frame and bin it covers, so transients survive zooming out.
+    """
+    if scale not in FREQUENCY_SCALES:
+        raise ValueError(f"Unsupported frequency scale: {scale}. Available: {list(FREQUENCY_SCALES)}")
+    grid.check(zoom, x)
+
+    per_pixel = grid.frames_per_pixel(zoom)
+    start = x * TILE_WIDTH * per_pixel
+    # Pixel by pixel, so zoomed-out tiles never hold more than one pixel's frames in memory
+    columns = np.zeros((TILE_WIDTH, spec.shape[1]), dtype=np.float32)
+    for pixel in range(TILE_WIDTH):
+        frames = spec[start + pixel * per_pixel:start + (pixel + 1) * per_pixel]
+        if not len(frames):
+            break
+        columns[pixel] = frames.max(axis=0)
+
+    # reduceat keeps a single bin for rows that share one, which low log-scale rows do
+    pooled = np.maximum.reduceat(columns, _row_bins(spec.shape[1], grid.sample_rate, scale, TILE_HEIGHT), axis=1)
+    db = 20 * np.log10(np.maximum(pooled, 1e-9))
+    levels = np.clip((db - MIN_DB) / -MIN_DB, 0.0, 1.0) * 255
+    return np.round(levels).astype(np.uint8).T[::-1]
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def encode_png(pixels: np.ndarray, palette: bytes = PALETTE) -> bytes:
+    """8-bit palette PNG of a 2-D array of colour indices."""
+    height, width = pixels.shape
+    # Every scanline starts with filter type 0 (none)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels]).tobytes()
+    return b"".join([
+        PNG_SIGNATURE,
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)),
+        _png_chunk(b"PLTE", palette),
+        _png_chunk(b"IDAT", zlib.compress(raw, 6)),
+        _png_chunk(b"IEND", b"")
+    ])
+
+
+def tile_time_range(grid: TileGrid, zoom: int, x: int) -> Tuple[float, float]:
+    seconds = grid.tile_seconds(zoom)
+    return x * seconds, (x + 1) * seconds
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+INTERMEDIATE_DIR = "intermediate"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(src: str, dst: str) -> bool:
+    """Make dst a hardlink to src, copying when the filesystem refuses links.
+
+    Returns True when a hardlink was created.
+    """
+    src_path, dst_path = Path(src), Path(dst)
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst_path.with_name(f".{dst_path.name}.{uuid4().hex}.tmp")
+
+    try:
+        os.link(src_path, tmp_path)
+        linked = True
+    except OSError:
+        shutil.copyfile(src_path, tmp_path)
+        linked = False
+
+    os.replace(tmp_path, dst_path)
+    return linked
+
+
+def evict_lru(directory: Path, max_bytes: int, keep: Optional[Path] = None) -> int:
+    """Delete the least recently accessed files until directory fits max_bytes; returns the bytes left.
+
+    Dotfiles are in-progress writes and are neither counted nor removed.
+    """
+    entries = []
+    for path in Path(directory).iterdir():
+        if path.name.startswith(".") or path == keep:
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_atime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if keep is not None and keep.exists():
+        total += keep.stat().st_size
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+    return total
+
+
+class OutputDeduplicator:
+    """Detects outputs with identical content and hardlinks them together.
+
+    Files are only hashed when another output of the same size exists, and
+    files that already share an inode are aliased without reading them.
+    """
+
+    def __init__(self):
+        self._by_size: Dict[int, List[Tuple[str, str]]] = {}
+        self._digests: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+        self.bytes_saved = 0
+
+    def _digest(self, path: str) -> str:
+        if path not in self._digests:
+            self._digests[path] = file_sha256(path)
+        return self._digests[path]
+
+    def add(self, key: str, path: str) -> Optional[str]:
+        if not os.path.isfile(path):
+            return None
+
+        size = os.path.getsize(path)
+        if size == 0:
+            return None
+
+        candidates = self._by_size.setdefault(size, [])
+        for canonical_key, canonical_path in candidates:
+            if os.path.samefile(canonical_path, path):
+                self.aliases[key] = canonical_key
+                self.bytes_saved += size
+                return canonical_key
+
+            if self._digest(canonical_path) == self._digest(path):
+                if link_or_copy(canonical_path, path):
+                    self.bytes_saved += size
+                self.aliases[key] = canonical_key
+                logger.info(f"Output {key} duplicates {canonical_key}, linked")
+                return canonical_key
+
+        candidates.append((key, path))
+        return None
@@ -0,0 +1,52 @@
+import io
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from api.archive import iter_archive
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.entries = []
+        for name, size in [("vocals.wav", 3 * 1024 * 1024 + 17), ("drums.wav", 512)]:
+            path = self.temp_dir / name
+            path.write_bytes(bytes(range(256)) * (size // 256) + b"x" * (size % 256))
+            self.entries.append((path, f"demucs_output/{name}"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_streamed_zip_is_valid(self):
+        for compress in (False, True):
+            data = b"".join(iter_archive(self.entries, "zip", compress))
+            archive = zipfile.ZipFile(io.BytesIO(data))
+
+            self.assertIsNone(archive.testzip())
+            for path, arcname in self.entries:
+                self.assertEqual(archive.read(arcname), path.read_bytes())
+
+    def test_zip_entries_are_stored_by_default(self):
+        data = b"".join(iter_archive(self.entries))
+        for info in zipfile.ZipFile(io.BytesIO(data)).infolist():
+            self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+
+    def test_streamed_tar_is_valid(self):
+        chunks = list(iter_archive(self.entries, "tar"))
+        archive = tarfile.open(fileobj=io.BytesIO(b"".join(chunks)))
+
+        for path, arcname in self.entries:
+            self.assertEqual(archive.extractfile(arcname).read(), path.read_bytes())
+        self.assertGreater(len(chunks), len(self.entries))
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            iter_archive(self.entries, "rar")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from core.audio_io import (
+    buffer_nbytes,
+    intermediate_path,
+    load_input,
+    read_intermediate,
+    write_audio,
+    write_intermediate
+)
+from core.peaks import analyze_audio, encode_dat, encode_json, level_for_zoom, read_peaks, write_peaks
+
+
+class TestIntermediates(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_roundtrip_is_memory_mapped(self):
+        audio = np.random.randn(2, 1000).astype(np.float64)
+        path = intermediate_path(self.temp_dir, "vocals")
+
+        write_intermediate(str(path), audio, 44100)
+        loaded, sr = read_intermediate(str(path))
+
+        self.assertEqual(sr, 44100)
+        self.assertEqual(loaded.dtype, np.float32)
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_allclose(loaded, audio.astype(np.float32))
+
+    def test_load_input_reuses_intermediate(self):
+        audio = np.stack([np.ones(100), np.zeros(100)]).astype(np.float32)
+        write_intermediate(str(intermediate_path(self.temp_dir, "input")), audio, 8000)
+
+        mono, sr = load_input(str(Path(self.temp_dir) / "missing.wav"), self.temp_dir)
+
+        self.assertEqual(sr, 8000)
+        self.assertEqual(mono.shape, (100,))
+        np.testing.assert_allclose(mono, 0.5)
+
+
+class TestOutputFormat(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_write_audio_subtype(self):
+        import soundfile as sf
+
+        audio = np.zeros((2, 100), dtype=np.float32)
+        wav_path = Path(self.temp_dir) / "out.wav"
+        flac_path = Path(self.temp_dir) / "out.flac"
+
+        write_audio(str(wav_path), audio, 8000, "PCM_24")
+        write_audio(str(flac_path), audio, 8000, "FLOAT")
+
+        self.assertEqual(sf.info(str(wav_path)).subtype, "PCM_24")
+        self.assertEqual(sf.info(str(wav_path)).channels, 2)
+        self.assertNotEqual(sf.info(str(flac_path)).subtype, "FLOAT")
+
+    def test_write_audio_rejects_unknown_subtype(self):
+        with self.assertRaises(ValueError):
+            write_audio(str(Path(self.temp_dir) / "out.wav"), np.zeros(10), 8000, "PCM_8")
+
+    def test_buffer_nbytes_ignores_views(self):
+        audio = np.zeros(100, dtype=np.float32)
+        self.assertEqual(buffer_nbytes(audio), 400)
+        self.assertEqual(buffer_nbytes(audio[10:]), 0)
+
+
+class TestPeaks(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_streaming_analysis_matches_full_read(self):
+        import soundfile as sf
+
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal((200000, 2)) * 0.2).astype(np.float32)
+        path = str(Path(self.temp_dir) / "track.wav")
+        sf.write(path, audio, 44100, subtype="FLOAT")
+
+        analysis = analyze_audio(path, samples_per_pixel=256)
+
+        self.assertEqual(analysis.frames, 200000)
+        self.assertAlmostEqual(analysis.rms, float(np.sqrt(np.mean(audio.astype(np.float64) ** 2))), places=5)
+        self.assertAlmostEqual(analysis.peak, float(np.abs(audio).max()), places=6)
+
+        base = analysis.levels[0]
+        self.assertEqual(len(base), int(np.ceil(200000 / 256)))
+        self.assertAlmostEqual(float(base.maxs[3]), float(audio[768:1024].max()), places=6)
+        self.assertAlmostEqual(float(base.mins[-1]), float(audio[199936:].min()), places=6)
+        self.assertLessEqual(len(analysis.levels[-1]), 256)
+
+    def test_peaks_roundtrip(self):
+        import soundfile as sf
+
+        path = str(Path(self.temp_dir) / "track.wav")
+        sf.write(path, np.linspace(-1, 1, 10000, dtype=np.float32), 8000, subtype="FLOAT")
+        analysis = analyze_audio(path, samples_per_pixel=100)
+
+        peaks_path = write_peaks(str(Path(self.temp_dir) / "track.peaks"), analysis)
+        levels = read_peaks(peaks_path)
+
+        self.assertEqual([l.samples_per_pixel for l in levels], [100])
+        self.assertEqual(len(levels[0]), 100)
+        np.testing.assert_allclose(levels[0].maxs, analysis.levels[0].maxs, atol=1 / 127)
+
+    def test_concurrent_peak_writes_all_succeed(self):
+        import soundfile as sf
+        from concurrent.futures import ThreadPoolExecutor
+
+        path = str(Path(self.temp_dir) / "track.wav")
+        sf.write(path, np.linspace(-1, 1, 10000, dtype=np.float32), 8000, subtype="FLOAT")
+        analysis = analyze_audio(path, samples_per_pixel=100)
+        peaks_path = str(Path(self.temp_dir) / "track.peaks")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: write_peaks(peaks_path, analysis), range(16)))
+
+        self.assertEqual(set(results), {peaks_path})
+        self.assertEqual(len(read_peaks(peaks_path)[0]), 100)
+        self.assertEqual(sorted(p.name for p in Path(self.temp_dir).iterdir()), ["track.peaks", "track.wav"])
+
+    def test_level_for_zoom_merges_pixels(self):
+        import soundfile as sf
+
+        rng = np.random.default_rng(1)
+        audio = (rng.standard_normal(50000) * 0.3).astype(np.float32)
+        path = str(Path(self.temp_dir) / "track.wav")
+        sf.write(path, audio, 8000, subtype="FLOAT")
+        levels = analyze_audio(path, samples_per_pixel=64).levels
+
+        level = level_for_zoom(levels, 384)
+        self.assertEqual(level.samples_per_pixel, 384)
+        self.assertEqual(len(level), int(np.ceil(50000 / 384)))
+        self.assertAlmostEqual(float(level.maxs[2]), float(audio[768:1152].max()), places=6)
+        self.assertIs(level_for_zoom(levels, 10), levels[0])
+
+        whole = level_for_zoom(levels, 10 ** 12)
+        self.assertEqual(len(whole), 1)
+        self.assertGreaterEqual(whole.samples_per_pixel, len(audio))
+        self.assertAlmostEqual(float(whole.maxs[0]), float(audio.max()), delta=1 / 127)
+
+        data = encode_json(level, 8000)
+        self.assertEqual((data["sample_rate"], data["length"], len(data["data"])), (8000, len(level), 2 * len(level)))
+        dat = encode_dat(level, 8000)
+        self.assertEqual(len(dat), 20 + 2 * len(level))
+
+
+if __name__ == "__main__":
+    unittest.main()
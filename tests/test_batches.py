@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from api.batches import batch_archive_entries, batch_summary, resolve_local_paths
+from core.pipeline import ProcessingManifest, ProcessingStage
+
+BATCH = {"batch_id": "batch", "priority": "batch", "max_parallel": 2}
+
+
+def _job(job_id: str, status: str, index: int = 0, started_at=None, finished_at=None, error=None) -> dict:
+    return {
+        "job_id": job_id,
+        "filename": f"{job_id}.wav",
+        "status": status,
+        "batch_index": index,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "error": error
+    }
+
+
+def _manifest(job_id: str, stages=(), duration: float = 0.0) -> ProcessingManifest:
+    return ProcessingManifest(
+        job_id=job_id,
+        input_file=f"{job_id}.wav",
+        created_at="2024-01-15T10:30:45",
+        version="1.0",
+        stages=[ProcessingStage(name=name, processor_type="test", status=status) for name, status in stages],
+        outputs={},
+        metadata={"input_duration_seconds": duration},
+        status="processing"
+    )
+
+
+class TestBatches(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_local_paths_stay_under_root(self):
+        root = self.temp_dir / "root"
+        (root / "album").mkdir(parents=True)
+        (root / "album" / "a.wav").write_bytes(b"RIFF")
+        (root / "notes.txt").write_text("x")
+        (self.temp_dir / "outside.wav").write_bytes(b"RIFF")
+
+        self.assertEqual(resolve_local_paths(["album/a.wav"], str(root), ["wav"], 10), [root.resolve() / "album" / "a.wav"])
+
+        for paths, status in (
+            (["../outside.wav"], 403),
+            ([str(self.temp_dir / "outside.wav")], 403),
+            (["album/missing.wav"], 400),
+            (["notes.txt"], 415),
+            ([], 400),
+            (["album/a.wav"] * 3, 400)
+        ):
+            with self.assertRaises(HTTPException) as raised:
+                resolve_local_paths(paths, str(root), ["wav"], 2)
+            self.assertEqual(raised.exception.status_code, status, paths)
+
+        with self.assertRaises(HTTPException) as raised:
+            resolve_local_paths(["album/a.wav"], "", ["wav"], 10)
+        self.assertEqual(raised.exception.status_code, 403)
+
+    def test_summary_reports_progress_and_throughput(self):
+        jobs = [
+            _job("a", "completed", 0, started_at=100.0, finished_at=130.0),
+            _job("b", "running", 1, started_at=130.0),
+            _job("c", "queued", 2)
+        ]
+        manifests = {
+            "a": _manifest("a", duration=60.0),
+            "b": _manifest("b", [("separation", "completed"), ("normalization", "processing")])
+        }
+
+        summary = batch_summary(BATCH, jobs, manifests.get)
+
+        self.assertEqual(summary["status"], "running")
+        self.assertEqual(summary["counts"]["completed"], 1)
+        self.assertEqual([item["progress"] for item in summary["items"]], [100.0, 50.0, 0.0])
+        self.assertEqual(summary["progress"], 50.0)
+        self.assertEqual(summary["items"][0]["duration_seconds"], 30.0)
+        self.assertGreater(summary["throughput"]["estimated_remaining_seconds"], 0)
+
+    def test_finished_batch_status_and_rates(self):
+        jobs = [
+            _job("a", "completed", 0, started_at=100.0, finished_at=130.0),
+            _job("b", "failed", 1, started_at=100.0, finished_at=160.0, error="boom")
+        ]
+        summary = batch_summary(BATCH, jobs, {"a": _manifest("a", duration=120.0), "b": _manifest("b")}.get)
+
+        self.assertEqual(summary["status"], "partial")
+        self.assertEqual(summary["throughput"]["elapsed_seconds"], 60.0)
+        self.assertEqual(summary["throughput"]["items_per_minute"], 2.0)
+        self.assertEqual(summary["throughput"]["audio_seconds_per_second"], 2.0)
+        self.assertEqual(summary["items"][1]["error"], "boom")
+
+        cancelled = [_job("a", "cancelled", 0), _job("b", "cancelled", 1)]
+        self.assertEqual(batch_summary(BATCH, cancelled, lambda job_id: None)["status"], "cancelled")
+        failed = [_job("a", "failed", 0), _job("b", "cancelled", 1)]
+        self.assertEqual(batch_summary(BATCH, failed, lambda job_id: None)["status"], "failed")
+
+    def test_archive_holds_completed_items_per_folder(self):
+        job_dir = self.temp_dir / "a"
+        (job_dir / "demucs_output").mkdir(parents=True)
+        vocals = job_dir / "demucs_output" / "vocals.wav"
+        vocals.write_bytes(b"data")
+        shared = self.temp_dir / "shared.wav"
+        shared.write_bytes(b"data")
+        outputs = {
+            "a": {"vocals": str(vocals), "main": str(shared), "drums": str(job_dir / "missing.wav")},
+            "b": {"vocals": str(vocals)}
+        }
+        jobs = [_job("a", "completed", 0), _job("b", "failed", 1)]
+
+        entries = batch_archive_entries(jobs, outputs.get, self.temp_dir)
+
+        self.assertEqual(
+            sorted(arcname for _, arcname in entries),
+            ["001_a/demucs_output/vocals.wav", "001_a/shared.wav"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
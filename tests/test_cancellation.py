@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.cancellation import cancel_response
+from api.scheduler import JobScheduler, QueuedJob
+from core.pipeline import AudioPipeline
+
+
+class TestCancellation(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.scheduler = JobScheduler()
+        self.pipeline = AudioPipeline(output_base_dir=str(self.temp_dir / "outputs"))
+        app = FastAPI()
+
+        @app.delete("/job/{job_id}")
+        async def cancel(job_id: str):
+            return await cancel_response(self.scheduler, self.pipeline, job_id)
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _queue(self) -> QueuedJob:
+        input_path = self.temp_dir / "song.wav"
+        input_path.write_bytes(b"RIFF")
+        job = QueuedJob(job_id=self.pipeline.create_job(str(input_path)).job_id, input_path=str(input_path))
+        self.scheduler.admit(job)
+        return job
+
+    def test_repeated_delete_conflicts(self):
+        job = self._queue()
+
+        response = self.client.delete(f"/job/{job.job_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"job_id": job.job_id, "status": "cancelled"})
+        self.assertFalse(Path(job.input_path).exists())
+        self.assertEqual(self.pipeline.get_job_status(job.job_id).status, "cancelled")
+
+        response = self.client.delete(f"/job/{job.job_id}")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["detail"], "Job already cancelled")
+
+        self.assertEqual(self.client.delete("/job/missing").status_code, 404)
+
+    def test_running_job_is_asked_to_stop(self):
+        job = self._queue()
+        self.scheduler.next("worker-1")
+
+        for _ in range(2):
+            response = self.client.delete(f"/job/{job.job_id}")
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.json()["status"], "cancelling")
+        self.assertTrue(self.scheduler.store.cancel_requested(job.job_id))
+
+        self.scheduler.complete(job.job_id, "completed")
+        self.assertEqual(self.client.delete(f"/job/{job.job_id}").json()["detail"], "Job already completed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from core.chunking import ChunkingConfig, overlap_add, plan_chunks
+
+
+class TestChunking(unittest.TestCase):
+    def test_plan_covers_input_with_aligned_overlaps(self):
+        chunks = plan_chunks(100000, 4, 1000, align=512)
+
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], 100000)
+        for (start, end), (next_start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(next_start % 512, 0)
+            self.assertEqual(end - next_start, 1000)
+
+    def test_short_input_is_single_chunk(self):
+        self.assertEqual(plan_chunks(1500, 4, 1000), [(0, 1500)])
+
+    def test_overlap_add_reconstructs_identity(self):
+        audio = np.random.randn(4, 2, 50000).astype(np.float32)
+        chunks = plan_chunks(50000, 3, 2000, align=512)
+
+        stitched = overlap_add((audio[..., start:end] for start, end in chunks), chunks, 50000)
+
+        np.testing.assert_allclose(stitched, audio, atol=1e-5)
+
+    def test_config_applies_to_long_inputs_only(self):
+        config = ChunkingConfig(min_duration_seconds=60, workers=2)
+
+        self.assertTrue(config.applies_to(44100 * 120, 44100))
+        self.assertFalse(config.applies_to(44100 * 30, 44100))
+        self.assertFalse(ChunkingConfig(min_duration_seconds=60, workers=1).applies_to(44100 * 120, 44100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api.downloads import file_response
+
+
+class TestDownloads(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.track = self.temp_dir / "vocals.wav"
+        self.track.write_bytes(bytes(range(256)) * 64)
+        app = FastAPI()
+
+        @app.get("/track")
+        async def track(request: Request):
+            return file_response(request, self.track, "vocals.wav", "audio/wav")
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_range_request_returns_partial_content(self):
+        response = self.client.get("/track", headers={"Range": "bytes=256-511"})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["content-range"], f"bytes 256-511/{self.track.stat().st_size}")
+        self.assertEqual(response.content, self.track.read_bytes()[256:512])
+
+    def test_conditional_requests_return_not_modified(self):
+        first = self.client.get("/track")
+        self.assertEqual(first.status_code, 200)
+
+        cached = self.client.get("/track", headers={"If-None-Match": first.headers["etag"]})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+
+        cached = self.client.get("/track", headers={"If-Modified-Since": first.headers["last-modified"]})
+        self.assertEqual(cached.status_code, 304)
+
+        changed = self.client.get("/track", headers={"If-None-Match": '"stale"'})
+        self.assertEqual(changed.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
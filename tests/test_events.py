@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock
+
+from core.events import EventBus
+from core.pipeline import AudioPipeline
+
+
+class TestEventBus(unittest.TestCase):
+    def test_subscribers_receive_job_events(self):
+        bus = EventBus()
+        received, all_jobs = [], []
+        unsubscribe = bus.subscribe(received.append, job_id="a")
+        bus.subscribe(all_jobs.append)
+
+        bus.publish("a", "status", {"status": "processing"})
+        bus.publish("b", "status", {"status": "processing"})
+        unsubscribe()
+        bus.publish("a", "status", {"status": "completed"})
+
+        self.assertEqual([e.job_id for e in received], ["a"])
+        self.assertEqual(len(all_jobs), 3)
+
+    def test_history_resumes_after_event_id(self):
+        bus = EventBus(history=2)
+        for step in range(3):
+            bus.publish("a", "progress", {"progress": step})
+
+        self.assertEqual([e.id for e in bus.history("a")], [2, 3])
+        self.assertEqual([e.id for e in bus.history("a", after_id=2)], [3])
+        self.assertTrue(bus.publish("a", "status", {"status": "failed"}).is_terminal)
+
+    def test_pipeline_publishes_progress_and_outputs(self):
+        temp_dir = tempfile.mkdtemp()
+        test_input = Path(temp_dir) / "test_input.wav"
+        test_input.touch()
+        bus = EventBus()
+        pipeline = AudioPipeline(output_base_dir=temp_dir, events=bus)
+
+        stage = Mock()
+        stage.name = "test_stage"
+        stage.processor_type = "test"
+        stage.validate_input = Mock(return_value=True)
+        stage.execute = Mock(side_effect=lambda *_: stage.progress_callback(0.5) or {"out": str(test_input)})
+        pipeline.add_stage(stage)
+
+        manifest = pipeline.process(str(test_input))
+        events = [(e.event, e.data.get("status") or e.data.get("progress") or e.data.get("key"))
+                  for e in bus.history(manifest.job_id)]
+
+        self.assertEqual(events, [
+            ("status", "queued"),
+            ("status", "processing"),
+            ("stage", "processing"),
+            ("progress", 50.0),
+            ("output", "out"),
+            ("stage", "completed"),
+            ("status", "completed")
+        ])
+
+        import shutil
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from core.excerpt import loudest_window, write_excerpt
+
+
+class TestExcerpt(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.sr = 8000
+        audio = np.full(self.sr * 60, 0.01, dtype=np.float32)
+        audio[self.sr * 30:self.sr * 40] = 0.5
+        self.audio = np.stack([audio, audio], axis=1)
+        self.path = self.temp_dir / "song.flac"
+        sf.write(str(self.path), self.audio, self.sr)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_loudest_window(self):
+        start, duration, total = loudest_window(str(self.path), 10)
+        self.assertEqual((start, duration), (30.0, 10.0))
+        self.assertAlmostEqual(total, 60.0)
+
+    def test_short_input_is_used_whole(self):
+        self.assertEqual(loudest_window(str(self.path), 120), (0.0, 60.0, 60.0))
+
+    def test_write_excerpt(self):
+        dest = self.temp_dir / "excerpt.wav"
+        write_excerpt(str(self.path), str(dest), 30.0, 10.0)
+
+        excerpt, sr = sf.read(str(dest))
+        self.assertEqual(sr, self.sr)
+        self.assertEqual(excerpt.shape, (self.sr * 10, 2))
+        np.testing.assert_allclose(excerpt, self.audio[self.sr * 30:self.sr * 40], atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
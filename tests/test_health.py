@@ -0,0 +1,62 @@
+import os
+import tempfile
+import time
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.health import readiness_response
+from api.jobstore import JobStore
+
+
+class TestReadiness(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.db"))
+        app = FastAPI()
+
+        @app.get("/ready")
+        async def ready():
+            return readiness_response(self.store)
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_not_ready_until_a_worker_is_warm(self):
+        response = self.client.get("/ready")
+        self.assertEqual((response.status_code, response.json()["status"]), (503, "warming_up"))
+
+        self.store.register_worker("worker-1", 1)
+        self.store.register_worker("worker-2", 2)
+        response = self.client.get("/ready")
+        self.assertEqual((response.status_code, response.json()["status"]), (503, "warming_up"))
+
+        self.store.set_worker_warmup("worker-1", {"error": "Demucs not installed"}, ready=False)
+        self.assertEqual(self.client.get("/ready").json()["status"], "warming_up")
+        self.store.set_worker_warmup("worker-2", {"error": "Demucs not installed"}, ready=False)
+        response = self.client.get("/ready")
+        self.assertEqual((response.status_code, response.json()["status"]), (503, "warmup_failed"))
+
+        warmup = {"total_seconds": 3.1, "stages": {"audio_separation": {"load_seconds": 2.5, "inference_seconds": 0.6}}}
+        self.store.set_worker_warmup("worker-2", warmup, ready=True)
+        response = self.client.get("/ready")
+        self.assertEqual((response.status_code, response.json()["status"]), (200, "ready"))
+        self.assertEqual(
+            {worker["worker_id"]: worker["warmup"] for worker in response.json()["workers"]},
+            {"worker-1": {"error": "Demucs not installed"}, "worker-2": warmup}
+        )
+
+    def test_warm_worker_that_stopped_heartbeating_is_not_ready(self):
+        self.store.register_worker("worker-1", 1)
+        self.store.set_worker_warmup("worker-1", {"total_seconds": 1.0, "stages": {}}, ready=True)
+        self.store.connection.execute("UPDATE workers SET heartbeat_at = ?", (time.time() - 3600,))
+
+        response = self.client.get("/ready")
+        self.assertEqual((response.status_code, response.json()), (503, {"status": "warming_up", "workers": []}))
+
+
+if __name__ == "__main__":
+    unittest.main()
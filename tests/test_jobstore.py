@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from api.jobstore import JobStore, StateRelay, store_event_bus
+from api.scheduler import JobScheduler, QueuedJob
+from core.events import EventBus
+from core.metrics import MetricsRegistry, merge_snapshots
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_queue_is_shared_between_stores(self):
+        api = JobScheduler(JobStore(self.path))
+        worker = JobScheduler(JobStore(self.path))
+        api.admit(QueuedJob(job_id="1", input_path="1.wav"))
+
+        job = worker.next("worker-1")
+        self.assertEqual(job.job_id, "1")
+        self.assertIsNone(api.next("worker-2"))
+        self.assertEqual(api.store.get_job("1")["status"], "running")
+
+        worker.complete("1", "completed")
+        self.assertEqual(api.store.get_job("1")["status"], "completed")
+
+    def test_jobs_are_listed_newest_first_by_page(self):
+        store = JobStore(self.path)
+        scheduler = JobScheduler(store, max_depth=10)
+        for idx in range(5):
+            scheduler.admit(QueuedJob(job_id=f"j{idx}", input_path="x.wav", enqueued_at=1000.0 + idx // 2))
+        scheduler.next("worker-1")
+        scheduler.complete("j0", "completed", output_keys=["vocals", "drums"])
+
+        first = store.list_jobs(limit=3)
+        self.assertEqual([row["job_id"] for row in first], ["j4", "j3", "j2"])
+        last = first[-1]
+        rest = store.list_jobs(limit=3, before=(last["enqueued_at"], last["job_id"]))
+        self.assertEqual([row["job_id"] for row in rest], ["j1", "j0"])
+
+        self.assertEqual([row["job_id"] for row in store.list_jobs(["completed"])], ["j0"])
+        self.assertEqual(json.loads(store.get_job("j0")["output_keys"]), ["vocals", "drums"])
+        self.assertEqual([row["job_id"] for row in store.list_jobs(since=1001.0)], ["j4", "j3", "j2"])
+
+        plan = " ".join(row["detail"] for row in store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM jobs WHERE status = 'queued' ORDER BY enqueued_at DESC, job_id DESC"
+        ))
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_orphaned_jobs(self):
+        store = JobStore(self.path)
+        scheduler = JobScheduler(store)
+        scheduler.admit(QueuedJob(job_id="1", input_path="1.wav"))
+        store.register_worker("worker-1", 1)
+        scheduler.next("worker-1")
+
+        self.assertEqual(store.orphaned_jobs(["worker-1"]), [])
+        self.assertEqual([row["job_id"] for row in store.orphaned_jobs([])], ["1"])
+
+    def test_workers_are_ready_after_warm_up(self):
+        store = JobStore(self.path)
+        store.register_worker("worker-1", 1)
+        store.register_worker("worker-2", 2)
+        store.set_worker_warmup("worker-1", {"total_seconds": 4.2, "stages": {}}, ready=True)
+        store.set_worker_warmup("worker-2", {"error": "no model"}, ready=False)
+
+        workers = {row["worker_id"]: row for row in store.alive_workers()}
+        self.assertIsNotNone(workers["worker-1"]["ready_at"])
+        self.assertIsNone(workers["worker-2"]["ready_at"])
+        self.assertEqual(json.loads(workers["worker-2"]["warmup"]), {"error": "no model"})
+
+    def test_events_are_relayed_with_store_ids(self):
+        store = JobStore(self.path)
+        local = EventBus()
+        received = []
+        local.subscribe(received.append, job_id="job")
+        relay = StateRelay(JobStore(self.path), local, source="api-test", poll_seconds=0.01)
+        relay.start()
+        try:
+            bus = store_event_bus(store)
+            bus.publish("job", "status", {"status": "processing"})
+            bus.publish("job", "status", {"status": "completed"})
+            deadline = time.monotonic() + 5
+            while len(received) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            relay.stop()
+
+        self.assertEqual([e.data["status"] for e in received], ["processing", "completed"])
+        self.assertLess(received[0].id, received[1].id)
+        self.assertEqual(local.history("job", after_id=received[0].id), [received[1]])
+
+    def test_retired_metrics_keep_counters(self):
+        store = JobStore(self.path)
+        for source in ("worker-1", "worker-2"):
+            registry = MetricsRegistry()
+            registry.counter("jobs_total", "Jobs").inc(2)
+            registry.gauge("models_loaded", "Models").set(1)
+            store.put_metrics(source, registry.snapshot())
+
+        store.retire_metrics("worker-1")
+        store.retire_metrics("worker-2")
+        merged = merge_snapshots(store.metrics_snapshots())
+
+        self.assertEqual(merged["jobs_total"]["samples"][()], 4)
+        self.assertNotIn("models_loaded", merged)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import unittest
+
+from core.metrics import MetricsRegistry, process_group_rss_bytes, process_rss_bytes, render_snapshots
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("request_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            latency.observe(value, route="/job")
+
+        text = registry.render()
+
+        self.assertIn("# TYPE request_seconds histogram", text)
+        self.assertIn('request_seconds_bucket{route="/job",le="0.1"} 1', text)
+        self.assertIn('request_seconds_bucket{route="/job",le="1.0"} 2', text)
+        self.assertIn('request_seconds_bucket{route="/job",le="+Inf"} 3', text)
+        self.assertIn('request_seconds_count{route="/job"} 3', text)
+
+    def test_worker_snapshots_are_merged(self):
+        api, worker = MetricsRegistry(), MetricsRegistry()
+        api.counter("jobs_total", "Jobs", ("status",)).inc(status="completed")
+        worker.counter("jobs_total", "Jobs", ("status",)).inc(2, status="completed")
+        worker.histogram("stage_seconds", "Stage", buckets=(1.0,)).observe(0.5)
+
+        text = render_snapshots([api.snapshot(), worker.snapshot()])
+
+        self.assertIn('jobs_total{status="completed"} 3.0', text)
+        self.assertIn("stage_seconds_count 1", text)
+
+    def test_labels_are_validated_and_escaped(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("bytes_total", "Bytes", ("route",))
+
+        with self.assertRaises(ValueError):
+            counter.inc(path="/x")
+
+        counter.inc(route='a"b')
+        self.assertIn('bytes_total{route="a\\"b"} 1.0', registry.render())
+        self.assertIs(registry.counter("bytes_total", "Bytes", ("route",)), counter)
+
+    @unittest.skipUnless(os.path.isdir("/proc/self"), "needs /proc")
+    def test_process_group_rss_includes_own_process(self):
+        rss = process_group_rss_bytes(os.getpgid(0))
+        self.assertGreaterEqual(rss, process_rss_bytes())
+        self.assertIsNone(process_group_rss_bytes(-1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api.peaks import peaks_response
+from core.peaks import analyze_audio, write_peaks
+
+
+class TestPeaksResponse(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        track = self.temp_dir / "vocals.wav"
+        sf.write(str(track), np.sin(np.arange(44100) / 10).astype(np.float32) * 0.5, 44100, subtype="FLOAT")
+        self.peaks_path = Path(write_peaks(str(self.temp_dir / "vocals.peaks"), analyze_audio(str(track))))
+        app = FastAPI()
+
+        @app.get("/peaks")
+        async def peaks(request: Request, zoom: Optional[int] = None, pixels: int = 1000, format: str = "json"):
+            return peaks_response(request, self.peaks_path, zoom, pixels, format)
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_huge_zoom_returns_a_single_pixel(self):
+        response = self.client.get("/peaks", params={"zoom": 10 ** 12})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["length"], 1)
+        self.assertEqual(self.client.get("/peaks", params={"zoom": 0}).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
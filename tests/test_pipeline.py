@@ -4,7 +4,7 @@ from pathlib import Path
 import tempfile
 import json
 
-from core.pipeline import AudioPipeline, ProcessingManifest, ProcessingStage
+from core.pipeline import AudioPipeline, JobCancelled, PipelineStage, ProcessingManifest, ProcessingStage
 from core.separator import SeparatorFactory, SeparatorModel
 from core.processors import SeparationStage
 
@@ -151,6 +151,163 @@ class TestAudioPipeline(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.pipeline.process(str(self.test_input))
 
+    def test_queued_job_is_processed_in_place(self):
+        stage = Mock()
+        stage.name = "test_stage"
+        stage.processor_type = "test"
+        stage.validate_input = Mock(return_value=True)
+        stage.execute = Mock(return_value={"output": str(self.test_input)})
+        self.pipeline.add_stage(stage)
+
+        queued = self.pipeline.create_job(str(self.test_input))
+        self.assertEqual(self.pipeline.get_job_status(queued.job_id).status, "queued")
+        self.assertEqual(queued.stages[0].status, "pending")
+
+        manifest = self.pipeline.process(str(self.test_input), job_id=queued.job_id)
+
+        self.assertEqual(manifest.job_id, queued.job_id)
+        self.assertEqual(manifest.created_at, queued.created_at)
+        self.assertEqual(self.pipeline.get_job_status(queued.job_id).status, "completed")
+
+    def test_failed_job_manifest_is_persisted(self):
+        stage = Mock()
+        stage.name = "failing_stage"
+        stage.processor_type = "test"
+        stage.validate_input = Mock(return_value=True)
+        stage.execute = Mock(side_effect=RuntimeError("boom"))
+        self.pipeline.add_stage(stage)
+
+        queued = self.pipeline.create_job(str(self.test_input))
+        with self.assertRaises(RuntimeError):
+            self.pipeline.process(str(self.test_input), job_id=queued.job_id)
+
+        manifest = self.pipeline.get_job_status(queued.job_id)
+        self.assertEqual(manifest.status, "failed")
+        self.assertEqual(manifest.stages[0].error, "boom")
+        self.assertEqual(manifest.metadata["failure"], {"reason": "stage_error", "stage": "failing_stage", "message": "boom"})
+
+    def test_killed_job_records_failure_reason(self):
+        queued = self.pipeline.create_job(str(self.test_input))
+        manifest = self.pipeline.get_job_status(queued.job_id)
+        manifest.stages.append(ProcessingStage(name="separation", processor_type="separator", status="processing"))
+        self.pipeline._write_manifest(manifest)
+
+        self.pipeline.mark_failed(queued.job_id, "Job exceeded the time limit of 60s", "timeout")
+
+        manifest = self.pipeline.get_job_status(queued.job_id)
+        self.assertEqual(manifest.status, "failed")
+        self.assertEqual(manifest.stages[0].status, "failed")
+        self.assertEqual(
+            manifest.metadata["failure"],
+            {"reason": "timeout", "stage": "separation", "message": "Job exceeded the time limit of 60s"}
+        )
+
+    def test_duplicate_outputs_are_linked(self):
+        first = Path(self.temp_dir) / "first.wav"
+        second = Path(self.temp_dir) / "second.wav"
+        first.write_bytes(b"RIFF" + b"\x01" * 64)
+        second.write_bytes(b"RIFF" + b"\x01" * 64)
+
+        stage = Mock()
+        stage.name = "dup_stage"
+        stage.processor_type = "test"
+        stage.validate_input = Mock(return_value=True)
+        stage.execute = Mock(return_value={"first": str(first), "second": str(second)})
+
+        self.pipeline.add_stage(stage)
+        manifest = self.pipeline.process(str(self.test_input))
+
+        self.assertEqual(manifest.metadata["aliases"], {"second": "first"})
+        self.assertEqual(manifest.metadata["bytes_deduplicated"], 68)
+        self.assertTrue(first.samefile(second))
+
+    def test_clone_job_links_outputs(self):
+        def execute(input_path, output_dir):
+            track = Path(output_dir) / "vocals.wav"
+            track.write_bytes(b"RIFF" + b"\x02" * 64)
+            return {"vocals": str(track)}
+
+        stage = Mock()
+        stage.name = "test_stage"
+        stage.processor_type = "test"
+        stage.validate_input = Mock(return_value=True)
+        stage.execute = Mock(side_effect=execute)
+        self.pipeline.add_stage(stage)
+        source = self.pipeline.process(str(self.test_input))
+
+        clone = self.pipeline.clone_job(source.job_id, "again.wav")
+
+        self.assertEqual(clone.status, "completed")
+        self.assertEqual(clone.metadata["reused_from"], source.job_id)
+        self.assertEqual(self.pipeline.get_job_status(clone.job_id).outputs, clone.outputs)
+        self.assertIn(clone.job_id, clone.outputs["vocals"])
+        self.assertTrue(Path(clone.outputs["vocals"]).samefile(source.outputs["vocals"]))
+
+        Path(source.outputs["vocals"]).unlink()
+        self.assertIsNone(self.pipeline.clone_job(source.job_id, "again.wav"))
+
+    def test_cancelled_job_removes_partial_outputs(self):
+        cancel = {"requested": False}
+
+        class SegmentedStage(PipelineStage):
+            def validate_input(self, input_path):
+                return True
+
+            def execute(self, input_path, output_dir):
+                track = Path(output_dir) / "vocals.wav"
+                for segment in range(4):
+                    with open(track, "ab") as f:
+                        f.write(b"\x00" * 16)
+                    cancel["requested"] = segment == 1
+                    self.report_progress((segment + 1) / 4)
+                return {"vocals": str(track)}
+
+        later = Mock()
+        later.name = "later_stage"
+        later.processor_type = "test"
+        self.pipeline.add_stage(SegmentedStage("segmented", "test"))
+        self.pipeline.add_stage(later)
+
+        queued = self.pipeline.create_job(str(self.test_input))
+        with self.assertRaises(JobCancelled):
+            self.pipeline.process(str(self.test_input), job_id=queued.job_id, should_cancel=lambda: cancel["requested"])
+
+        manifest = self.pipeline.get_job_status(queued.job_id)
+        self.assertEqual(manifest.status, "cancelled")
+        self.assertEqual([stage.status for stage in manifest.stages], ["cancelled", "pending"])
+        self.assertEqual(manifest.outputs, {})
+        self.assertEqual([p.name for p in (Path(self.temp_dir) / queued.job_id).iterdir()], ["manifest.json"])
+        later.execute.assert_not_called()
+
+        queued = self.pipeline.create_job(str(self.test_input))
+        self.assertEqual(self.pipeline.mark_cancelled(queued.job_id).status, "cancelled")
+        self.assertEqual(self.pipeline.mark_failed(queued.job_id, "late").status, "cancelled")
+
+    def test_warm_up_preloads_then_runs_each_stage(self):
+        calls = []
+        stage = Mock()
+        stage.name = "separation"
+        stage.preload = Mock(side_effect=lambda: calls.append("preload"))
+        stage.warm_up = Mock(side_effect=lambda: calls.append("warm_up"))
+        self.pipeline.add_stage(stage)
+
+        timings = self.pipeline.warm_up()
+
+        self.assertEqual(calls, ["preload", "warm_up"])
+        self.assertEqual(set(timings["stages"]["separation"]), {"load_seconds", "inference_seconds"})
+        self.assertGreaterEqual(timings["total_seconds"], 0)
+
+    def test_config_key_tracks_stage_settings(self):
+        from core.processors import NormalizationStage
+
+        other = AudioPipeline(output_base_dir=self.temp_dir)
+        self.pipeline.add_stage(NormalizationStage(target_db=-14.0))
+        other.add_stage(NormalizationStage(target_db=-14.0))
+        self.assertEqual(self.pipeline.config_key(), other.config_key())
+
+        other.stages[0].target_db = -16.0
+        self.assertNotEqual(self.pipeline.config_key(), other.config_key())
+
 
 class TestSeparatorFactory(unittest.TestCase):
     def test_register_separator(self):
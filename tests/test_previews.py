@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from api.previews import PreviewSources
+
+
+class TestPreviewSources(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.sources = PreviewSources(str(self.temp_dir / "previews"), expiry_seconds=3600)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _upload(self, name: str) -> Path:
+        path = self.temp_dir / name
+        path.write_bytes(b"RIFF")
+        return path
+
+    def test_claim_moves_the_source_once(self):
+        self.sources.keep("job", self._upload("song.wav"))
+
+        dest = self.temp_dir / "input.wav"
+        self.assertIsNotNone(self.sources.claim("job", dest))
+        self.assertTrue(dest.exists())
+        self.assertIsNone(self.sources.claim("job", self.temp_dir / "again.wav"))
+        self.assertEqual(list(self.sources.directory.iterdir()), [])
+
+    def test_source_of_a_preview_that_was_not_upgraded_expires(self):
+        source = self.sources.keep("old", self._upload("old.wav"))
+        stale = time.time() - 7200
+        os.utime(source, (stale, stale))
+
+        # Expiry runs whenever another preview is kept
+        fresh = self.sources.keep("new", self._upload("new.flac"))
+
+        self.assertEqual(list(self.sources.directory.iterdir()), [fresh])
+        self.assertIsNone(self.sources.claim("old", self.temp_dir / "input.wav"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from core.metrics import MetricsRegistry, REALTIME_FACTOR_BUCKETS
+from core.probe import CostModel, probe_audio
+
+
+class TestProbe(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_probe_reads_the_header(self):
+        path = self.temp_dir / "song.flac"
+        sf.write(str(path), np.zeros((22050 * 3, 2), dtype=np.float32), 22050)
+
+        probe = probe_audio(str(path))
+        self.assertEqual((probe.duration_seconds, probe.sample_rate, probe.channels), (3.0, 22050, 2))
+        self.assertEqual(probe.codec, "FLAC/PCM_16")
+
+        broken = self.temp_dir / "broken.wav"
+        broken.write_bytes(b"RIFF\x00\x00")
+        self.assertIsNone(probe_audio(str(broken)))
+
+    def test_cost_model_calibrates_from_stage_timings(self):
+        registry = MetricsRegistry()
+        snapshots = []
+        model = CostModel(["separation", "analysis"], lambda: snapshots, default_factor=2.0, refresh_seconds=0)
+        self.assertAlmostEqual(model.estimate(60), 120.0)
+
+        factor = registry.histogram("pipeline_stage_realtime_factor", "", ("stage",), REALTIME_FACTOR_BUCKETS)
+        factor.observe(0.5, stage="separation")
+        factor.observe(0.7, stage="separation")
+        snapshots.append(registry.snapshot())
+        # Analysis has not been observed yet and keeps its share of the default
+        self.assertAlmostEqual(model.estimate(60), 60 * (0.6 + 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from core.processors import CompositeTrackStage
+
+
+class TestCompositeTrackStage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.output_dir = self.temp_dir / "job"
+        hp_dir = self.output_dir / "harmonic_percussive"
+        hp_dir.mkdir(parents=True)
+        self.audio = np.linspace(-0.5, 0.5, 8000, dtype=np.float32)
+        for name in ("harmonic", "percussive"):
+            sf.write(str(hp_dir / f"{name}.wav"), self.audio, 8000, subtype="FLOAT")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, input_subtype: str):
+        input_path = self.temp_dir / f"input_{input_subtype}.wav"
+        sf.write(str(input_path), self.audio, 8000, subtype=input_subtype)
+        stage = CompositeTrackStage()
+        stage.output_subtype = "FLOAT"
+        main = Path(stage.execute(str(input_path), str(self.output_dir))["main"])
+        return input_path, main
+
+    def test_matching_wav_is_linked(self):
+        input_path, main = self._run("FLOAT")
+        self.assertTrue(main.samefile(input_path))
+
+    def test_other_subtype_is_converted(self):
+        input_path, main = self._run("PCM_16")
+        self.assertFalse(main.samefile(input_path))
+        self.assertEqual(sf.info(str(main)).subtype, "FLOAT")
+        self.assertEqual(sf.info(str(main)).samplerate, 8000)
+
+
+if __name__ == "__main__":
+    unittest.main()
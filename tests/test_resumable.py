@@ -0,0 +1,114 @@
+import base64
+import hashlib
+import io
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from api.jobstore import JobStore
+from api.resumable import CHECKSUM_MISMATCH, PATCH_CONTENT_TYPE, ResumableUploads, parse_metadata
+
+
+def _wav_bytes(frames: int = 20000) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(frames, dtype=np.float32), 44100, format="WAV")
+    return buffer.getvalue()
+
+
+def _chunk_headers(offset: int, data: bytes) -> dict:
+    return {
+        "Content-Type": PATCH_CONTENT_TYPE,
+        "Upload-Offset": str(offset),
+        "Upload-Checksum": f"sha256 {base64.b64encode(hashlib.sha256(data).digest()).decode()}"
+    }
+
+
+class TestResumableUploads(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.uploads = ResumableUploads(JobStore(), self.temp_dir / "partial", 10 * 1024 * 1024, ["wav", "flac"])
+        app = FastAPI()
+
+        @app.patch("/uploads/{upload_id}")
+        async def patch(upload_id: str, request: Request):
+            return {"offset": await self.uploads.patch(request, upload_id)}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_chunks_resume_after_a_corrupted_one(self):
+        wav = _wav_bytes()
+        upload_id = self.uploads.create(len(wav), "song.wav", "client")["upload_id"]
+        half = len(wav) // 2
+
+        response = self.client.patch(f"/uploads/{upload_id}", content=wav[:half], headers=_chunk_headers(0, wav[:half]))
+        self.assertEqual(response.json()["offset"], half)
+
+        corrupted = _chunk_headers(half, wav[half:])
+        response = self.client.patch(f"/uploads/{upload_id}", content=wav[half:-1] + b"\x01", headers=corrupted)
+        self.assertEqual(response.status_code, CHECKSUM_MISMATCH)
+        self.assertEqual(self.uploads.get(upload_id)["upload_offset"], half)
+
+        response = self.client.patch(f"/uploads/{upload_id}", content=wav[half:], headers=_chunk_headers(0, wav[half:]))
+        self.assertEqual(response.status_code, 409)
+
+        response = self.client.patch(f"/uploads/{upload_id}", content=wav[half:], headers=_chunk_headers(half, wav[half:]))
+        self.assertEqual(response.json()["offset"], len(wav))
+
+        upload = self.uploads.get(upload_id)
+        path, filename = self.uploads.complete(upload_id, self.temp_dir)
+        self.assertEqual((path.read_bytes(), filename), (wav, "song.wav"))
+        self.assertEqual(list((self.temp_dir / "partial").iterdir()), [])
+
+        # A full queue hands the input back, and finalize works again
+        self.uploads.restore(upload, path)
+        self.assertFalse(path.exists())
+        self.assertEqual(self.uploads.get(upload_id)["upload_offset"], len(wav))
+        path, _ = self.uploads.complete(upload_id, self.temp_dir)
+        self.assertEqual(path.read_bytes(), wav)
+
+    def test_incomplete_and_mislabelled_uploads_are_refused(self):
+        wav = _wav_bytes()
+        upload_id = self.uploads.create(len(wav), "song.flac", "client")["upload_id"]
+        with self.assertRaises(HTTPException) as raised:
+            self.uploads.complete(upload_id, self.temp_dir)
+        self.assertEqual(raised.exception.status_code, 409)
+
+        response = self.client.patch(f"/uploads/{upload_id}", content=wav, headers=_chunk_headers(0, wav))
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(self.uploads.get(upload_id)["upload_offset"], 0)
+
+        self.assertEqual(parse_metadata("filename c29uZy53YXY=,is_private"), {"filename": "song.wav", "is_private": ""})
+
+    def test_open_uploads_are_capped_per_client(self):
+        uploads = ResumableUploads(
+            JobStore(), self.temp_dir / "capped", 10 * 1024 * 1024, ["wav"], max_per_client=2, max_client_bytes=3000
+        )
+        first = uploads.create(1000, "a.wav", "client")["upload_id"]
+        uploads.create(1000, "b.wav", "client")
+
+        with self.assertRaises(HTTPException) as raised:
+            uploads.create(500, "c.wav", "client")
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertIn("Retry-After", raised.exception.headers)
+
+        uploads.delete(first)
+        with self.assertRaises(HTTPException) as raised:
+            uploads.create(2500, "c.wav", "client")
+        self.assertEqual(raised.exception.status_code, 413)
+
+        uploads.create(1000, "c.wav", "client")
+        uploads.create(2000, "d.wav", "other")
+        self.assertEqual(len(list(uploads.directory.iterdir())), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
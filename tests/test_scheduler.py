@@ -0,0 +1,111 @@
+import unittest
+
+from api.scheduler import JobScheduler, QueuedJob, QueueFullError
+
+
+def _job(job_id: str, client_id: str = "a", priority: str = "interactive") -> QueuedJob:
+    return QueuedJob(job_id=job_id, input_path=f"{job_id}.wav", client_id=client_id, priority=priority)
+
+
+class TestJobScheduler(unittest.TestCase):
+    def test_queue_depth_is_bounded(self):
+        scheduler = JobScheduler(max_depth=2, workers=2, default_run_seconds=30)
+        scheduler.admit(_job("1", "a"))
+        scheduler.admit(_job("2", "b"))
+
+        with self.assertRaises(QueueFullError) as ctx:
+            scheduler.admit(_job("3", "c"))
+        self.assertEqual(ctx.exception.retry_after, 15)
+
+    def test_per_client_limit(self):
+        scheduler = JobScheduler(max_per_client=1)
+        scheduler.admit(_job("1", "a"))
+
+        with self.assertRaises(QueueFullError):
+            scheduler.admit(_job("2", "a"))
+        scheduler.admit(_job("3", "b"))
+
+    def test_clients_are_served_round_robin(self):
+        scheduler = JobScheduler()
+        for job_id in ("a1", "a2", "a3"):
+            scheduler.admit(_job(job_id, "a"))
+        scheduler.admit(_job("b1", "b"))
+
+        self.assertEqual([scheduler.next().job_id for _ in range(4)], ["a1", "b1", "a2", "a3"])
+        self.assertIsNone(scheduler.next())
+
+    def test_interactive_first_without_starving_batch(self):
+        scheduler = JobScheduler()
+        scheduler.admit(_job("batch", "a", "batch"))
+        for idx in range(5):
+            scheduler.admit(_job(f"i{idx}", f"client{idx}"))
+
+        order = [scheduler.next().job_id for _ in range(6)]
+        self.assertEqual(order[:3], ["i0", "i1", "i2"])
+        self.assertEqual(order[3], "batch")
+
+    def test_unknown_priority_is_rejected(self):
+        with self.assertRaises(ValueError):
+            JobScheduler().admit(_job("1", priority="urgent"))
+
+    def test_batch_parallelism_is_bounded(self):
+        scheduler = JobScheduler(max_depth=2)
+        batch = [_job(f"b{idx}", priority="interactive") for idx in range(3)]
+        scheduler.admit_batch("batch", batch, client_id="a", max_parallel=2)
+        # The whole batch takes one slot of the depth limit
+        scheduler.admit(_job("solo", "b"))
+        self.assertEqual({job.priority for job in batch}, {"batch"})
+
+        claimed = [scheduler.next("w1").job_id, scheduler.next("w2").job_id, scheduler.next("w3").job_id]
+        self.assertEqual(sorted(claimed), ["b0", "b1", "solo"])
+        self.assertIsNone(scheduler.next("w4"))
+
+        scheduler.complete("b0", "completed")
+        self.assertEqual(scheduler.next("w4").job_id, "b2")
+
+    def test_batches_count_toward_queue_limits(self):
+        scheduler = JobScheduler(max_depth=3, max_per_client=2)
+        scheduler.admit_batch("b1", [_job(f"b1-{idx}") for idx in range(10)], client_id="a", max_parallel=1)
+        scheduler.admit_batch("b2", [_job("b2-0")], client_id="a", max_parallel=1)
+
+        with self.assertRaises(QueueFullError):
+            scheduler.admit_batch("b3", [_job("b3-0")], client_id="a", max_parallel=1)
+        with self.assertRaises(QueueFullError):
+            scheduler.admit(_job("solo", "a"))
+        scheduler.admit(_job("solo", "b"))
+        with self.assertRaises(QueueFullError):
+            scheduler.admit_batch("b4", [_job("b4-0")], client_id="c", max_parallel=1)
+        with self.assertRaises(ValueError):
+            scheduler.admit_batch("b5", [_job("b5-0")], client_id="c", max_parallel=0)
+
+    def test_cancel_queued_and_running_jobs(self):
+        scheduler = JobScheduler(max_depth=1)
+        scheduler.admit(_job("1"))
+        self.assertEqual(scheduler.cancel("1"), "cancelled")
+        self.assertEqual(len(scheduler), 0)
+        scheduler.admit(_job("2"))
+
+        self.assertEqual(scheduler.next("w1").job_id, "2")
+        self.assertFalse(scheduler.store.cancel_requested("2"))
+        self.assertEqual(scheduler.cancel("2"), "cancelling")
+        self.assertTrue(scheduler.store.cancel_requested("2"))
+        self.assertEqual(scheduler.store.get_job("2")["status"], "running")
+
+        scheduler.complete("2", "cancelled")
+        self.assertEqual(scheduler.cancel("2"), "finished")
+        self.assertEqual(scheduler.cancel("1"), "finished")
+        self.assertIsNone(scheduler.cancel("missing"))
+
+    def test_shorter_jobs_go_first_without_starving_long_ones(self):
+        scheduler = JobScheduler(default_run_seconds=60)
+        scheduler.admit(QueuedJob(job_id="long", input_path="x.wav", client_id="a", enqueued_at=1000, estimated_seconds=600))
+        scheduler.admit(QueuedJob(job_id="short", input_path="x.wav", client_id="b", enqueued_at=1010, estimated_seconds=30))
+        scheduler.admit(QueuedJob(job_id="late", input_path="x.wav", client_id="c", enqueued_at=2000, estimated_seconds=30))
+
+        self.assertEqual(scheduler.estimated_wait_for("long"), 30.0)
+        self.assertEqual(scheduler.estimated_wait_for("short"), 0.0)
+        self.assertEqual([scheduler.next(f"w{idx}").job_id for idx in range(3)], ["short", "long", "late"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+
+import numpy as np
+
+from core.pipeline import JobCancelled
+from core.separator import DemucsModel, SeparatorModel
+
+
+class FakeDemucs(DemucsModel):
+    """DemucsModel with a stand-in for the network, whose output depends on the whole input."""
+    PROGRESS_INTERVAL_SECONDS = 0.01
+
+    def __init__(self, delay: float = 0.0):
+        SeparatorModel.__init__(self, "fake")
+        self.seconds_per_audio_second = 1.0
+        self.delay = delay
+        self.calls = 0
+
+    @classmethod
+    def prepare_audio(cls, audio, sr):
+        return np.asarray(audio, dtype=np.float32), sr
+
+    def _apply(self, audio):
+        self.calls += 1
+        time.sleep(self.delay)
+        centred = audio - audio.mean(axis=-1, keepdims=True)
+        return np.stack([centred * (index + 1) for index in range(len(self.TRACKS))])
+
+
+class TestDemucsProgress(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.audio = rng.standard_normal((2, 44100 * 3)).astype(np.float32) + np.linspace(0, 1, 44100 * 3, dtype=np.float32)
+
+    def test_progress_does_not_change_the_result(self):
+        reported = []
+        model = FakeDemucs(delay=0.1)
+
+        plain = model.separate_array(self.audio, 44100)
+        tracked = model.separate_array(self.audio, 44100, reported.append)
+
+        np.testing.assert_array_equal(plain, tracked)
+        self.assertEqual(model.calls, 2)
+        self.assertGreater(len(reported), 1)
+        self.assertEqual(reported, sorted(reported))
+        self.assertEqual(reported[-1], 1.0)
+        self.assertLess(max(reported[:-1]), 1.0)
+
+    def test_cancellation_from_progress_is_raised(self):
+        def cancel(fraction):
+            raise JobCancelled()
+
+        with self.assertRaises(JobCancelled):
+            FakeDemucs(delay=0.1).separate_array(self.audio, 44100, cancel)
+
+
+if __name__ == "__main__":
+    unittest.main()
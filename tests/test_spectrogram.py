@@ -0,0 +1,127 @@
+import asyncio
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from api import spectrogram as api_spectrogram
+from api.spectrogram import TileCache, ensure_spectrogram
+from core.spectrogram import (
+    HOP_LENGTH,
+    N_FFT,
+    PNG_SIGNATURE,
+    TILE_HEIGHT,
+    TILE_WIDTH,
+    TileGrid,
+    compute_spectrogram,
+    encode_png,
+    render_tile
+)
+
+
+class TestSpectrogram(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.source = self.temp_dir / "vocals.wav"
+        self.sr = 22050
+        t = np.arange(self.sr * 30) / self.sr
+        # 1 kHz for the first half, 4 kHz for the second
+        tone = np.where(t < 15, np.sin(2 * np.pi * 1000 * t), np.sin(2 * np.pi * 4000 * t)) * 0.5
+        sf.write(str(self.source), np.stack([tone, tone], axis=1).astype(np.float32), self.sr, subtype="FLOAT")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_streaming_stft_matches_direct(self):
+        spec = np.load(compute_spectrogram(str(self.source), str(self.temp_dir / "vocals.npy")))
+
+        frames = sf.info(str(self.source)).frames // HOP_LENGTH + 1
+        self.assertEqual(spec.shape, (frames, N_FFT // 2 + 1))
+        bin_hz = self.sr / N_FFT
+        self.assertAlmostEqual(spec[100].argmax() * bin_hz, 1000, delta=bin_hz)
+        self.assertAlmostEqual(spec[-100].argmax() * bin_hz, 4000, delta=bin_hz)
+        self.assertAlmostEqual(float(spec[100].max()), 0.5, delta=0.05)
+
+        audio = sf.read(str(self.source), dtype="float32")[0].mean(axis=1)
+        window = np.hanning(N_FFT + 1)[:-1]
+        frame = audio[200 * HOP_LENGTH - N_FFT // 2:200 * HOP_LENGTH + N_FFT // 2]
+        direct = np.abs(np.fft.rfft(frame * window)) * 2 / window.sum()
+        np.testing.assert_allclose(spec[200], direct, atol=1e-4)
+
+    def test_tiles_cover_only_their_time_range(self):
+        spec = np.load(compute_spectrogram(str(self.source), str(self.temp_dir / "vocals.npy")), mmap_mode="r")
+        grid = TileGrid(frames=spec.shape[0], sample_rate=self.sr)
+
+        self.assertEqual(grid.tile_count(0), 1)
+        self.assertEqual(grid.frames_per_pixel(grid.max_zoom), 1)
+        self.assertEqual(grid.tile_count(grid.max_zoom), int(np.ceil(spec.shape[0] / TILE_WIDTH)))
+        with self.assertRaises(ValueError):
+            grid.check(grid.max_zoom + 1, 0)
+
+        first = render_tile(spec, grid, grid.max_zoom, 0, "log")
+        last = render_tile(spec, grid, grid.max_zoom, grid.tile_count(grid.max_zoom) - 1, "log")
+        self.assertEqual(first.shape, (TILE_HEIGHT, TILE_WIDTH))
+        # Highest frequency on top, so the 4 kHz tone sits above the 1 kHz one
+        self.assertLess(last[:, 10].argmax(), first[:, 10].argmax())
+
+        png = encode_png(first)
+        self.assertTrue(png.startswith(PNG_SIGNATURE))
+        width, height = struct.unpack(">II", png[16:24])
+        self.assertEqual((width, height), (TILE_WIDTH, TILE_HEIGHT))
+        idat = png.index(b"IDAT")
+        length = struct.unpack(">I", png[idat - 4:idat])[0]
+        self.assertEqual(len(zlib.decompress(png[idat + 4:idat + 4 + length])), TILE_HEIGHT * (TILE_WIDTH + 1))
+
+    def test_concurrent_computations_leave_one_file(self):
+        dest = str(self.temp_dir / "vocals.npy")
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: compute_spectrogram(str(self.source), dest), range(4)))
+        self.assertEqual(set(results), {dest})
+
+        cache = TileCache(str(self.temp_dir / "tiles"), max_bytes=100 * 1024 * 1024)
+
+        async def requests():
+            return await asyncio.gather(*(ensure_spectrogram(cache, self.source) for _ in range(4)))
+
+        spec_path = cache.spectrogram_path(self.source)
+        self.assertEqual(asyncio.run(requests()), [spec_path] * 4)
+        self.assertEqual(api_spectrogram._compute_locks, {})
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir()), ["tiles", "vocals.npy", "vocals.wav"])
+        self.assertEqual(list(cache.directory.iterdir()), [spec_path])
+
+    def test_tile_cache_evicts_least_recently_used(self):
+        cache = TileCache(str(self.temp_dir / "tiles"), max_bytes=2500)
+        paths = [cache.tile_path(f"tile-{i}") for i in range(3)]
+        cache.put(paths[0], b"a" * 1000)
+        cache.put(paths[1], b"b" * 1000)
+        self.assertEqual(cache.get(paths[0]), b"a" * 1000)
+
+        cache.put(paths[2], b"c" * 1000)
+        self.assertTrue(paths[0].exists())
+        self.assertFalse(paths[1].exists())
+        self.assertIsNone(cache.get(paths[1]))
+
+    def test_spectrograms_are_evicted_with_tiles(self):
+        cache = TileCache(str(self.temp_dir / "tiles"), max_bytes=4 * 1024 * 1024)
+        spec_path = asyncio.run(ensure_spectrogram(cache, self.source))
+        size = spec_path.stat().st_size
+        self.assertLess(size, cache.max_bytes)
+
+        tile = cache.tile_path("tile")
+        cache.put(tile, b"t" * (cache.max_bytes - size + 1))
+        self.assertFalse(spec_path.exists())
+        self.assertTrue(tile.exists())
+
+        # An evicted spectrogram is computed again on the next request
+        self.assertEqual(asyncio.run(ensure_spectrogram(cache, self.source)), spec_path)
+        self.assertTrue(spec_path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
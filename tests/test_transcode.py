@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from api.transcode import TranscodeCache, resolve_format, transcode
+
+
+class TestTranscode(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.source = self.temp_dir / "vocals.wav"
+        t = np.arange(44100 * 5) / 44100
+        tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+        sf.write(str(self.source), np.stack([tone, tone], axis=1).astype(np.float32), 44100, subtype="FLOAT")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _transcode(self, name: str, bitrate=None) -> Path:
+        spec, bitrate = resolve_format(name, bitrate)
+        dest = self.temp_dir / f"out{spec.extension}"
+        with open(dest, "w+b") as f:
+            transcode(self.source, f, spec, bitrate)
+        return dest
+
+    def test_formats_decode_and_shrink(self):
+        source_size = self.source.stat().st_size
+        for name in ("wav", "flac", "mp3", "opus"):
+            dest = self._transcode(name)
+            audio, sr = sf.read(str(dest))
+            self.assertEqual(audio.shape[1], 2, name)
+            self.assertAlmostEqual(len(audio) / sr, 5.0, delta=0.1, msg=name)
+            self.assertLess(dest.stat().st_size, source_size, name)
+
+    def test_bitrate_controls_size(self):
+        low = self._transcode("mp3", 64).stat().st_size
+        high = self._transcode("mp3", 256).stat().st_size
+        self.assertLess(low * 3, high)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            resolve_format("aac", None)
+        self.assertEqual(resolve_format("ogg", 9999)[1], 512)
+
+    def test_cache_streams_then_hits(self):
+        cache = TranscodeCache(str(self.temp_dir / "cache"), max_bytes=10 * 1024 * 1024)
+        spec, bitrate = resolve_format("flac", None)
+        path = cache.cache_path(self.source, spec, bitrate)
+
+        self.assertFalse(cache.lookup(path))
+        streamed = b"".join(cache.stream(self.source, path, spec, bitrate))
+        self.assertTrue(cache.lookup(path))
+        # The streamed copy only lacks the header fields written when the encoder closes
+        self.assertEqual(len(streamed), path.stat().st_size)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TranscodeCache(str(self.temp_dir / "cache"), max_bytes=0)
+        old, new = cache.directory / "old.flac", cache.directory / "new.flac"
+        old.write_bytes(b"x" * 10)
+        new.write_bytes(b"x" * 10)
+        os.utime(old, (time.time() - 100, time.time() - 100))
+        cache.max_bytes = 15
+
+        cache.evict()
+        self.assertFalse(old.exists())
+        self.assertTrue(new.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import hashlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api.uploads import receive_upload, sniff_format
+
+
+def _wav_bytes(frames: int = 4410) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(frames, dtype=np.float32), 44100, format="WAV")
+    return buffer.getvalue()
+
+
+class TestUploads(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.max_bytes = 1024 * 1024
+        app = FastAPI()
+
+        @app.post("/upload")
+        async def upload(request: Request):
+            path, filename, sha256 = await receive_upload(request, Path(self.temp_dir), self.max_bytes, ["wav", "flac"])
+            return {"path": str(path), "filename": filename, "sha256": sha256}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_sniff_format(self):
+        self.assertEqual(sniff_format(_wav_bytes()[:12]), "wav")
+        self.assertEqual(sniff_format(b"fLaC\x00\x00\x00\x22"), "flac")
+        self.assertEqual(sniff_format(b"ID3\x04\x00"), "mp3")
+        self.assertIsNone(sniff_format(b"hello world!"))
+
+    def test_upload_is_stored(self):
+        wav = _wav_bytes()
+        response = self.client.post("/upload", files={"file": ("song.wav", wav)})
+
+        self.assertEqual(response.status_code, 200)
+        stored = Path(response.json()["path"])
+        self.assertTrue(stored.name.endswith("_song.wav"))
+        self.assertEqual(stored.read_bytes(), wav)
+        self.assertEqual(response.json()["sha256"], hashlib.sha256(wav).hexdigest())
+
+    def test_rejected_uploads_leave_no_files(self):
+        wav = _wav_bytes()
+        cases = [
+            (("song.aac", wav), 415),
+            (("song.flac", wav), 415),
+            (("song.wav", b"not audio at all"), 415)
+        ]
+        for upload, status in cases:
+            response = self.client.post("/upload", files={"file": upload})
+            self.assertEqual(response.status_code, status)
+
+        self.max_bytes = 1000
+        response = self.client.post("/upload", files={"file": ("song.wav", wav)})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(list(Path(self.temp_dir).iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from api.scheduler import QueuedJob
+from api.worker import WorkerPool, build_pipeline
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.pool = WorkerPool(str(self.temp_dir / "outputs"), str(self.temp_dir / "jobs.db"), processes=1, max_tasks=1)
+
+    def tearDown(self):
+        self.pool.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _wait_for(self, condition, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            result = condition()
+            if result:
+                return result
+            time.sleep(0.1)
+        self.fail("Timed out")
+
+    def test_wait_outlives_recycled_workers(self):
+        self.pool.start()
+        first = self._wait_for(self.pool.store.alive_workers)[0]["pid"]
+        waiter = threading.Thread(target=self.pool.wait, daemon=True)
+        waiter.start()
+
+        # A job with a missing input fails at once, after which the worker has served max_tasks
+        self.pool.scheduler.admit(QueuedJob(job_id="1", input_path=str(self.temp_dir / "missing.wav")))
+        self._wait_for(lambda: self.pool.store.get_job("1")["status"] == "failed")
+        replacement = self._wait_for(
+            lambda: [row["pid"] for row in self.pool.store.alive_workers() if row["pid"] != first]
+        )[0]
+
+        self.assertTrue(waiter.is_alive())
+        self.assertNotEqual(replacement, first)
+        self.assertEqual(self.pool.metrics.snapshot()["worker_exits_total"]["samples"], {("recycled",): 1.0})
+
+        self.pool.stop()
+        waiter.join(10)
+        self.assertFalse(waiter.is_alive())
+
+
+class TestBuildPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_separation_chunk_workers_are_bounded_and_closed(self):
+        with mock.patch("api.worker.CHUNKED_PROCESSING", True), \
+                mock.patch("api.worker.CHUNK_WORKERS", 0), \
+                mock.patch("api.worker.SEPARATION_CHUNK_WORKERS", 2):
+            pipeline = build_pipeline(str(self.temp_dir))
+
+        separation, *others = pipeline.stages
+        self.assertEqual(separation.chunking.resolve_workers(), 2)
+        self.assertEqual(others[0].chunking.workers, 0)
+
+        runner = separation.chunk_runner = mock.Mock()
+        pipeline.close()
+        runner.shutdown.assert_called_once_with()
+        self.assertIsNone(separation.chunk_runner)
+
+
+if __name__ == "__main__":
+    unittest.main()
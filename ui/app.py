@@ -37,9 +37,9 @@ def upload_and_process(uploaded_file) -> Optional[str]:
 
     try:
         files = {"file": (uploaded_file.name, uploaded_file, "audio/wav")}
-        response = requests.post(f"{API_URL}/process", files=files, timeout=300)
+        response = requests.post(f"{API_URL}/process", files=files, timeout=60)
 
-        if response.status_code == 200:
+        if response.status_code in (200, 202):
             data = response.json()
             return data.get("job_id")
         else:
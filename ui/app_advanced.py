@@ -6,6 +6,7 @@ import matplotlib
 matplotlib.use('Agg')
 # Force matplotlib to initialize all submodules
 import matplotlib.pyplot as plt
+import matplotlib.image
 import matplotlib.figure
 import matplotlib.axes
 from matplotlib.figure import Figure
@@ -76,8 +77,8 @@ def upload_and_process(uploaded_file) -> Optional[str]:
         return None
     try:
         files = {"file": (uploaded_file.name, uploaded_file, "audio/wav")}
-        response = requests.post(f"{API_URL}/process", files=files, timeout=300)
-        if response.status_code == 200:
+        response = requests.post(f"{API_URL}/process", files=files, timeout=60)
+        if response.status_code in (200, 202):
             data = response.json()
             return data.get("job_id")
         else:
@@ -96,6 +97,14 @@ def get_job_status(job_id: str) -> Optional[Dict]:
         return None
 
 
+def cancel_job(job_id: str) -> Optional[str]:
+    try:
+        response = requests.delete(f"{API_URL}/job/{job_id}", timeout=10)
+        return response.json().get("status") if response.status_code in (200, 202) else None
+    except requests.exceptions.RequestException:
+        return None
+
+
 def download_track(job_id: str, track_name: str) -> Optional[bytes]:
     try:
         response = requests.get(
@@ -110,6 +119,41 @@ def download_track(job_id: str, track_name: str) -> Optional[bytes]:
         return None
 
 
+def get_track_peaks(job_id: str, track_name: str, pixels: int = 1200) -> Optional[Dict]:
+    try:
+        response = requests.get(
+            f"{API_URL}/job/{job_id}/peaks/{track_name}",
+            params={"pixels": pixels},
+            timeout=30
+        )
+        if response.status_code == 200:
+            return response.json()
+        return None
+    except requests.exceptions.RequestException:
+        return None
+
+
+def get_spectrogram_tiles(job_id: str, track_name: str, zoom: int = 2, scale: str = "log") -> Optional[tuple]:
+    """Tiles covering the whole track at one zoom level, and the seconds each tile spans"""
+    try:
+        url = f"{API_URL}/job/{job_id}/spectrogram/{track_name}"
+        tiles = []
+        count = 1
+        while len(tiles) < count:
+            response = requests.get(url, params={"zoom": zoom, "x": len(tiles), "scale": scale}, timeout=120)
+            if response.status_code == 400 and zoom > 0:
+                # Short tracks have fewer zoom levels
+                zoom -= 1
+                continue
+            if response.status_code != 200:
+                return None
+            count = int(response.headers["X-Tile-Count"])
+            tiles.append(response.content)
+        return tiles, float(response.headers["X-Tile-End"]) - float(response.headers["X-Tile-Start"])
+    except (requests.exceptions.RequestException, KeyError, ValueError):
+        return None
+
+
 def download_all_tracks(job_id: str) -> Optional[bytes]:
     try:
         response = requests.get(
@@ -159,6 +203,27 @@ def plot_waveform(audio_array: np.ndarray, sr: int, title: str = "Waveform") ->
         return None
 
 
+def plot_peaks(peaks: Dict, title: str = "Waveform") -> Figure:
+    """Create waveform visualization from server-side min/max peaks"""
+    try:
+        fig = Figure(figsize=(12, 4))
+        ax = fig.add_subplot(111)
+
+        # Interleaved min/max pairs, 8-bit
+        data = np.asarray(peaks["data"], dtype=np.float32).reshape(-1, 2) / 127.0
+        times = np.arange(len(data)) * peaks["samples_per_pixel"] / peaks["sample_rate"]
+        ax.fill_between(times, data[:, 0], data[:, 1], linewidth=0.5)
+        ax.set_xlabel('Time (s)')
+        ax.set_ylabel('Amplitude')
+        ax.set_title(title)
+        ax.grid(True, alpha=0.3)
+        fig.tight_layout()
+        return fig
+    except Exception as e:
+        st.error(f"Error creating waveform: {str(e)}")
+        return None
+
+
 def plot_spectrogram(audio_array: np.ndarray, sr: int, title: str = "Spectrogram") -> Figure:
     """Create spectrogram visualization"""
     try:
@@ -180,6 +245,26 @@ def plot_spectrogram(audio_array: np.ndarray, sr: int, title: str = "Spectrogram
         return None
 
 
+def plot_spectrogram_tiles(tiles: List[bytes], tile_seconds: float, duration: float, title: str = "Spectrogram") -> Figure:
+    """Create spectrogram visualization from server-rendered tiles"""
+    try:
+        fig = Figure(figsize=(12, 6))
+        ax = fig.add_subplot(111)
+
+        image = np.hstack([matplotlib.image.imread(BytesIO(tile)) for tile in tiles])
+        ax.imshow(image, aspect='auto', extent=(0, tile_seconds * len(tiles), 0, 1))
+        ax.set_xlim(0, duration)
+        ax.set_yticks([])
+        ax.set_xlabel('Time (s)')
+        ax.set_ylabel('Frequency (log)')
+        ax.set_title(title)
+        fig.tight_layout()
+        return fig
+    except Exception as e:
+        st.error(f"Error creating spectrogram: {str(e)}")
+        return None
+
+
 def get_audio_stats(audio_array: np.ndarray, sr: int) -> Dict:
     """Calculate audio statistics"""
     duration = len(audio_array) / sr
@@ -366,6 +451,13 @@ with tab2:
                 output_count = len(status.get("outputs", {}))
                 st.metric("Outputs", output_count)
 
+            if status.get("status") in ("queued", "processing"):
+                if st.button("Cancel Job", type="secondary"):
+                    if cancel_job(job_id):
+                        st.info("Cancellation requested")
+                    else:
+                        st.error("Could not cancel the job")
+
             st.divider()
 
             # Pipeline Progress
@@ -377,7 +469,8 @@ with tab2:
                     "completed": "[DONE]",
                     "processing": "[RUNNING]",
                     "pending": "[PENDING]",
-                    "failed": "[FAILED]"
+                    "failed": "[FAILED]",
+                    "cancelled": "[CANCELLED]"
                 }.get(stage_status, "[?]")
 
                 with st.container():
@@ -469,7 +562,11 @@ with tab2:
                                     # Waveform
                                     if show_waveforms:
                                         st.markdown("#### Waveform")
-                                        fig = plot_waveform(audio_array, sr, f"{track_name} Waveform")
+                                        peaks = get_track_peaks(job_id, track_name)
+                                        if peaks is not None:
+                                            fig = plot_peaks(peaks, f"{track_name} Waveform")
+                                        else:
+                                            fig = plot_waveform(audio_array, sr, f"{track_name} Waveform")
                                         if fig is not None:
                                             st.pyplot(fig)
                                             plt.close(fig)
@@ -477,7 +574,11 @@ with tab2:
                                     # Spectrogram
                                     if show_spectrograms:
                                         st.markdown("#### Spectrogram")
-                                        fig = plot_spectrogram(audio_array, sr, f"{track_name} Spectrogram")
+                                        tiles = get_spectrogram_tiles(job_id, track_name)
+                                        if tiles is not None:
+                                            fig = plot_spectrogram_tiles(*tiles, len(audio_array) / sr, f"{track_name} Spectrogram")
+                                        else:
+                                            fig = plot_spectrogram(audio_array, sr, f"{track_name} Spectrogram")
                                         if fig is not None:
                                             st.pyplot(fig)
                                             plt.close(fig)
@@ -113,7 +113,7 @@ class ClientTester:
                     timeout=60
                 )
             
-            if response.status_code == 200:
+            if response.status_code in (200, 202):
                 data = response.json()
                 job_id = data.get("job_id")
                 self.log_test(